@@ -0,0 +1,82 @@
+"""
+Benchmark: 8 bit scan output vs the 1 bit packed output stage
+Usage (from the repository root):
+- python -m benchmarks.bench_bilevel -s 12
+- python -m benchmarks.bench_bilevel -s 40 --backend skimage
+Approach:
+- a synthetic document photo of the requested size (benchmarks.synthetic),
+  built once and saved as .npy
+- every variant runs in its own fresh worker process, which loads the input
+  first; the peak RSS over that baseline is what the scan and write added
+- 8bit: computer_vision.scanner.scan (color warp, gray, threshold), written
+  as an 8 bit PNG with cv2.imwrite, the way batch mode used to
+- packed: scan_packed (gray-only warp, threshold packed strip by strip),
+  written by computer_vision.bilevel.write_bilevel as .png, .tif (group 4)
+  and .pbm
+- every file is read back and compared with the 8 bit scan pixel by pixel
+"""
+
+# import the necessary packages
+import argparse
+import os
+import tempfile
+import time
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import size_for_megapixels, synthetic_document
+from computer_vision.bilevel import read_bilevel, unpack_bits, write_bilevel
+from computer_vision.scanner import scan, scan_packed
+from computer_vision.tiled import peak_rss_mb
+
+
+def run_variant(job):
+    (variant, source, backend, output) = job
+    orig = np.load(source)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    if variant == "8bit":
+        (warped, _, _) = scan(orig, backend)
+        scanned = time.perf_counter()
+        cv2.imwrite(output, warped)
+        nbytes = warped.nbytes
+    else:
+        (packed, width, _, _) = scan_packed(orig, backend)
+        scanned = time.perf_counter()
+        write_bilevel(output, packed, width)
+        nbytes = packed.nbytes
+    end = time.perf_counter()
+
+    return (scanned - start, end - scanned, nbytes, baseline, peak_rss_mb())
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--megapixels", type=float, default=12, help="source image size in megapixels")
+    ap.add_argument("--backend", default="opencv", choices=["opencv", "skimage"], help="local threshold backend")
+    args = vars(ap.parse_args())
+
+    print("{:.0f} MP source, {} backend".format(args["megapixels"], args["backend"]))
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.npy")
+        (width, height) = size_for_megapixels(args["megapixels"])
+        np.save(source, synthetic_document(width, height)[0])
+
+        variants = [("8bit", "8bit.png"), ("packed", "packed.png"), ("packed", "packed.tif"), ("packed", "packed.pbm")]
+        for (variant, name) in variants:
+            output = os.path.join(tmp, name)
+            with Pool(1, maxtasksperchild = 1) as pool:
+                (scan_s, write_s, nbytes, baseline, peak) = pool.apply(run_variant,
+                    ((variant, source, args["backend"], output),))
+            print("{:<6} -> {:<10} scan {:6.3f} s, write {:6.3f} s, page {:7.2f} MB in memory, "
+                  "file {:7.2f} MB, peak RSS {:5.0f} MB over the input".format(variant, name, scan_s, write_s,
+                  nbytes / 2 ** 20, os.path.getsize(output) / 2 ** 20, peak - baseline))
+
+        reference = cv2.imread(os.path.join(tmp, "8bit.png"), cv2.IMREAD_GRAYSCALE)
+        for name in ("packed.png", "packed.tif", "packed.pbm"):
+            (packed, w) = read_bilevel(os.path.join(tmp, name))
+            page = unpack_bits(packed, w)
+            differing = float(np.mean(page != reference)) if page.shape == reference.shape else 1.0
+            print("{:<10} {}x{}, differing pixels vs 8bit: {:.2e}".format(name, w, len(packed), differing))
@@ -0,0 +1,65 @@
+"""
+Benchmark: contour stages with and without the on-disk contour cache
+Usage (from the repository root):
+- python -m benchmarks.bench_cache -s 12
+Approach:
+- a synthetic image with many shapes (benchmarks.synthetic.random_shapes)
+- for find_contours (gray -> blur -> threshold -> findContours) and
+  edge_contours (per-channel median + Canny edge map -> findContours):
+  - no cache: the stage as it runs without one
+  - miss: first run through an empty cache, the stage plus hashing and writing
+  - hit: repeat run, hashing the image and reading the entry
+- the contours out of the cache are checked to be identical to the computed ones
+- a cache capped below the size of its entries shows the LRU eviction
+"""
+
+# import the necessary packages
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import random_shapes, size_for_megapixels
+from computer_vision.cache import ContourCache, image_digest
+from computer_vision.contours import edge_contours, find_contours
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start, result)
+
+def same_contours(a, b):
+    return len(a) == len(b) and all(np.array_equal(x, y) for (x, y) in zip(a, b))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--megapixels", type=float, default=12, help="image size in megapixels")
+    ap.add_argument("-n", type=int, default=2000, help="number of shapes")
+    args = vars(ap.parse_args())
+
+    (width, height) = size_for_megapixels(args["megapixels"])
+    (image, _) = random_shapes(width, height, args["n"])
+    (t, _) = timed(lambda: image_digest(image))
+    print("{}x{} image, {} shapes, hashing {:.1f} ms".format(width, height, args["n"], t * 1e3))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ContourCache(tmp)
+        for (name, stage) in [("find_contours", find_contours), ("edge_contours", edge_contours)]:
+            (cold, reference) = timed(lambda: stage(image))
+            (miss, _) = timed(lambda: stage(image, cache = cache))
+            (hit, cached) = timed(lambda: stage(image, cache = cache))
+            print("{:<14} no cache {:8.1f} ms, miss {:8.1f} ms, hit {:8.1f} ms, same contours: {}".format(
+                name, cold * 1e3, miss * 1e3, hit * 1e3, same_contours(reference, cached)))
+        print("cache: {}".format(cache.stats()))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # room for about two entries of this image
+        cache = ContourCache(tmp)
+        find_contours(image, cache = cache)
+        cache = ContourCache(tmp, max_bytes = int(2.5 * cache.stats()["bytes"]))
+        # 40 is used again and again, it stays while the others get evicted
+        for threshold in (40, 50, 40, 60, 40, 70, 40):
+            find_contours(image, threshold, cache)
+        print("capped cache: {}".format(cache.stats()))
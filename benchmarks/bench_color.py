@@ -0,0 +1,101 @@
+"""
+Benchmark: float vs lookup table color transfer
+Usage (from the repository root):
+- python -m benchmarks.bench_color -s 12
+Approach:
+- synthetic source / target pairs (benchmarks.synthetic.color_pair)
+- float: color.color_transfer(method = "float"), float32 L*a*b*, split,
+  per-channel arithmetic, clip, merge
+- lut: the default lookup table path, new output arrays on every call
+- lut + buffers: the same with dst and lab buffers reused across calls
+- latency is the best of a few runs; peak memory is the tracemalloc peak of
+  one call over what was allocated before it (NumPy arrays, including the ones
+  OpenCV returns), the inputs are allocated before
+- equivalence, on several pairs:
+  - the table built from the float path's own target stats gives the float
+    path's output exactly
+  - end to end (the lut path takes its target stats from histograms) the
+    outputs are compared pixel by pixel, and may differ by --tolerance levels
+    at most
+  - the benchmark exits with an error when either check fails
+"""
+
+# import the necessary packages
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import color_pair, size_for_megapixels
+from computer_vision.color import color_transfer, image_stats, lab_stats, transfer_lut
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+def equivalence(width, height, seeds):
+    # (pairs where the table from the float stats is exact, largest end to end difference, fraction of pixels differing)
+    (exact, worst, differ) = (0, 0, [])
+    for seed in range(seeds):
+        (source, target) = color_pair(width, height, seed)
+        reference = color_transfer(source, target, method = "float")
+
+        lab = cv2.cvtColor(target, cv2.COLOR_BGR2LAB)
+        lut = transfer_lut(lab_stats(source), image_stats(lab.astype("float32")))
+        same = cv2.cvtColor(cv2.LUT(lab, lut), cv2.COLOR_LAB2BGR)
+        exact += np.array_equal(same, reference)
+
+        result = color_transfer(source, target)
+        diff = cv2.absdiff(result, reference)
+        worst = max(worst, int(diff.max()))
+        differ.append(np.count_nonzero(diff.max(axis = 2)) / float(width * height))
+    return (exact, worst, max(differ))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--megapixels", type=float, default=12, help="image size in megapixels")
+    ap.add_argument("-r", "--repeat", type=int, default=5, help="repetitions, the best one is kept")
+    ap.add_argument("-n", type=int, default=8, help="image pairs of the equivalence check")
+    ap.add_argument("-t", "--tolerance", type=int, default=1, help="largest end to end difference allowed, in levels")
+    args = vars(ap.parse_args())
+
+    (width, height) = size_for_megapixels(args["megapixels"])
+    (source, target) = color_pair(width, height)
+    dst = np.empty_like(target)
+    lab = np.empty_like(target)
+
+    variants = [
+        ("float", lambda: color_transfer(source, target, method = "float")),
+        ("lut", lambda: color_transfer(source, target)),
+        ("lut + buffers", lambda: color_transfer(source, target, dst = dst, lab = lab)),
+    ]
+    print("{}x{} target".format(width, height))
+    for (name, fn) in variants:
+        # warm up first
+        fn()
+        print("{:<14} {:8.1f} ms {:8.1f} MB peak".format(name, best_of(fn, args["repeat"]) * 1e3, peak_mb(fn)))
+
+    (exact, worst, differ) = equivalence(640, 480, args["n"])
+    print("table from the float stats: {}/{} pairs identical to the float path".format(exact, args["n"]))
+    print("end to end: largest difference {} levels, at most {:.4%} of the pixels differ".format(worst, differ))
+    if exact < args["n"]:
+        raise SystemExit("the table from the float stats differs from the float path on {} pairs".format(
+            args["n"] - exact))
+    if worst > args["tolerance"]:
+        raise SystemExit("end to end difference of {} levels, more than the tolerance of {}".format(worst,
+            args["tolerance"]))
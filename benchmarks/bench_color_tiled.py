@@ -0,0 +1,106 @@
+"""
+Benchmark: whole image vs strip by strip color transfer on very large images
+Usage (from the repository root):
+- python -m benchmarks.bench_color_tiled -s 50
+- python -m benchmarks.bench_color_tiled -s 200 --skip-float --budget 64
+Approach:
+- a synthetic target of the requested size (benchmarks.synthetic.color_pair)
+  saved as .npy, the source stats from a small source image
+- every variant runs in its own fresh worker process, the input is opened
+  there; the peak RSS right after opening it is reported too, the difference
+  is what the transfer itself added
+- float / lut: the whole target loaded, color.transfer_stats with either
+  method, then np.save
+- tiled: tiled_color.transfer_tiled on the target read strip by strip
+  (tiled.StripReader), exact stats accumulated strip by strip, under the
+  memory budget
+- sampled: the same, with the target stats from sampled_lab_stats
+- outputs are compared with the lut one pixel by pixel
+- the sampled stats are checked against the exact ones on several seeds:
+  how often every one of the 6 errors is within its reported bound
+"""
+
+# import the necessary packages
+import argparse
+import os
+import tempfile
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from benchmarks.synthetic import color_pair, size_for_megapixels
+from computer_vision.color import lab_stats, transfer_stats
+from computer_vision.tiled import peak_rss_mb
+from computer_vision.tiled_color import open_image, sampled_lab_stats, tiled_lab_stats, transfer_tiled
+
+
+def run_variant(job):
+    (variant, source, sourceStats, budget, fraction, output) = job
+    if variant in ("float", "lut"):
+        target = np.load(source)
+    else:
+        target = open_image(source)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    if variant in ("float", "lut"):
+        np.save(output, transfer_stats(sourceStats, target, variant))
+    elif variant == "tiled":
+        transfer_tiled(sourceStats, target, output, budget)
+    else:
+        (targetStats, _) = sampled_lab_stats(target, fraction, budget_mb = budget)
+        transfer_tiled(sourceStats, target, output, budget, targetStats)
+    elapsed = time.perf_counter() - start
+
+    return (elapsed, baseline, peak_rss_mb())
+
+def coverage(target, fraction, seeds, budget):
+    # (seeds with all 6 sampled stats within their bound, largest error / bound ratio)
+    exact = np.array(tiled_lab_stats(target, budget))
+    (covered, worst) = (0, 0.0)
+    for seed in range(seeds):
+        (stats, bounds) = sampled_lab_stats(target, fraction, seed = seed, budget_mb = budget)
+        ratio = np.abs(np.array(stats) - exact) / np.maximum(bounds, 1e-12)
+        covered += bool(np.all(ratio <= 1))
+        worst = max(worst, float(ratio.max()))
+    return (covered, worst)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--megapixels", type=float, default=50, help="target size in megapixels")
+    ap.add_argument("--budget", type=float, default=64, help="memory budget of the tiled variants in MB")
+    ap.add_argument("--sample", type=float, default=0.01, help="fraction of the rows of the sampled variant")
+    ap.add_argument("--seeds", type=int, default=20, help="seeds of the sampled error bound check")
+    ap.add_argument("--skip-float", action="store_true", help="leave out the float variant (needs ~40 bytes/pixel)")
+    args = vars(ap.parse_args())
+
+    print("{:.0f} MP target, {:.0f} MB budget, {:.1%} of the rows sampled".format(
+        args["megapixels"], args["budget"], args["sample"]))
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "target.npy")
+        (width, height) = size_for_megapixels(args["megapixels"])
+        np.save(source, color_pair(width, height)[1])
+        sourceStats = lab_stats(color_pair(1000, 750, 1)[0])
+
+        variants = ["lut", "tiled", "sampled"]
+        if not args["skip_float"]:
+            variants.insert(0, "float")
+        outputs = {}
+        for variant in variants:
+            outputs[variant] = os.path.join(tmp, variant + ".npy")
+            job = (variant, source, sourceStats, args["budget"], args["sample"], outputs[variant])
+            with Pool(1, maxtasksperchild = 1) as pool:
+                (elapsed, baseline, peak) = pool.apply(run_variant, (job,))
+            print("{:<8} {:8.2f} s, peak RSS {:7.0f} MB ({:7.0f} MB over the input)".format(
+                variant, elapsed, peak, peak - baseline))
+
+        reference = np.load(outputs["lut"], mmap_mode = "r")
+        for variant in variants:
+            if variant != "lut":
+                other = np.load(outputs[variant], mmap_mode = "r")
+                print("{:<8} vs lut: {:.2e} of the pixels differ".format(variant, float(np.mean(reference != other))))
+
+        (covered, worst) = coverage(open_image(source), args["sample"], args["seeds"], args["budget"])
+        print("sampled stats within their bound on {}/{} seeds, largest error / bound {:.2f}".format(
+            covered, args["seeds"], worst))
@@ -0,0 +1,65 @@
+"""
+Benchmark: serial vs threaded per-channel edge map on large images
+Usage (from the repository root):
+- python -m benchmarks.bench_edges -s 20
+Approach:
+- a noisy synthetic image of the requested size (benchmarks.synthetic)
+- legacy: split, then medianBlur + Canny per channel one after the other,
+  ORed into a new array every time, the way sortingContours.py used to run
+- edge_map with 1 to 3 worker threads, ORing in place
+- report the best of a few runs in ms and megapixels/sec and check that every
+  variant gives the same edge map as the legacy one
+- the threaded speedup is bounded by the number of cores: on a single core
+  the threads only take turns
+"""
+
+# import the necessary packages
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import random_shapes, size_for_megapixels
+from computer_vision.contours import edge_map
+
+
+def legacy_edge_map(image):
+    accumEdged = np.zeros(image.shape[:2], dtype="uint8")
+    for chan in cv2.split(image):
+        chan = cv2.medianBlur(chan, 11)
+        edged = cv2.Canny(chan, 50, 200)
+        accumEdged = cv2.bitwise_or(accumEdged, edged)
+    return accumEdged
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return (min(times), result)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--megapixels", type=float, default=20, help="image size in megapixels")
+    ap.add_argument("-r", "--repeat", type=int, default=3, help="repetitions, the best one is kept")
+    args = vars(ap.parse_args())
+
+    (width, height) = size_for_megapixels(args["megapixels"])
+    (image, _) = random_shapes(width, height, 12)
+    noise = np.random.default_rng(0).integers(0, 30, image.shape, dtype = "uint8")
+    image = cv2.add(image, noise)
+    megapixels = width * height / 1e6
+    print("{}x{} ({:.1f} MP), {} cores, {} OpenCV threads".format(
+        width, height, megapixels, os.cpu_count(), cv2.getNumThreads()))
+
+    (t, reference) = best_of(lambda: legacy_edge_map(image), args["repeat"])
+    print("{:<12} {:8.1f} ms {:8.1f} MP/s".format("legacy", t * 1e3, megapixels / t))
+
+    for workers in (1, 2, 3):
+        (t, edges) = best_of(lambda: edge_map(image, workers), args["repeat"])
+        print("{:<12} {:8.1f} ms {:8.1f} MP/s  same edges: {}".format(
+            "{} thread{}".format(workers, "s" if workers > 1 else ""), t * 1e3, megapixels / t,
+            np.array_equal(edges, reference)))
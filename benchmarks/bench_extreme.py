@@ -0,0 +1,51 @@
+"""
+Benchmark: extreme points of every contour, Python loop vs one flat reduction
+Usage (from the repository root):
+- python -m benchmarks.bench_extreme -n 500 -n 100000
+Approach:
+- n contours from benchmarks.synthetic.random_contours
+- loop: the four argmin / argmax calls of extremePointDetection.py, once per contour
+- flat: computer_vision.extreme.all_extreme_points, (N, 4, 2) in one pass
+- both results are checked to be identical (ties included)
+"""
+
+# import the necessary packages
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import random_contours
+from computer_vision.extreme import all_extreme_points
+
+
+def loop_extreme_points(cnts):
+    ext = []
+    for c in cnts:
+        extLeft = c[c[:, :, 0].argmin()][0]
+        extRight = c[c[:, :, 0].argmax()][0]
+        extTop = c[c[:, :, 1].argmin()][0]
+        extBot = c[c[:, :, 1].argmax()][0]
+        ext.append((extLeft, extRight, extTop, extBot))
+    return np.array(ext, dtype = "int32").reshape(-1, 4, 2)
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return (min(times), result)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, action="append", help="number of contours (repeatable)")
+    ap.add_argument("-r", "--repeat", type=int, default=3, help="repetitions, the best one is kept")
+    args = vars(ap.parse_args())
+
+    for n in args["n"] or [500, 10000, 100000]:
+        cnts = random_contours(n)
+        (tl, loop) = best_of(lambda: loop_extreme_points(cnts), args["repeat"])
+        (tf, flat) = best_of(lambda: all_extreme_points(cnts), args["repeat"])
+        print("{:>7} contours: loop {:8.2f} ms, flat {:8.2f} ms ({:.1f}x), same points: {}".format(
+            n, tl * 1e3, tf * 1e3, tl / tf, np.array_equal(loop, flat)))
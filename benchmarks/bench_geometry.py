@@ -0,0 +1,104 @@
+"""
+Benchmark: batched quad geometry vs the per-quad code
+Usage (from the repository root):
+- python -m benchmarks.bench_geometry -n 10000
+Approach:
+- generate N random convex quads with shuffled corners
+- per-quad: the order_points / sqrt / cv2.getPerspectiveTransform code the
+  scanners used to carry, called once per quad in a Python loop
+- batched: computer_vision.geometry.quad_transforms on the whole (N, 4, 2) array
+- check that both give the same corners and sizes, compare how well the two
+  sets of matrices map the corners onto the output rectangles, report the timings
+"""
+
+# import the necessary packages
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from computer_vision.geometry import quad_transforms
+
+
+def legacy_order_points(pts):
+    rect = np.zeros((4, 2), dtype = "float32")
+    s = pts.sum(axis = 1)
+    rect[0] = pts[np.argmin(s)]
+    rect[2] = pts[np.argmax(s)]
+    diff = np.diff(pts, axis = 1)
+    rect[1] = pts[np.argmin(diff)]
+    rect[3] = pts[np.argmax(diff)]
+    return rect
+
+def legacy_transform(pts):
+    rect = legacy_order_points(pts)
+    (tl, tr, br, bl) = rect
+    widthA = np.sqrt(((br[0] - bl[0]) ** 2) + ((br[1] - bl[1]) ** 2))
+    widthB = np.sqrt(((tr[0] - tl[0]) ** 2) + ((tr[1] - tl[1]) ** 2))
+    maxWidth = max(int(widthA), int(widthB))
+    heightA = np.sqrt(((tr[0] - br[0]) ** 2) + ((tr[1] - br[1]) ** 2))
+    heightB = np.sqrt(((tl[0] - bl[0]) ** 2) + ((tl[1] - bl[1]) ** 2))
+    maxHeight = max(int(heightA), int(heightB))
+    dst = np.array([
+        [0, 0],
+        [maxWidth - 1, 0],
+        [maxWidth - 1, maxHeight - 1],
+        [0, maxHeight - 1]], dtype = "float32")
+    M = cv2.getPerspectiveTransform(rect, dst)
+    return (rect, (maxWidth, maxHeight), M)
+
+def random_quads(n, seed = 0):
+    # jittered, randomly scaled and shifted squares keep the quads convex
+    rng = np.random.default_rng(seed)
+    square = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype = "float32")
+    scale = rng.uniform(200, 2000, (n, 1, 1))
+    shift = rng.uniform(0, 4000, (n, 1, 2))
+    jitter = rng.uniform(-0.15, 0.15, (n, 4, 2))
+    quads = ((square + jitter) * scale + shift).astype("float32")
+
+    # shuffle the corners of every quad
+    perm = np.argsort(rng.random((n, 4)), axis = 1)
+    return np.take_along_axis(quads, perm[:, :, None], axis = 1)
+
+def reprojection_error(ordered, sizes, matrices):
+    # largest distance between a mapped corner and its output rectangle corner
+    (w, h) = (sizes[:, 0] - 1.0, sizes[:, 1] - 1.0)
+    zero = np.zeros(len(sizes))
+    dst = np.stack([np.stack([zero, zero], axis = 1), np.stack([w, zero], axis = 1),
+                    np.stack([w, h], axis = 1), np.stack([zero, h], axis = 1)], axis = 1)
+    src = np.concatenate([ordered, np.ones(ordered.shape[:2] + (1,))], axis = 2)
+    mapped = src @ matrices.transpose(0, 2, 1)
+    return np.abs(mapped[:, :, :2] / mapped[:, :, 2:] - dst).max()
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return (min(times), result)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", "--quads", type=int, default=10000, help="number of quads")
+    ap.add_argument("-r", "--repeat", type=int, default=5, help="repetitions, the best one is kept")
+    args = vars(ap.parse_args())
+
+    quads = random_quads(args["quads"])
+
+    (loop_time, legacy) = best_of(lambda: [legacy_transform(q) for q in quads], args["repeat"])
+    (batch_time, (ordered, sizes, matrices)) = best_of(lambda: quad_transforms(quads), args["repeat"])
+
+    # the two implementations must agree
+    assert np.array_equal(ordered, np.stack([r for (r, _, _) in legacy]))
+    assert np.array_equal(sizes, np.array([s for (_, s, _) in legacy]))
+    legacy_err = reprojection_error(ordered, sizes, np.stack([M for (_, _, M) in legacy]))
+    batch_err = reprojection_error(ordered, sizes, matrices)
+
+    n = len(quads)
+    print("quads:           {}".format(n))
+    print("per-quad loop:   {:.2f} ms ({:.2f} us/quad)".format(loop_time * 1e3, loop_time / n * 1e6))
+    print("batched:         {:.2f} ms ({:.2f} us/quad)".format(batch_time * 1e3, batch_time / n * 1e6))
+    print("speedup:         {:.1f}x".format(loop_time / batch_time))
+    print("corner error:    {:.2e} px per-quad, {:.2e} px batched".format(legacy_err, batch_err))
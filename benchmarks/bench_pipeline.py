@@ -0,0 +1,87 @@
+"""
+Benchmark: sequential scanning vs the process pool batch vs the asyncio pipeline
+Usage (from the repository root):
+- python -m benchmarks.bench_pipeline -n 24 -s 4
+- python -m benchmarks.bench_pipeline -n 48 -s 12 --decode-workers 4 --queue-size 8
+Approach:
+- n synthetic document photos (benchmarks.synthetic) saved as JPEG files
+- sequential: imread -> scan_packed -> write_bilevel, one file after the other
+- batch: computer_vision.batch.run_batch, every file read, scanned and written
+  inside the worker processes
+- pipeline: computer_vision.pipeline.run_pipeline, decode and write on thread
+  pools, scan on the process pool, bounded queues in between; its queue depths
+  and stage utilization are printed as well
+- every variant writes its own output directory, the files are compared
+"""
+
+# import the necessary packages
+import argparse
+import contextlib
+import filecmp
+import io
+import os
+import tempfile
+import time
+
+import cv2
+
+from benchmarks.synthetic import size_for_megapixels, synthetic_document
+from computer_vision.batch import run_batch
+from computer_vision.bilevel import write_bilevel
+from computer_vision.files import list_images
+from computer_vision.pipeline import format_stats, run_pipeline
+from computer_vision.scanner import scan_packed
+
+
+def sequential(paths, output):
+    os.makedirs(output, exist_ok = True)
+    for path in paths:
+        (packed, width, _, _) = scan_packed(cv2.imread(path))
+        name = os.path.splitext(os.path.basename(path))[0] + ".png"
+        write_bilevel(os.path.join(output, name), packed, width)
+
+def same_outputs(a, b):
+    names = sorted(os.listdir(a))
+    return names == sorted(os.listdir(b)) and all(filecmp.cmp(os.path.join(a, n), os.path.join(b, n), shallow = False)
+        for n in names)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=24, help="number of images")
+    ap.add_argument("-s", "--megapixels", type=float, default=4, help="image size in megapixels")
+    ap.add_argument("-w", "--workers", type=int, default=None, help="scan processes (default: all cores)")
+    ap.add_argument("--decode-workers", type=int, default=2, help="decoding threads of the pipeline")
+    ap.add_argument("--write-workers", type=int, default=2, help="writing threads of the pipeline")
+    ap.add_argument("--queue-size", type=int, default=4, help="images held between two stages")
+    args = vars(ap.parse_args())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "in")
+        os.makedirs(source)
+        (width, height) = size_for_megapixels(args["megapixels"])
+        for i in range(args["n"]):
+            cv2.imwrite(os.path.join(source, "doc{:04d}.jpg".format(i)), synthetic_document(width, height, i)[0])
+        paths = list_images(source)
+        print("{} images of {}x{}, {} cores".format(len(paths), width, height, os.cpu_count()))
+
+        start = time.perf_counter()
+        sequential(paths, os.path.join(tmp, "sequential"))
+        elapsed = time.perf_counter() - start
+        print("{:<10} {:6.2f} s, {:6.2f} images/sec".format("sequential", elapsed, len(paths) / elapsed))
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_batch(source, os.path.join(tmp, "batch"), args["workers"])
+        elapsed = time.perf_counter() - start
+        print("{:<10} {:6.2f} s, {:6.2f} images/sec".format("batch", elapsed, len(paths) / elapsed))
+
+        stats = run_pipeline(paths, os.path.join(tmp, "pipeline"), args["decode_workers"], args["workers"],
+            args["write_workers"], args["queue_size"], report = lambda line: None)
+        print("{:<10} {:6.2f} s, {:6.2f} images/sec".format("pipeline", stats["elapsed"],
+            len(paths) / stats["elapsed"]))
+        for line in format_stats(stats)[1:]:
+            print("  " + line)
+
+        print("same files: batch {}, pipeline {}".format(
+            same_outputs(os.path.join(tmp, "sequential"), os.path.join(tmp, "batch")),
+            same_outputs(os.path.join(tmp, "sequential"), os.path.join(tmp, "pipeline"))))
@@ -0,0 +1,74 @@
+"""
+Benchmark: cost of the profiling hooks, disabled and enabled
+Usage (from the repository root):
+- python -m benchmarks.bench_profiling -s 12
+Approach:
+- per stage: an empty "with stage(name):" block, timed over many runs, with
+  profiling disabled, enabled, and enabled with memory tracking
+- per pipeline: scanner.scan and shapes.shape_table on synthetic inputs
+  (benchmarks.synthetic), best of a few runs in the same three modes
+- the summary table of one profiled scan is printed as an example
+"""
+
+# import the necessary packages
+import argparse
+import time
+
+from benchmarks.synthetic import random_shapes, size_for_megapixels, synthetic_document
+from computer_vision import profiling
+from computer_vision.profiling import stage
+from computer_vision.scanner import scan
+from computer_vision.shapes import shape_table
+
+MODES = (("disabled", None), ("enabled", False), ("memory", True))
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def empty_stages(n):
+    for _ in range(n):
+        with stage("empty"):
+            pass
+
+def in_mode(memory, fn):
+    # run fn with profiling off (memory is None) or on
+    if memory is not None:
+        profiling.enable(memory)
+    try:
+        return fn()
+    finally:
+        profiling.disable()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--megapixels", type=float, default=12, help="image size in megapixels")
+    ap.add_argument("-r", "--repeat", type=int, default=5, help="repetitions, the best one is kept")
+    args = vars(ap.parse_args())
+
+    n = 200000
+    for (mode, memory) in MODES:
+        t = in_mode(memory, lambda: best_of(lambda: empty_stages(n), args["repeat"]))
+        print("{:<9} {:7.0f} ns per stage".format(mode, t / n * 1e9))
+
+    (width, height) = size_for_megapixels(args["megapixels"])
+    (document, _) = synthetic_document(width, height)
+    (shapes, _) = random_shapes(width, height, 2000)
+    print("{}x{} inputs".format(width, height))
+    for (name, fn) in (("scan", lambda: scan(document)), ("shape_table", lambda: shape_table(shapes))):
+        # warm up first, the first run of a pipeline pays for the imports and allocations
+        fn()
+        for (mode, memory) in MODES:
+            t = in_mode(memory, lambda: best_of(fn, args["repeat"]))
+            print("{:<12} {:<9} {:8.1f} ms".format(name, mode, t * 1e3))
+
+    profiler = profiling.enable(True)
+    scan(document)
+    profiling.disable()
+    for line in profiling.format_summary(profiler):
+        print(line)
@@ -0,0 +1,80 @@
+"""
+Benchmark: coarse-to-fine quad detection vs detection at full resolution
+Usage (from the repository root):
+- python -m benchmarks.bench_quad_refine --megapixels 40 -n 3
+Approach:
+- synthetic documents with known corners at the requested size
+- coarse: find_screen_contour on the 500 px high pyramid level, corners scaled by ratio
+- refined: coarse + refine_corners on small full resolution windows
+- full: find_screen_contour on the full resolution image
+- report the time of each and the corner error against the true corners
+  and against the full resolution detection
+"""
+
+# import the necessary packages
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import size_for_megapixels, synthetic_document
+from computer_vision.geometry import order_points
+from computer_vision.scanner import find_screen_contour, pyramid_level, refine_corners
+
+
+def detect(image):
+    quad = find_screen_contour(image)
+    if quad is None:
+        return None
+    return order_points(quad.reshape(4, 2))
+
+def corner_error(a, b):
+    # mean and max distance between matching corners
+    d = np.linalg.norm(np.asarray(a) - np.asarray(b), axis = -1)
+    return (d.mean(), d.max())
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--megapixels", type=float, default=40, help="size of the synthetic documents")
+    ap.add_argument("-n", "--documents", type=int, default=3, help="number of documents")
+    args = vars(ap.parse_args())
+
+    (width, height) = size_for_megapixels(args["megapixels"])
+    rows = []
+    for seed in range(args["documents"]):
+        (image, truth) = synthetic_document(width, height, seed)
+
+        start = time.perf_counter()
+        small = pyramid_level(image, 500)
+        ratio = image.shape[0] / 500.0
+        coarse = detect(small)
+        coarseTime = time.perf_counter() - start
+        if coarse is None:
+            print("seed {}: no quad found on the small copy".format(seed))
+            continue
+        coarse = coarse * ratio
+
+        start = time.perf_counter()
+        refined = refine_corners(image, coarse, ratio)
+        refineTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        full = detect(image)
+        fullTime = time.perf_counter() - start
+
+        rows.append((coarseTime, refineTime, fullTime, corner_error(coarse, truth),
+            corner_error(refined, truth), corner_error(full, truth) if full is not None else (np.nan, np.nan),
+            corner_error(refined, full) if full is not None else (np.nan, np.nan)))
+
+    if not rows:
+        raise SystemExit("no document detected")
+
+    mean = lambda k: np.nanmean([r[k] for r in rows], axis = 0)
+    print("documents:             {} at {}x{} ({:.1f} MP)".format(len(rows), width, height, width * height / 1e6))
+    print("coarse detection:      {:.1f} ms, error vs truth mean {:.2f} px / max {:.2f} px".format(mean(0) * 1e3, *mean(3)))
+    print("coarse + refinement:   {:.1f} ms, error vs truth mean {:.2f} px / max {:.2f} px".format(
+        (mean(0) + mean(1)) * 1e3, *mean(4)))
+    print("full res detection:    {:.1f} ms, error vs truth mean {:.2f} px / max {:.2f} px".format(mean(2) * 1e3, *mean(5)))
+    print("refined vs full res:   mean {:.2f} px / max {:.2f} px".format(*mean(6)))
+    print("time saved:            {:.1f} ms per page ({:.1f}x faster than full res detection)".format(
+        (mean(2) - mean(0) - mean(1)) * 1e3, mean(2) / (mean(0) + mean(1))))
@@ -0,0 +1,121 @@
+"""
+Benchmark: fixed epsilon approxPolyDP vs the adaptive quad search
+Usage (from the repository root):
+- python -m benchmarks.bench_quads -n 40
+Approach:
+- synthetic document photos (benchmarks.synthetic) with known corners, with
+  the defects that used to make the scanner give up drawn over the page:
+  a folded corner, a finger over an edge, a torn edge, an object touching
+  the page
+- the candidates are the 5 largest contours of the 500 px high detection
+  image, binarized at 60, as in scanner.find_screen_contour
+- fixed: the old loop, the first candidate with 4 points at 0.02 * perimeter
+- adaptive: quads.find_quad on the same candidates, the method that resolved
+  the page is counted
+- a page counts as found when every corner is within 2% of the image
+  diagonal of the true one; the time is that of the polygon stage alone
+"""
+
+# import the necessary packages
+import argparse
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import synthetic_document
+from computer_vision.contours import grab_contours
+from computer_vision.geometry import order_points
+from computer_vision.quads import find_quad
+from computer_vision.scanner import pyramid_level
+
+DEFECTS = ("none", "folded corner", "finger", "torn edge", "touching object")
+
+
+def damage(image, corners, defect, rng):
+    # draw defect over the page, in the color of the table
+    table = tuple(int(v) for v in image[2, 2])
+    (tl, tr, br, bl) = corners
+    if defect == "folded corner":
+        # a triangle off one corner, 6 to 12% along both edges
+        (k, t) = (rng.integers(4), rng.uniform(0.06, 0.12))
+        (c, a, b) = (corners[k], corners[(k + 1) % 4], corners[(k + 3) % 4])
+        tri = np.array([c, c + t * (a - c), c + t * (b - c)])
+        cv2.fillPoly(image, [np.round(tri).astype("int32")], table)
+    elif defect == "finger":
+        # a dark ellipse reaching a few % into the page from the middle of an edge
+        (a, b) = [(tl, tr), (tr, br), (br, bl), (bl, tl)][rng.integers(4)]
+        center = (a + b) / 2.0
+        size = np.linalg.norm(b - a)
+        axes = (int(0.04 * size), int(0.1 * size))
+        angle = np.degrees(np.arctan2(*(b - a)[::-1]))
+        cv2.ellipse(image, tuple(int(v) for v in center), axes, angle + 90, 0, 360, (20, 30, 50), -1)
+    elif defect == "torn edge":
+        # a jagged notch along part of the bottom edge
+        (a, b) = (bl, br)
+        inward = (tl - bl) / np.linalg.norm(tl - bl)
+        t = np.linspace(0.3, 0.6, 12)
+        depth = rng.uniform(0.005, 0.03, 12) * np.linalg.norm(tl - bl)
+        pts = [a + ti * (b - a) + di * inward for (ti, di) in zip(t, depth)]
+        pts = [a + 0.3 * (b - a) - 5 * inward] + pts + [a + 0.6 * (b - a) - 5 * inward]
+        cv2.fillPoly(image, [np.round(np.array(pts)).astype("int32")], table)
+    elif defect == "touching object":
+        # a bright card overlapping one side of the page
+        center = (tr + br) / 2.0
+        w = 0.15 * np.linalg.norm(br - bl)
+        cv2.rectangle(image, tuple(int(v) for v in center - (0, w / 2)), tuple(int(v) for v in center + (w, w / 2)),
+            (200, 200, 200), -1)
+    return image
+
+def candidates(image):
+    small = pyramid_level(image, 500)
+    gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+    thresh = cv2.threshold(gray, 60, 255, cv2.THRESH_BINARY)[1]
+    cs = grab_contours(cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE))
+    return (sorted(cs, key = cv2.contourArea, reverse = True)[:5], gray.size, image.shape[0] / 500.0)
+
+def fixed(cnts):
+    for c in cnts:
+        approx = cv2.approxPolyDP(c, 0.02 * cv2.arcLength(c, True), True)
+        if len(approx) == 4:
+            return approx
+    return None
+
+def found(quad, ratio, truth, tolerance):
+    if quad is None:
+        return False
+    return np.linalg.norm(order_points(quad.reshape(4, 2) * ratio) - truth, axis = 1).max() <= tolerance
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=20, help="documents per defect")
+    ap.add_argument("--width", type=int, default=1600, help="image width")
+    ap.add_argument("--height", type=int, default=1200, help="image height")
+    args = vars(ap.parse_args())
+
+    tolerance = 0.02 * np.hypot(args["width"], args["height"])
+    rng = np.random.default_rng(0)
+    print("{}x{} documents, {} per defect, found = corners within {:.0f} px".format(
+        args["width"], args["height"], args["n"], tolerance))
+    for defect in DEFECTS:
+        (fixedFound, adaptiveFound, fixedTime, adaptiveTime, methods) = (0, 0, 0.0, 0.0, Counter())
+        for seed in range(args["n"]):
+            (image, truth) = synthetic_document(args["width"], args["height"], seed)
+            (cnts, size, ratio) = candidates(damage(image, truth, defect, rng))
+
+            start = time.perf_counter()
+            quad = fixed(cnts)
+            fixedTime += time.perf_counter() - start
+            fixedFound += found(quad, ratio, truth, tolerance)
+
+            start = time.perf_counter()
+            (quad, method) = find_quad(cnts, 0.02, min_area = 0.05 * size)
+            adaptiveTime += time.perf_counter() - start
+            adaptiveFound += found(quad, ratio, truth, tolerance)
+            methods[method] += 1
+
+        print("{:<16} found fixed: {:2d}/{}, adaptive: {:2d}/{} ({}), {:.2f} vs {:.2f} ms".format(
+            defect, fixedFound, args["n"], adaptiveFound, args["n"],
+            ", ".join("{} {}".format(m, methods[m]) for m in ("approx", "hull", "bisect", "rect", None) if methods[m]),
+            1e3 * fixedTime / args["n"], 1e3 * adaptiveTime / args["n"]))
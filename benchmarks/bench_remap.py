@@ -0,0 +1,108 @@
+"""
+Benchmark: per frame warpPerspective vs the cached remap tables of a fixed rig
+Usage (from the repository root):
+- python -m benchmarks.bench_remap -n 20
+- python -m benchmarks.bench_remap --width 6000 --height 4500
+Approach:
+- one synthetic document photo (benchmarks.synthetic) stands for every frame
+  of a fixed rig, its known corners are the calibration
+- calibration: building the tables (remap.RemapTable.calibrate), writing the
+  .npz and loading it back, and its size on disk
+- per frame, median of n frames after a warm-up, one OpenCV thread:
+  - color: geometry.four_point_transform (getPerspectiveTransform +
+    warpPerspective) vs RemapTable.warp
+  - gray: bilevel.warp_gray, the warp of scanner.scan_packed, vs
+    RemapTable.warp_gray
+  - scan: scanner.scan_packed with the detection vs with the table
+- the memory the table holds, with the float maps warp_gray adds
+- the warped pages are compared pixel by pixel
+- LRU: RigTables with the default capacity over frames of 3, then 6 rig
+  configurations in turn, the hits, misses (table loads) and evictions
+"""
+
+# import the necessary packages
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import synthetic_document
+from computer_vision.bilevel import warp_gray
+from computer_vision.geometry import four_point_transform
+from computer_vision.remap import DEFAULT_CAPACITY, RemapTable, RigTables
+from computer_vision.scanner import scan_packed
+
+
+def median_ms(fn, n):
+    fn()
+    times = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return 1e3 * float(np.median(times))
+
+def difference(a, b):
+    diff = np.abs(a.astype("int16") - b)
+    return "{:.2%} of the values differ, by {} at most".format(float(np.mean(diff > 0)), int(diff.max()))
+
+def lru(tmp, image, corners, configs, frames):
+    # RigTables stats over frames cycling through configs rigs of one directory
+    directory = os.path.join(tmp, "lru{}".format(configs))
+    rigs = RigTables(directory)
+    for i in range(configs):
+        rigs.calibrate("rig{}".format(i), corners, image.shape)
+    rigs = RigTables(directory)
+    start = time.perf_counter()
+    for i in range(frames):
+        rigs.get("rig{}".format(i % configs)).warp_gray(image)
+    return (rigs.stats(), time.perf_counter() - start)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", "--frames", type=int, default=20, help="timed frames per variant")
+    ap.add_argument("--width", type=int, default=4000, help="frame width")
+    ap.add_argument("--height", type=int, default=3000, help="frame height")
+    args = vars(ap.parse_args())
+    cv2.setNumThreads(1)
+
+    (image, corners) = synthetic_document(args["width"], args["height"])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rig.npz")
+        start = time.perf_counter()
+        table = RemapTable.calibrate(corners, image.shape)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        table.save(path)
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        table = RemapTable.load(path)
+        loaded = time.perf_counter() - start
+        print("{}x{} frames, {}x{} page: tables built in {:.0f} ms, saved in {:.0f} ms, loaded in {:.0f} ms, "
+            "{:.1f} MB on disk".format(args["width"], args["height"], table.size[0], table.size[1], 1e3 * built,
+            1e3 * saved, 1e3 * loaded, os.path.getsize(path) / 2.0 ** 20))
+
+        variants = [
+            ("color", lambda: four_point_transform(image, corners), lambda: table.warp(image)),
+            ("gray", lambda: warp_gray(image, corners), lambda: table.warp_gray(image)),
+            ("scan", lambda: scan_packed(image), lambda: scan_packed(image, table = table)),
+        ]
+        for (name, warped, remapped) in variants:
+            (a, b) = (median_ms(warped, args["frames"]), median_ms(remapped, args["frames"]))
+            print("{:<6} per frame: warpPerspective {:6.1f} ms, remap {:6.1f} ms, {:5.1f} ms ({:.0%}) saved".format(
+                name, a, b, a - b, (a - b) / a))
+
+        print("in memory: {:.1f} MB of fixed point tables, {:.1f} MB more of float maps for the gray warp".format(
+            (table.map1.nbytes + table.map2.nbytes) / 2.0 ** 20,
+            sum(m.nbytes for m in table.float_maps) / 2.0 ** 20))
+        print("color page: " + difference(four_point_transform(image, corners), table.warp(image)))
+        print("gray page:  " + difference(warp_gray(image, corners), table.warp_gray(image)))
+
+        for configs in (3, 6):
+            (stats, elapsed) = lru(tmp, image, corners, configs, 6 * configs)
+            print("LRU of {} tables, {} rigs in turn, {} frames: {} hits, {} misses, {} evictions, {:.1f} ms per "
+                "frame".format(DEFAULT_CAPACITY, configs, 6 * configs, stats["hits"], stats["misses"],
+                stats["evictions"], 1e3 * elapsed / (6 * configs)))
@@ -0,0 +1,166 @@
+"""
+Benchmark: load test of the local scanning service against one process per request
+Usage (from the repository root):
+- python -m benchmarks.bench_service -n 40 -c 1 -c 2 -c 4 -c 8
+- python -m benchmarks.bench_service --endpoint color --unix
+Approach:
+- k synthetic inputs (benchmarks.synthetic) encoded as JPEG: document photos
+  for /scan, color targets for /color (the service gets a style library of one
+  style), shapes for /shapes
+- cold: what a one-off invocation costs, a fresh interpreter per request that
+  imports the package, loads the style library, reads the file and runs the
+  same endpoint function (service.handle) once; the median of a few runs
+- service: scanService.py started in a subprocess (-w workers, any free port
+  or a Unix socket with --unix), its start up time until it serves is
+  reported; then for every concurrency level c, c client threads, each with
+  its own keep-alive connection, send n requests in total as fast as they get
+  answers, after one warm-up request per client
+- per level: throughput, latency percentiles (p50 / p90 / p99 / max) measured
+  by the clients, the mean worker time (X-Worker-Time) and the failures; the
+  latency beyond the worker time is the HTTP round trip plus the time spent
+  queued behind other requests
+"""
+
+# import the necessary packages
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import color_pair, random_shapes, synthetic_document
+from computer_vision.service import connect, request
+from computer_vision.styles import StyleLibrary
+
+COLD = """
+import sys
+from computer_vision.service import handle, init_worker
+init_worker(sys.argv[3] or None, warm = False)
+with open(sys.argv[2], "rb") as f:
+    (status, _, _, _) = handle(sys.argv[1], dict(p.split("=") for p in sys.argv[4:]), f.read())
+assert status == 200, status
+"""
+
+
+def inputs(endpoint, k, width, height):
+    # k JPEG encoded inputs of the endpoint
+    images = []
+    for seed in range(k):
+        if endpoint == "scan":
+            image = synthetic_document(width, height, seed)[0]
+        elif endpoint == "color":
+            image = color_pair(width, height, seed)[1]
+        else:
+            image = random_shapes(width, height, seed = seed)[0]
+        images.append(cv2.imencode(".jpg", image)[1].tobytes())
+    return images
+
+def cold(endpoint, params, body, styles, runs, tmp):
+    path = os.path.join(tmp, "input.jpg")
+    with open(path, "wb") as f:
+        f.write(body)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", COLD, endpoint, path, styles or ""] +
+            ["{}={}".format(*p) for p in params.items()], check = True)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+def start_service(args, styles, tmp):
+    # (process, address, seconds until it served) of a scanService.py subprocess
+    command = [sys.executable, "scanService.py", "-w", str(args["workers"])]
+    if args["unix"]:
+        command += ["--unix", os.path.join(tmp, "scan.sock")]
+    else:
+        command += ["--port", "0"]
+    if styles is not None:
+        command += ["--styles", styles]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout = subprocess.PIPE, text = True)
+    line = process.stdout.readline()
+    if not line.startswith("serving on "):
+        process.kill()
+        raise SystemExit("the service did not start")
+    return (process, line.split()[2], time.perf_counter() - start)
+
+def load(address, endpoint, params, images, clients, n):
+    # (latencies, worker times, failures, wall time) of n requests from clients threads
+    lock = threading.Lock()
+    (latencies, workerTimes, failures, next_request) = ([], [], [0], [0])
+
+    def client(ready):
+        connection = connect(address)
+        request(connection, endpoint, images[0], **params)
+        ready.wait()
+        while True:
+            with lock:
+                i = next_request[0]
+                next_request[0] += 1
+            if i >= n:
+                break
+            start = time.perf_counter()
+            (status, headers, _) = request(connection, endpoint, images[i % len(images)], **params)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                workerTimes.append(float(headers.get("X-Worker-Time", 0)))
+                failures[0] += status != 200
+        connection.close()
+
+    ready = threading.Barrier(clients + 1)
+    threads = [threading.Thread(target = client, args = (ready,)) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return (np.array(latencies), np.array(workerTimes), failures[0], time.perf_counter() - start)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-e", "--endpoint", default="scan", choices=["scan", "color", "shapes"], help="endpoint to load")
+    ap.add_argument("-n", "--requests", type=int, default=40, help="requests per concurrency level")
+    ap.add_argument("-c", "--concurrency", type=int, action="append", help="concurrent clients (repeatable)")
+    ap.add_argument("-k", "--images", type=int, default=4, help="distinct input images")
+    ap.add_argument("--width", type=int, default=1600, help="image width")
+    ap.add_argument("--height", type=int, default=1200, help="image height")
+    ap.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="worker processes of the service")
+    ap.add_argument("--cold", type=int, default=5, help="runs of the one process per request baseline")
+    ap.add_argument("--unix", action="store_true", help="talk to the service over a Unix socket")
+    args = vars(ap.parse_args())
+    levels = args["concurrency"] or [1, 2, 4, 8]
+
+    images = inputs(args["endpoint"], args["images"], args["width"], args["height"])
+    with tempfile.TemporaryDirectory() as tmp:
+        (styles, params) = (None, {})
+        if args["endpoint"] == "color":
+            styles = os.path.join(tmp, "styles.npz")
+            StyleLibrary().add("warm", color_pair(640, 480)[0]).save(styles)
+            params = {"style": "warm"}
+
+        if args["cold"] > 0:
+            coldTime = cold(args["endpoint"], params, images[0], styles, args["cold"], tmp)
+            print("cold, one process per request: {:7.1f} ms".format(1e3 * coldTime))
+
+        (process, address, startup) = start_service(args, styles, tmp)
+        try:
+            print("service on {}, {} workers, serving after {:.2f} s".format(address, args["workers"], startup))
+            print("/{} of {}x{} JPEG images, {} requests per level".format(args["endpoint"], args["width"],
+                args["height"], args["requests"]))
+            for clients in levels:
+                (latencies, workerTimes, failures, wall) = load(address, args["endpoint"], params, images, clients,
+                    args["requests"])
+                (p50, p90, p99) = np.percentile(latencies, [50, 90, 99])
+                print("c={:<3} {:6.1f} req/s  p50 {:7.1f}  p90 {:7.1f}  p99 {:7.1f}  max {:7.1f} ms  "
+                    "worker {:6.1f} ms  failed {}".format(clients, len(latencies) / wall, 1e3 * p50, 1e3 * p90,
+                    1e3 * p99, 1e3 * latencies.max(), 1e3 * workerTimes.mean(), failures))
+        finally:
+            process.terminate()
+            process.wait()
@@ -0,0 +1,65 @@
+"""
+Benchmark: per-contour shape analysis vs the connected component table
+Usage (from the repository root):
+- python -m benchmarks.bench_shapes -n 10000
+Approach:
+- draw n non touching shapes with known centers (benchmarks.synthetic)
+- legacy: detect_shapes (findContours + one cv2.moments call per shape),
+  then draw_shapes, the way shapeDetection.py used to run
+- contours / components: shape_table with either method, and draw_table as
+  the optional extra stage
+- report the best of a few runs and the largest centroid error against the
+  ground truth for each
+"""
+
+# import the necessary packages
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import random_shapes
+from computer_vision.shapes import detect_shapes, draw_shapes, draw_table, shape_table
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return (min(times), result)
+
+def centroid_error(found, truth, chunk = 1000):
+    # distance from every true center to the nearest found one, in chunks to bound memory
+    found = np.asarray(found, dtype = "float64")
+    if len(found) != len(truth):
+        return float("inf")
+    worst = 0.0
+    for i in range(0, len(truth), chunk):
+        d = np.linalg.norm(truth[i:i + chunk, None, :] - found[None, :, :], axis = 2)
+        worst = max(worst, float(d.min(axis = 1).max()))
+    return worst
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=10000, help="number of shapes")
+    ap.add_argument("--width", type=int, default=4000, help="image width")
+    ap.add_argument("--height", type=int, default=3000, help="image height")
+    ap.add_argument("-r", "--repeat", type=int, default=3, help="repetitions, the best one is kept")
+    args = vars(ap.parse_args())
+
+    (image, truth) = random_shapes(args["width"], args["height"], args["n"])
+    print("{} shapes on a {}x{} image".format(len(truth), args["width"], args["height"]))
+
+    (t, (cnts, centers)) = best_of(lambda: detect_shapes(image), args["repeat"])
+    (d, _) = best_of(lambda: draw_shapes(image.copy(), cnts, centers), args["repeat"])
+    print("{:<10}{:8.1f} ms analysis, {:8.1f} ms drawing, max centroid error {:.2f} px".format(
+        "legacy:", t * 1e3, d * 1e3, centroid_error(centers, truth)))
+
+    for method in ("contours", "components"):
+        (t, table) = best_of(lambda: shape_table(image, method = method), args["repeat"])
+        (d, _) = best_of(lambda: draw_table(image.copy(), table), args["repeat"])
+        found = np.stack([table["x"], table["y"]], axis = 1)
+        print("{:<10}{:8.1f} ms analysis, {:8.1f} ms drawing, max centroid error {:.2f} px".format(
+            method + ":", t * 1e3, d * 1e3, centroid_error(found, truth)))
@@ -0,0 +1,71 @@
+"""
+Benchmark: sorting and top-k selection of many contours
+Usage (from the repository root):
+- python -m benchmarks.bench_sort -n 100000
+Approach:
+- n small random convex polygons laid out on a jittered grid, standing in for
+  the contours of a dense form or particle image
+- legacy: a list of cv2.boundingRect tuples sorted with sorted(zip(...)), and
+  sorted(cnts, key=cv2.contourArea)[:k] for the largest ones
+- numpy: computer_vision.contours.sort_contours (boxes from one reduceat pass,
+  stable argsort) and top_k(contour_areas(cnts), k)
+- the two orders are checked to be identical, reading-order is timed on its own
+- the split between building the (N, 4) boxes / areas from the list of
+  contours and the sort / selection on the arrays is reported too: the
+  former is bounded by the per-array overhead of the contour list
+"""
+
+# import the necessary packages
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import random_contours
+from computer_vision.contours import bounding_boxes, contour_areas, sort_contours, sort_order, top_k
+
+
+def legacy_sort(cnts, i, reverse):
+    boundingBoxes = [cv2.boundingRect(c) for c in cnts]
+    return zip(*sorted(zip(cnts, boundingBoxes), key=lambda b:b[1][i], reverse=reverse))
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return (min(times), result)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=100000, help="number of contours")
+    ap.add_argument("-k", type=int, default=5, help="number of largest contours to keep")
+    ap.add_argument("-r", "--repeat", type=int, default=3, help="repetitions, the best one is kept")
+    args = vars(ap.parse_args())
+
+    cnts = random_contours(args["n"])
+    print("{} contours".format(len(cnts)))
+
+    for (method, i, reverse) in [("left-to-right", 0, False), ("bottom-to-top", 1, True)]:
+        (tl, (_, legacyBoxes)) = best_of(lambda: tuple(legacy_sort(cnts, i, reverse)), args["repeat"])
+        (tn, (_, boxes)) = best_of(lambda: sort_contours(cnts, method), args["repeat"])
+        same = np.array_equal(np.array(legacyBoxes), boxes)
+        print("{:<14} legacy {:8.1f} ms, numpy {:8.1f} ms, same order: {}".format(method, tl * 1e3, tn * 1e3, same))
+
+    (tb, boxes) = best_of(lambda: bounding_boxes(cnts), args["repeat"])
+    print("{:<14} numpy {:8.1f} ms".format("boxes", tb * 1e3))
+    for method in ("left-to-right", "reading-order"):
+        (tn, _) = best_of(lambda: sort_order(boxes, method), args["repeat"])
+        print("{:<14} numpy {:8.1f} ms on the boxes".format(method, tn * 1e3))
+
+    k = args["k"]
+    (tl, legacy) = best_of(lambda: sorted(cnts, key=cv2.contourArea, reverse=True)[:k], args["repeat"])
+    (tn, idx) = best_of(lambda: top_k(contour_areas(cnts), k), args["repeat"])
+    same = [cv2.contourArea(c) for c in legacy] == [cv2.contourArea(cnts[j]) for j in idx]
+    print("{:<14} legacy {:8.1f} ms, numpy {:8.1f} ms, same areas: {}".format("top-{}".format(k), tl * 1e3, tn * 1e3, same))
+
+    areas = contour_areas(cnts)
+    (tn, _) = best_of(lambda: top_k(areas, k), args["repeat"])
+    print("{:<14} numpy {:8.1f} ms on the areas".format("top-{}".format(k), tn * 1e3))
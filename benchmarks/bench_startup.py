@@ -0,0 +1,70 @@
+"""
+Benchmark: cold start of the package and of the command line scripts
+Usage (from the repository root):
+- python -m benchmarks.bench_startup
+- python -m benchmarks.bench_startup -r 10
+Approach:
+- every measurement runs in a fresh interpreter, so nothing is cached in
+  sys.modules (the OS file cache is warm after the first run, which is also
+  the case for a user running a script twice)
+- imports: wall time of the import statement alone, from inside the child
+- scripts: wall time of the whole "python script.py --help" process, which is
+  what a user waits for when the arguments are wrong
+- the median of a few runs is reported
+"""
+
+# import the necessary packages
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORTS = [
+    "import computer_vision",
+    "import computer_vision.geometry",
+    "import computer_vision.threshold",
+    "import computer_vision.scanner",
+    "import computer_vision.color",
+    "import computer_vision.styles",
+    "import computer_vision.contours",
+    "import cv2",
+]
+
+SCRIPTS = [
+    "docScannerOptimized.py",
+    "documentScanner.py",
+    "colorTransfer.py",
+    "colorTransferVideo.py",
+    "styleLibrary.py",
+    "shapeDetection.py",
+    "sortingContours.py",
+    "scanService.py",
+]
+
+
+def import_time(statement):
+    code = "import time; t = time.perf_counter(); {}; print(time.perf_counter() - t)".format(statement)
+    return float(subprocess.check_output([sys.executable, "-c", code]))
+
+def help_time(script):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, script, "--help"], stdout = subprocess.DEVNULL, check = True)
+    return time.perf_counter() - start
+
+def median_ms(fn, arg, repeat):
+    return statistics.median(fn(arg) for _ in range(repeat)) * 1e3
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-r", "--repeat", type=int, default=5, help="runs per measurement, the median is kept")
+    args = vars(ap.parse_args())
+
+    print("{:<40} {:>8}".format("import", "ms"))
+    for statement in IMPORTS:
+        print("{:<40} {:>8.1f}".format(statement, median_ms(import_time, statement, args["repeat"])))
+
+    print()
+    print("{:<40} {:>8}".format("script --help", "ms"))
+    for script in SCRIPTS:
+        print("{:<40} {:>8.1f}".format(script, median_ms(help_time, script, args["repeat"])))
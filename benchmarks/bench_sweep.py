@@ -0,0 +1,97 @@
+"""
+Benchmark: fixed threshold 60 vs the automatic threshold sweep
+Usage (from the repository root):
+- python -m benchmarks.bench_sweep -s 4
+Approach:
+- synthetic document photos (benchmarks.synthetic) under different conditions:
+  the usual dark table, brighter tables, and a dim (underexposed) shot where
+  the page itself ends up darker than 60
+- fixed: scanner.detect_corners at threshold 60
+- auto: scanner.detection_threshold (the histogram pruned, coarse to fine
+  sweep), then detect_corners at the threshold it picked
+- exhaustive: sweep.quad_score at every threshold of the same detection image
+  that leaves 5% to 95% of it as foreground (the bounds the sweep uses), i.e.
+  one findContours per threshold
+- a detection counts as found when every corner is within 1% of the image
+  diagonal of the true one
+"""
+
+# import the necessary packages
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import size_for_megapixels, synthetic_document
+from computer_vision.geometry import order_points
+from computer_vision.scanner import detect_corners, detection_threshold, pyramid_level
+from computer_vision.sweep import quad_score
+
+# (name, table gray level, brightness scale of the whole photo)
+CONDITIONS = [
+    ("dark table", 35, 1.0),
+    ("gray table", 70, 1.0),
+    ("light table", 120, 1.0),
+    ("lighter table", 160, 1.0),
+    ("dim", 35, 0.22),
+]
+
+
+def corner_error(orig, threshold, truth):
+    # largest corner distance in px, inf when no quad is found
+    try:
+        (pts, _, _) = detect_corners(orig, True, threshold)
+    except ValueError:
+        return float("inf")
+    return float(np.linalg.norm(order_points(pts) - truth, axis = 1).max())
+
+def exhaustive(orig):
+    # (thresholds within 2% of the best quad_score, number evaluated) on the detection image
+    small = pyramid_level(orig, 500)
+    blur = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+    # the same bounds on the foreground as the sweep, the whole frame is not a document
+    above = (blur.size - np.cumsum(cv2.calcHist([blur], [0], None, [256], [0, 256]).ravel())) / blur.size
+    levels = np.flatnonzero((above >= 0.05) & (above <= 0.95))
+    scores = np.zeros(256)
+    for t in levels:
+        scores[t] = quad_score(cv2.threshold(blur, int(t), 255, cv2.THRESH_BINARY)[1])[0]
+    # range of thresholds within 2% of the best score
+    good = np.flatnonzero(scores >= 0.98 * scores.max()) if scores.max() > 0 else []
+    return (good, len(levels))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--megapixels", type=float, default=4, help="image size in megapixels")
+    ap.add_argument("-n", type=int, default=3, help="documents per condition")
+    args = vars(ap.parse_args())
+
+    (width, height) = size_for_megapixels(args["megapixels"])
+    tolerance = 0.01 * np.hypot(width, height)
+    print("{}x{} documents, {} per condition, found = corners within {:.0f} px".format(
+        width, height, args["n"], tolerance))
+
+    for (name, table, scale) in CONDITIONS:
+        (fixed, auto, stats, full, counted, inside) = (0, 0, [], [], [], 0)
+        for seed in range(args["n"]):
+            (orig, truth) = synthetic_document(width, height, seed, table = table)
+            if scale != 1.0:
+                orig = cv2.convertScaleAbs(orig, alpha = scale)
+
+            fixed += corner_error(orig, 60, truth) <= tolerance
+            (threshold, s) = detection_threshold(orig)
+            stats.append(s)
+            if threshold is not None:
+                auto += corner_error(orig, threshold, truth) <= tolerance
+
+            start = time.perf_counter()
+            (good, evaluated) = exhaustive(orig)
+            full.append(time.perf_counter() - start)
+            counted.append(evaluated)
+            inside += threshold is not None and threshold in good
+
+        print("{:<14} found fixed 60: {}/{}, auto: {}/{}, auto inside the exhaustive best range: {}/{}".format(
+            name, fixed, args["n"], auto, args["n"], inside, args["n"]))
+        print("{:<14} auto: {:.0f} candidate levels, {:.0f} evaluated, {:.1f} ms; exhaustive: {:.0f} evaluated, {:.1f} ms".format(
+            "", np.mean([s["candidates"] for s in stats]), np.mean([s["evaluated"] for s in stats]),
+            1e3 * np.mean([s["elapsed"] for s in stats]), np.mean(counted), 1e3 * np.mean(full)))
@@ -0,0 +1,80 @@
+"""
+Benchmark: opencv vs skimage local threshold on large warps
+Usage (from the repository root):
+- python -m benchmarks.bench_threshold --width 4000 --height 5600
+Approach:
+- render a text page at the requested size with some noise and blur,
+  standing in for a full resolution warp
+- time computer_vision.threshold.binarize with both backends (best of a few runs)
+- report the fraction of pixels that differ against BINARIZE_TOLERANCE, the
+  benchmark exits with an error when it is exceeded
+- report the extra cold import time of skimage's threshold_local on top of cv2,
+  measured in a fresh interpreter
+"""
+
+# import the necessary packages
+import argparse
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from computer_vision.threshold import BINARIZE_TOLERANCE, binarize
+
+
+def synthetic_warp(width, height, seed = 0):
+    # light paper, dark text lines, sensor noise and a soft lighting gradient
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width), 225, dtype = "uint8")
+    scale = max(width, height) / 1500.0
+    step = int(40 * scale)
+    for (j, y) in enumerate(range(step, height - step, step)):
+        cv2.putText(page, "total {} item {:05d} tax".format(j, j * 37), (step, y),
+            cv2.FONT_HERSHEY_SIMPLEX, scale, 25, max(1, int(2 * scale)))
+    gradient = np.linspace(0, 40, width, dtype = "float32")[None, :]
+    page = np.clip(page - gradient + rng.normal(0, 6, page.shape), 0, 255).astype("uint8")
+    return cv2.GaussianBlur(page, (0, 0), 1.0)
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return (min(times), result)
+
+def import_time(statement):
+    # cv2 is imported first, the scanners pay for it either way
+    code = "import time, cv2; t = time.perf_counter(); {}; print(time.perf_counter() - t)".format(statement)
+    return float(subprocess.check_output([sys.executable, "-c", code]))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--width", type=int, default=4000, help="warp width")
+    ap.add_argument("--height", type=int, default=5600, help="warp height")
+    ap.add_argument("-m", "--method", default="gaussian", choices=["gaussian", "mean"], help="threshold method")
+    ap.add_argument("-r", "--repeat", type=int, default=3, help="repetitions, the best one is kept")
+    args = vars(ap.parse_args())
+
+    warp = synthetic_warp(args["width"], args["height"])
+    run = lambda backend: binarize(warp, 51, offset = 10, method = args["method"], backend = backend)
+
+    (fast_time, fast) = best_of(lambda: run("opencv"), args["repeat"])
+    (ref_time, ref) = best_of(lambda: run("skimage"), args["repeat"])
+    mismatch = np.count_nonzero(fast != ref) / fast.size
+
+    print("warp:            {}x{} ({:.1f} MP), method={}".format(
+        args["width"], args["height"], warp.size / 1e6, args["method"]))
+    print("skimage:         {:.1f} ms".format(ref_time * 1e3))
+    print("opencv:          {:.1f} ms".format(fast_time * 1e3))
+    print("speedup:         {:.1f}x".format(ref_time / fast_time))
+    print("mismatch:        {:.6%} (tolerance {:.4%}) {}".format(
+        mismatch, BINARIZE_TOLERANCE, "ok" if mismatch <= BINARIZE_TOLERANCE else "FAIL"))
+    print("import:          skimage {:.0f} ms, computer_vision.threshold {:.0f} ms".format(
+        import_time("from skimage.filters import threshold_local") * 1e3,
+        import_time("import computer_vision.threshold") * 1e3))
+    if mismatch > BINARIZE_TOLERANCE:
+        raise SystemExit("the opencv backend flips {:.6%} of the pixels, more than the tolerance of {:.4%}".format(
+            mismatch, BINARIZE_TOLERANCE))
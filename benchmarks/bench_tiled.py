@@ -0,0 +1,71 @@
+"""
+Benchmark: whole page vs tiled warp + threshold on very large scans
+Usage (from the repository root):
+- python -m benchmarks.bench_tiled -s 100
+- python -m benchmarks.bench_tiled -s 40 --backend skimage --budget 64
+Approach:
+- a synthetic document photo of the requested size (benchmarks.synthetic),
+  built once and saved as .npy
+- every variant runs in its own fresh worker process, so that the peak RSS of
+  one does not hide the other; the process loads the input and the RSS right
+  after that is reported too, the difference is what the scan itself added
+- whole: computer_vision.scanner.scan, the full warp in memory, then np.save
+- tiled: scan_tiled with the given memory budget, strips streamed into a .npy file
+- the two outputs are compared pixel by pixel
+"""
+
+# import the necessary packages
+import argparse
+import os
+import tempfile
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from benchmarks.synthetic import size_for_megapixels, synthetic_document
+from computer_vision.scanner import scan, scan_tiled
+from computer_vision.tiled import peak_rss_mb
+
+
+def run_variant(job):
+    (variant, source, backend, budget, output) = job
+    orig = np.load(source)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    if variant == "whole":
+        (warped, _, _) = scan(orig, backend)
+        np.save(output, warped)
+    else:
+        scan_tiled(orig, output, budget, backend)
+    elapsed = time.perf_counter() - start
+
+    return (elapsed, baseline, peak_rss_mb())
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--megapixels", type=float, default=100, help="source image size in megapixels")
+    ap.add_argument("--backend", default="opencv", choices=["opencv", "skimage"], help="local threshold backend")
+    ap.add_argument("--budget", type=float, default=256, help="memory budget of the tiled variant in MB")
+    args = vars(ap.parse_args())
+
+    print("{:.0f} MP source, {} backend, {:.0f} MB budget".format(args["megapixels"], args["backend"], args["budget"]))
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.npy")
+        (width, height) = size_for_megapixels(args["megapixels"])
+        np.save(source, synthetic_document(width, height)[0])
+
+        outputs = {}
+        for variant in ("whole", "tiled"):
+            outputs[variant] = os.path.join(tmp, variant + ".npy")
+            job = (variant, source, args["backend"], args["budget"], outputs[variant])
+            with Pool(1, maxtasksperchild = 1) as pool:
+                (elapsed, baseline, peak) = pool.apply(run_variant, (job,))
+            print("{:<6} {:8.2f} s, peak RSS {:7.0f} MB ({:7.0f} MB over the input)".format(
+                variant, elapsed, peak, peak - baseline))
+
+        whole = np.load(outputs["whole"], mmap_mode = "r")
+        tiled = np.load(outputs["tiled"], mmap_mode = "r")
+        print("output {}x{}, differing pixels: {:.2e}".format(
+            whole.shape[1], whole.shape[0], float(np.mean(whole != tiled)) if whole.shape == tiled.shape else 1.0))
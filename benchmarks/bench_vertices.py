@@ -0,0 +1,78 @@
+"""
+Benchmark: polygon vertices of many contours, annotated list vs CSR table
+Usage (from the repository root):
+- python -m benchmarks.bench_vertices -n 100000
+Approach:
+- n contours from benchmarks.synthetic.random_contours on a blank canvas
+- legacy: the getCoordinates loop of vertexCoordFromContour.py before the
+  table existed (ravel, i % 2, tuples, a label string and putText per vertex)
+- table: computer_vision.vertices.polygon_table, then write_vertices to
+  .npz and .ndjson, and annotate_vertices as the optional extra pass
+- the vertices of both are checked to be identical
+"""
+
+# import the necessary packages
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import random_contours
+from computer_vision.vertices import annotate_vertices, polygon_table, write_vertices
+
+
+def legacy_coordinates(image, cs):
+    vertices = []
+    for c in cs :
+        approx = cv2.approxPolyDP(c, 0.009 * cv2.arcLength(c, True), True)
+        cv2.drawContours(image, [approx], 0, (0, 0, 255), 5)
+        n = approx.ravel()
+        for i in range(len(n)) :
+            if(i % 2 == 0):
+                x = n[i]
+                y = n[i + 1]
+                vertices.append((x, y))
+                coord = str(x) + " " + str(y)
+                if(i == 0):
+                    cv2.putText(image, "Arrow tip", (x, y), cv2.FONT_HERSHEY_COMPLEX, 0.5, (255, 0, 0))
+                else:
+                    cv2.putText(image, coord, (x, y), cv2.FONT_HERSHEY_COMPLEX, 0.5, (0, 255, 0))
+    return vertices
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return (min(times), result)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=100000, help="number of contours")
+    ap.add_argument("-r", "--repeat", type=int, default=3, help="repetitions, the best one is kept")
+    args = vars(ap.parse_args())
+
+    cs = random_contours(args["n"])
+    (width, height) = (int(np.ceil(np.sqrt(args["n"]))) * 40 + 40, int(np.ceil(np.sqrt(args["n"]))) * 30 + 30)
+    canvas = np.zeros((height, width, 3), dtype = "uint8")
+    print("{} contours on a {}x{} canvas".format(len(cs), width, height))
+
+    (t, legacy) = best_of(lambda: legacy_coordinates(canvas.copy(), cs), args["repeat"])
+    print("{:<22} {:8.1f} ms".format("legacy (annotated)", t * 1e3))
+
+    (t, (vertices, offsets)) = best_of(lambda: polygon_table(cs), args["repeat"])
+    same = np.array_equal(np.array(legacy, dtype = "int32").reshape(-1, 2), vertices)
+    print("{:<22} {:8.1f} ms, {} vertices, same as legacy: {}".format("table", t * 1e3, len(vertices), same))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for ext in (".npz", ".ndjson"):
+            path = os.path.join(tmp, "vertices" + ext)
+            (t, _) = best_of(lambda: write_vertices(path, vertices, offsets), args["repeat"])
+            print("{:<22} {:8.1f} ms, {:.1f} MB".format("write " + ext, t * 1e3, os.path.getsize(path) / 1e6))
+
+    (t, _) = best_of(lambda: annotate_vertices(canvas.copy(), vertices, offsets), args["repeat"])
+    print("{:<22} {:8.1f} ms".format("annotate (optional)", t * 1e3))
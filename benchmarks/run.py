@@ -0,0 +1,269 @@
+"""
+Benchmark suite: every pipeline of the repository on synthetic inputs
+Usage (from the repository root):
+- python -m benchmarks.run                                  # all pipelines, default sizes
+- python -m benchmarks.run -p shapeDetection -p colorTransfer -s 0.5 -s 50
+- python -m benchmarks.run -o report.json --baseline last_release.json
+Approach:
+- every pipeline is run headless, the way its script runs it, on inputs from
+  benchmarks.synthetic whose ground truth is known (document corners, number of
+  shapes, arrow tips)
+- every (pipeline, size) case runs in its own fresh worker process so that the
+  peak memory of one case does not leak into the next one
+- latency: best / median / mean of a few timed runs after one warm-up run
+- throughput: megapixels/sec and images/sec from the median latency
+- peak memory: the largest amount of memory allocated by Python, NumPy and the
+  arrays OpenCV returns during one extra run (tracemalloc, the timed runs are
+  not traced), and the peak RSS of the worker process (tiled.peak_rss_mb,
+  null where it cannot be read, e.g. on Windows)
+- a ground truth check per case, so a fast but wrong result does not go unnoticed
+- the report is a JSON file, --baseline compares the median latencies with an
+  older report and exits with 1 when a case got slower than --tolerance allows
+"""
+
+# import the necessary packages
+import argparse
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+
+from benchmarks import synthetic
+from computer_vision import color, contours, extreme, scanner, shapes, vertices
+from computer_vision.geometry import order_points
+from computer_vision.tiled import peak_rss_mb
+
+DEFAULT_SIZES = (0.5, 2, 8, 20, 50)
+
+
+def corner_error(found, truth):
+    # largest distance between matching corners, found is already ordered
+    return float(np.linalg.norm(np.asarray(found, dtype = "float64") - truth, axis = 1).max())
+
+# every pipeline: make(width, height, seed) -> (args, truth),
+# run(*args) -> result and check(result, truth) -> dict of checks
+
+def make_document(width, height, seed):
+    (image, corners) = synthetic.synthetic_document(width, height, seed)
+    return ((image,), corners)
+
+def run_doc_scanner_optimized(image):
+    return scanner.scan(image)
+
+def check_doc_scanner_optimized(result, truth):
+    (warped, screenCnt, ratio) = result
+    error = corner_error(order_points(screenCnt.reshape(4, 2) * ratio), truth)
+    # the contour comes out of a 500 px high copy, allow a few of its pixels
+    return dict(ok = error < 4 * ratio, corner_error_px = error, output_shape = list(warped.shape))
+
+def run_document_scanner(image):
+    # the script scans a 700 px wide copy
+    small = cv2.resize(image, (700, int(image.shape[0] * 700 / image.shape[1])), interpolation = cv2.INTER_AREA)
+    return (scanner.scan_largest_contour(small), image.shape[1] / 700.0)
+
+def check_document_scanner(result, truth):
+    ((warped, ordered), ratio) = result
+    error = corner_error(ordered * ratio, truth)
+    # the vertices come out of a 700 px wide copy, allow a few of its pixels
+    return dict(ok = error < 4 * ratio, corner_error_px = error)
+
+def make_shapes(width, height, seed):
+    (image, centers) = synthetic.random_shapes(width, height, 50, seed)
+    return ((image,), centers)
+
+def run_shapes(image):
+    return shapes.detect_shapes(image)
+
+def check_shapes(result, truth):
+    (cnts, centers) = result
+    return dict(ok = len(cnts) == len(truth), found = len(cnts), expected = len(truth))
+
+def make_particles(width, height, seed):
+    # one small shape per ~40x40 px cell, thousands of them on large images
+    n = max(50, width * height // 1600)
+    (image, centers) = synthetic.random_shapes(width, height, n, seed)
+    return ((image,), centers)
+
+def run_shape_table(image):
+    return shapes.shape_table(image)
+
+def check_shape_table(result, truth):
+    return dict(ok = len(result) == len(truth), found = len(result), expected = len(truth))
+
+def make_objects(width, height, seed):
+    (image, centers, boxes, areas) = synthetic.random_shapes(width, height, 12, seed, extents = True)
+    return ((image,), (centers, boxes, areas))
+
+def run_sorting(image):
+    cnts = contours.largest_contours(contours.edge_map(image))
+    return contours.sort_contours(cnts, method = "top-to-bottom")
+
+def check_sorting(result, truth):
+    (_, boxes) = result
+    ys = [b[1] for b in boxes]
+    return dict(ok = len(boxes) == min(5, len(truth[0])) and ys == sorted(ys), found = len(boxes))
+
+def run_extreme_points(image):
+    return extreme.extreme_points(image)
+
+def check_extreme_points(result, truth):
+    # the points bound the largest shape: left x, top y, right x and bottom y
+    # within a few pixels of its drawn box (shapes of equal size may swap)
+    (c, (extLeft, extRight, extTop, extBot)) = result
+    (_, boxes, areas) = truth
+    found = np.array([extLeft[0], extTop[1], extRight[0], extBot[1]], dtype = "float64")
+    errors = np.abs(boxes - found).max(axis = 1)
+    largest = areas >= 0.95 * areas.max()
+    error = float(errors[largest].min())
+    return dict(ok = error <= 3, extent_error_px = error)
+
+def run_all_extreme_points(image):
+    return extreme.all_extreme_points(extreme.object_contours(image))
+
+def check_all_extreme_points(result, truth):
+    # every object found, and its left / right points bracket its top / bottom ones
+    ordered = (result[:, 0, 0] <= result[:, 2, 0]) & (result[:, 2, 0] <= result[:, 1, 0])
+    return dict(ok = len(result) == len(truth) and bool(ordered.all()), found = len(result), expected = len(truth))
+
+def make_arrows(width, height, seed):
+    (image, tips) = synthetic.arrows(width, height, 12, seed)
+    return ((image,), tips)
+
+def run_vertices(image):
+    cs = contours.find_contours(image)
+    # getCoordinates draws on the image, keep the input untouched between runs
+    return vertices.getCoordinates(image.copy(), cs)
+
+def check_vertices(result, truth):
+    found = {tuple(int(v) for v in p) for p in result}
+    hits = sum(1 for tip in truth if any(abs(x - tip[0]) <= 2 and abs(y - tip[1]) <= 2 for (x, y) in found))
+    return dict(ok = hits == len(truth), tips_found = hits, expected = len(truth))
+
+def make_colors(width, height, seed):
+    (source, target) = synthetic.color_pair(width, height, seed)
+    return ((source, target), color.lab_stats(source))
+
+def run_color_transfer(source, target):
+    return color.color_transfer(source, target)
+
+def check_color_transfer(result, truth):
+    # the transfer should bring the target means close to the source means
+    stats = color.lab_stats(result)
+    error = max(abs(stats[k] - truth[k]) for k in (0, 2, 4))
+    return dict(ok = error < 10, mean_error = float(error))
+
+PIPELINES = {
+    "docScannerOptimized": (make_document, run_doc_scanner_optimized, check_doc_scanner_optimized),
+    "documentScanner": (make_document, run_document_scanner, check_document_scanner),
+    "shapeDetection": (make_shapes, run_shapes, check_shapes),
+    "shapeTable": (make_particles, run_shape_table, check_shape_table),
+    "sortingContours": (make_objects, run_sorting, check_sorting),
+    "extremePointDetection": (make_objects, run_extreme_points, check_extreme_points),
+    "extremePointsAll": (make_particles, run_all_extreme_points, check_all_extreme_points),
+    "vertexCoordFromContour": (make_arrows, run_vertices, check_vertices),
+    "colorTransfer": (make_colors, run_color_transfer, check_color_transfer),
+}
+
+def run_case(case):
+    (name, megapixels, repeat, seed) = case
+    (make, run, check) = PIPELINES[name]
+    (width, height) = synthetic.size_for_megapixels(megapixels)
+    (args, truth) = make(width, height, seed)
+    gc.collect()
+
+    try:
+        # warm-up, then the timed runs
+        result = run(*args)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run(*args)
+            times.append(time.perf_counter() - start)
+
+        # one more run to measure the allocations
+        tracemalloc.start()
+        run(*args)
+        (_, peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # NumPy scalars are not JSON serializable
+        checks = {k: (v.item() if isinstance(v, np.generic) else v) for (k, v) in check(result, truth).items()}
+        error = None
+    except Exception as e:
+        (times, peak, checks, error) = ([], 0, dict(ok = False), "{}: {}".format(type(e).__name__, e))
+
+    row = dict(pipeline = name, megapixels = megapixels, width = width, height = height,
+        repeat = repeat, error = error, check = checks, max_rss_mb = peak_rss_mb())
+    if times:
+        median = float(np.median(times))
+        row.update(latency_ms = dict(best = min(times) * 1e3, median = median * 1e3, mean = float(np.mean(times)) * 1e3),
+            throughput_mp_s = width * height / 1e6 / median, images_s = 1.0 / median,
+            peak_traced_mb = peak / (1024.0 * 1024.0))
+    return row
+
+def environment():
+    return dict(python = platform.python_version(), numpy = np.__version__, opencv = cv2.__version__,
+        platform = platform.platform(), machine = platform.machine(), cpus = os.cpu_count(),
+        opencv_threads = cv2.getNumThreads(), time = time.strftime("%Y-%m-%dT%H:%M:%S"))
+
+def compare(rows, baseline, tolerance):
+    # cases whose median latency grew by more than tolerance (0.2 = 20%)
+    old = {(r["pipeline"], r["megapixels"]): r for r in baseline["results"] if "latency_ms" in r}
+    regressions = []
+    for r in rows:
+        prev = old.get((r["pipeline"], r["megapixels"]))
+        if prev is None or "latency_ms" not in r:
+            continue
+        ratio = r["latency_ms"]["median"] / prev["latency_ms"]["median"]
+        if ratio > 1.0 + tolerance:
+            regressions.append((r["pipeline"], r["megapixels"], prev["latency_ms"]["median"], r["latency_ms"]["median"], ratio))
+    return regressions
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-p", "--pipeline", action="append", choices=sorted(PIPELINES), help="pipeline to run (repeatable, default: all)")
+    ap.add_argument("-s", "--size", action="append", type=float, help="input size in megapixels (repeatable, default: {})".format(
+        ", ".join(str(s) for s in DEFAULT_SIZES)))
+    ap.add_argument("-r", "--repeat", type=int, default=3, help="timed runs per case")
+    ap.add_argument("--seed", type=int, default=0, help="seed of the synthetic inputs")
+    ap.add_argument("-o", "--output", default="bench_report.json", help="path of the JSON report")
+    ap.add_argument("--baseline", help="older JSON report to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed median latency growth vs the baseline")
+    args = vars(ap.parse_args())
+
+    names = args["pipeline"] or list(PIPELINES)
+    sizes = args["size"] or list(DEFAULT_SIZES)
+    cases = [(name, mp, args["repeat"], args["seed"]) for name in names for mp in sizes]
+
+    rows = []
+    # a fresh worker process for every case
+    with Pool(1, maxtasksperchild = 1) as pool:
+        for row in pool.imap(run_case, cases):
+            rows.append(row)
+            if row["error"] is not None:
+                print("{:<24} {:>6.1f} MP  ERROR {}".format(row["pipeline"], row["megapixels"], row["error"]), flush = True)
+                continue
+            print("{:<24} {:>6.1f} MP  {:>9.1f} ms  {:>7.1f} MP/s  {:>8.1f} MB traced  {:>8.1f} MB rss  {}".format(
+                row["pipeline"], row["megapixels"], row["latency_ms"]["median"], row["throughput_mp_s"],
+                row["peak_traced_mb"], row["max_rss_mb"] or float("nan"), "ok" if row["check"]["ok"] else "CHECK FAILED"), flush = True)
+
+    report = dict(environment = environment(), results = rows)
+    with open(args["output"], "w") as f:
+        json.dump(report, f, indent = 2)
+    print("report written to {}".format(args["output"]))
+
+    failed = [r for r in rows if not r["check"]["ok"]]
+    regressions = []
+    if args["baseline"] is not None:
+        with open(args["baseline"]) as f:
+            regressions = compare(rows, json.load(f), args["tolerance"])
+        for (name, mp, before, after, ratio) in regressions:
+            print("REGRESSION {} @ {} MP: {:.1f} ms -> {:.1f} ms ({:+.0%})".format(name, mp, before, after, ratio - 1.0))
+
+    raise SystemExit(1 if failed or regressions else 0)
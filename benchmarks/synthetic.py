@@ -0,0 +1,187 @@
+"""
+Synthetic inputs with known ground truth for the benchmarks
+Approach:
+- everything is drawn procedurally from a seed, no image files are needed
+- sizes are given in pixels, size_for_megapixels does the conversion
+- documents: a rotated, perspective distorted text page and its 4 true corners
+- shapes: n non touching circles, rectangles and triangles and their centers
+- arrows: n arrows pointing up and their tips
+- color pairs: a (source, target) pair for color transfer
+- contours: n small convex polygons, as findContours would return them
+"""
+
+# import the necessary packages
+import cv2
+import numpy as np
+
+
+def size_for_megapixels(megapixels, aspect = 4 / 3.0):
+    # (width, height) with width / height = aspect and about that many pixels
+    height = int(round(np.sqrt(megapixels * 1e6 / aspect)))
+    return (int(round(height * aspect)), height)
+
+def text_page(width, height, seed = 0):
+    # light paper with dark lines of text
+    page = np.full((height, width, 3), 232, dtype = "uint8")
+    scale = max(width, height) / 1500.0
+    step = max(8, int(40 * scale))
+    thickness = max(1, int(2 * scale))
+    for (j, y) in enumerate(range(2 * step, height - step, step)):
+        cv2.putText(page, "item {:04d} total {}.{:02d}".format(j + seed, j * 7, j % 100),
+            (step, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (25, 25, 25), thickness)
+    return page
+
+def synthetic_document(width, height, seed = 0, rotation = None, perspective = 0.08, table = 35):
+    """
+    A text page photographed on a dark, noisy table: rotated and perspective
+    distorted. table is the gray level of the table (plus up to 20 of noise).
+
+    returns (image, corners), corners are the exact (4, 2) float32 positions of
+    the page corners in the image, in top-left, top-right, bottom-right,
+    bottom-left order
+    """
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), table, dtype = "uint8")
+    noise = rng.integers(0, 20, (min(height, 1024), min(width, 1024), 3), dtype = "uint8")
+    image = cv2.add(image, cv2.resize(noise, (width, height), interpolation = cv2.INTER_NEAREST))
+
+    # the page covers about half the frame
+    pageH = int(height * 0.7)
+    pageW = int(pageH * 0.77)
+    page = text_page(pageW, pageH, seed)
+    src = np.array([[0, 0], [pageW - 1, 0], [pageW - 1, pageH - 1], [0, pageH - 1]], dtype = "float32")
+
+    # rotate about the frame center, then push every corner around a bit
+    if rotation is None:
+        rotation = rng.uniform(-20, 20)
+    center = np.array([width / 2.0, height / 2.0])
+    theta = np.deg2rad(rotation)
+    R = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+    corners = (src - (pageW / 2.0, pageH / 2.0)) @ R.T + center
+    corners += rng.uniform(-perspective, perspective, (4, 2)) * (pageW, pageH)
+    corners = corners.astype("float32")
+
+    M = cv2.getPerspectiveTransform(src, corners)
+    cv2.warpPerspective(page, M, (width, height), image, borderMode = cv2.BORDER_TRANSPARENT)
+    return (image, corners)
+
+def random_shapes(width, height, n = 50, seed = 0, extents = False):
+    """
+    n filled circles, rectangles and triangles in bright colors on a dark
+    background, one per cell of a grid so that they never touch.
+
+    returns (image, centers), centers is an (n, 2) float array holding the
+    center of every shape; with extents = True (image, centers, boxes, areas),
+    boxes is an (n, 4) array of the left, top, right and bottom most pixel of
+    every shape and areas an (n,) array of their drawn areas
+    """
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), 20, dtype = "uint8")
+
+    # smallest grid with at least n cells, roughly following the aspect ratio
+    cols = int(np.ceil(np.sqrt(n * width / float(height))))
+    rows = int(np.ceil(n / float(cols)))
+    (cw, ch) = (width / float(cols), height / float(rows))
+    cells = rng.permutation(rows * cols)[:n]
+
+    (centers, boxes, areas) = ([], [], [])
+    for (i, cell) in enumerate(cells):
+        (r, c) = divmod(int(cell), cols)
+        # shape size between 30% and 40% of the cell, center jittered inside it
+        size = rng.uniform(0.3, 0.4) * min(cw, ch)
+        cx = (c + 0.5) * cw + rng.uniform(-0.05, 0.05) * cw
+        cy = (r + 0.5) * ch + rng.uniform(-0.05, 0.05) * ch
+        color = tuple(int(v) for v in rng.integers(120, 256, 3))
+
+        kind = i % 3
+        if kind == 0:
+            (x, y, r) = (int(round(cx)), int(round(cy)), int(size))
+            cv2.circle(image, (x, y), r, color, -1)
+            boxes.append((x - r, y - r, x + r, y + r))
+            areas.append(np.pi * r * r)
+        elif kind == 1:
+            (x0, y0, x1, y1) = (int(cx - size), int(cy - 0.7 * size), int(cx + size), int(cy + 0.7 * size))
+            cv2.rectangle(image, (x0, y0), (x1, y1), color, -1)
+            boxes.append((x0, y0, x1, y1))
+            areas.append((x1 - x0) * (y1 - y0))
+        else:
+            pts = np.array([[cx, cy - size], [cx + size, cy + 0.7 * size], [cx - size, cy + 0.7 * size]])
+            cv2.fillPoly(image, [pts.astype("int32")], color)
+            cy = pts[:, 1].mean()
+            (left, top) = pts.astype("int32").min(axis = 0)
+            (right, bottom) = pts.astype("int32").max(axis = 0)
+            boxes.append((left, top, right, bottom))
+            areas.append(0.5 * (right - left) * (bottom - top))
+        centers.append((cx, cy))
+
+    if extents:
+        return (image, np.array(centers), np.array(boxes, dtype = "float64"), np.array(areas))
+    return (image, np.array(centers))
+
+def arrows(width, height, n = 12, seed = 0):
+    """
+    n white arrows pointing up on a black background.
+
+    returns (image, tips), tips is an (n, 2) int array of the arrow tips,
+    which are the topmost vertex of every arrow
+    """
+    rng = np.random.default_rng(seed)
+    image = np.zeros((height, width, 3), dtype = "uint8")
+
+    # unit arrow, tip first, pointing up
+    shape = np.array([[0, -1], [0.6, -0.2], [0.25, -0.2], [0.25, 1], [-0.25, 1], [-0.25, -0.2], [-0.6, -0.2]])
+
+    cols = int(np.ceil(np.sqrt(n * width / float(height))))
+    rows = int(np.ceil(n / float(cols)))
+    (cw, ch) = (width / float(cols), height / float(rows))
+
+    tips = []
+    for cell in rng.permutation(rows * cols)[:n]:
+        (r, c) = divmod(int(cell), cols)
+        size = rng.uniform(0.3, 0.4) * min(cw, ch)
+        center = np.array([(c + 0.5) * cw, (r + 0.5) * ch])
+        pts = np.round(shape * size + center).astype("int32")
+        cv2.fillPoly(image, [pts], (255, 255, 255))
+        tips.append(pts[0])
+
+    return (image, np.array(tips))
+
+def color_pair(width, height, seed = 0):
+    """
+    a (source, target) pair for color transfer: a warm, low contrast source
+    "look" and a target made of random colored blobs
+    """
+    rng = np.random.default_rng(seed)
+
+    # source: smooth orange gradient with a little noise
+    ramp = np.linspace(0, 1, width, dtype = "float32")[None, :, None]
+    warm = np.array([40, 120, 230], dtype = "float32")
+    source = warm * (0.6 + 0.4 * ramp) + rng.normal(0, 8, (height, 1, 3)).astype("float32")
+    source = np.clip(np.broadcast_to(source, (height, width, 3)), 0, 255).astype("uint8")
+
+    # target: low resolution random colors blown up, like out of focus photo content
+    blobs = rng.integers(0, 256, (max(2, height // 200), max(2, width // 200), 3), dtype = "uint8")
+    target = cv2.resize(blobs, (width, height), interpolation = cv2.INTER_CUBIC)
+
+    return (source, target)
+
+def random_contours(n, seed = 0):
+    """
+    n small convex polygons of 4 to 12 vertices, one per cell of a jittered
+    grid of 40x30 px cells, standing in for the contours of a dense form or
+    particle image.
+
+    returns a list of (k, 1, 2) int32 arrays, like cv2.findContours
+    """
+    rng = np.random.default_rng(seed)
+    cols = int(np.ceil(np.sqrt(n)))
+    cnts = []
+    for i in range(n):
+        (r, c) = divmod(i, cols)
+        center = np.array([c * 40 + 20, r * 30 + 15]) + rng.integers(-3, 4, 2)
+        k = int(rng.integers(4, 13))
+        angles = np.sort(rng.uniform(0, 2 * np.pi, k))
+        radius = rng.uniform(4, 12)
+        pts = center + radius * np.stack([np.cos(angles), np.sin(angles)], axis = 1)
+        cnts.append(pts.round().astype("int32").reshape(-1, 1, 2))
+    return cnts
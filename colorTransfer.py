@@ -16,6 +16,24 @@ Algorithm:
 - clip any values that fall outside the range [0, 255]
 - merge channels
 - convert to RGB format
+- the L*a*b* image is 8-bit, so the whole per-channel map is applied as one
+  256 entry lookup table per channel (computed exactly like the steps above)
+
+Styles:
+- the source only matters through the mean and standard deviation of its L*a*b channels
+- a style library (styleLibrary.py) stores those 6 numbers per reference image,
+  so color_transfer can take a style ID instead of a source image
+- python colorTransfer.py -l styles.npz --style sunset -t photo.jpg
+
+Very large images (tiled mode):
+- python colorTransfer.py -s sunset.jpg -t panorama.ppm --tiled graded.ppm --budget 256
+- the stats are accumulated strip by strip and the transfer is applied one
+  strip at a time, under a memory budget in MB; .npy and binary .ppm inputs
+  are read strip by strip with plain file reads, other formats are decoded
+  whole
+- --sample 0.01 estimates the stats from 1% of the rows instead, and prints
+  an error bound for each of them
+- the output is a .ppm image or a .npy array, nothing is shown on screen
 
 Recomendations:
 - prefer a plain colored source image for it to act as a filter
@@ -24,79 +42,76 @@ Recomendations:
 # import the necessary packages
 import argparse
 
-import cv2
-import imutils
-import numpy as np
-
-# construct the argument parse and parse the arguments
-ap = argparse.ArgumentParser()
-ap.add_argument("-s", "--source", required=True, help="path to source image")
-ap.add_argument("-t", "--target", required=True, help="path to source target")
-args = vars(ap.parse_args())
-
-# load image and convert to L*a*b
-"""
-Convert it to float32:
-OpenCV represents images as multi-dimensional NumPy arrays, 
-but defaults to the uint8 datatype. 
-This is fine for most cases, but,
-when performing the color transfer we could potentially 
-have negative and decimal values, thus, 
-we need to utilize the floating point data type.
-"""
-source = imutils.resize(cv2.imread(args["source"]), width = 700)
-target = imutils.resize(cv2.imread(args["target"]), width = 700)
-
-# split L*a*b and get stats for source and traget 
-
-def image_stats(image):
-	# return the mean and standard deviation of each channel
-	(l, a, b) = cv2.split(image)
-
-	(lMean, lStd) = (l.mean(), l.std())
-	(aMean, aStd) = (a.mean(), a.std())
-	(bMean, bStd) = (b.mean(), b.std())
-
-	return (lMean, lStd, aMean, aStd, bMean, bStd)
-
-def color_transfer(source, target):
-	source = cv2.cvtColor(source, cv2.COLOR_BGR2LAB).astype("float32")
-	target = cv2.cvtColor(target, cv2.COLOR_BGR2LAB).astype("float32")
-
-	(lMeanSrc, lStdSrc, aMeanSrc, aStdSrc, bMeanSrc, bStdSrc) = image_stats(source)
-	(lMeanTar, lStdTar, aMeanTar, aStdTar, bMeanTar, bStdTar) = image_stats(target)
-
-	# make target mean = 0 
-	(l, a, b) = cv2.split(target)
-	l -= lMeanTar
-	a -= aMeanTar
-	b -= bMeanTar
-
-	# normalize by the standard deviations
-	l = (lStdSrc / lStdTar) * l 
-	a = (aStdSrc / aStdTar) * a 
-	b = (bStdSrc / bStdTar) * b 
-
-	# add in the source mean
-	l += lMeanSrc
-	a += aMeanSrc
-	b += bMeanSrc
-
-	# clip the pixel intensities to [0, 255] 
-	l = np.clip(l, 0, 255)
-	a = np.clip(a, 0, 255)
-	b = np.clip(b, 0, 255)
-
-	# merge the channels together 
-	# convert back to the RGB color
-	# make sure to utilize the 8-bit unsigned integer data type
-	transfer = cv2.merge([l, a, b])
-	transfer = cv2.cvtColor(transfer.astype("uint8"), cv2.COLOR_LAB2BGR)
-
-	# return the color transferred image
-	return transfer    
-
-cv2.imshow("Source", source)
-cv2.imshow("Target", target)
-cv2.imshow("Transfer", color_transfer(source, target))
-cv2.waitKey(0)
+from computer_vision import profiling
+
+
+def main():
+	# construct the argument parse and parse the arguments
+	ap = argparse.ArgumentParser()
+	group = ap.add_mutually_exclusive_group(required=True)
+	group.add_argument("-s", "--source", help="path to source image")
+	group.add_argument("--style", help="ID of a style in the library given with -l")
+	ap.add_argument("-t", "--target", required=True, help="path to source target")
+	ap.add_argument("-l", "--library", help="path to a style library built with styleLibrary.py")
+	ap.add_argument("--tiled", help="transfer in strips, written to this .ppm or .npy file")
+	ap.add_argument("--budget", type=float, default=256, help="memory budget of the tiled mode in MB")
+	ap.add_argument("--sample", type=float, help="tiled mode: estimate the stats from this fraction of the rows")
+	profiling.add_arguments(ap)
+	args = vars(ap.parse_args())
+	profiling.from_args(args)
+	if args["style"] is not None and args["library"] is None:
+		ap.error("--style needs a style library (-l/--library)")
+	if args["sample"] is not None and not 0 < args["sample"] <= 1:
+		ap.error("--sample must be a fraction of the rows in (0, 1]")
+
+	if args["tiled"] is not None:
+		tiled(args)
+		return
+
+	import cv2
+	import imutils
+
+	from computer_vision.color import color_transfer
+
+	target = imutils.resize(cv2.imread(args["target"]), width = 700)
+	cv2.imshow("Target", target)
+
+	if args["style"] is not None:
+		from computer_vision.styles import StyleLibrary
+
+		cv2.imshow("Transfer", color_transfer(args["style"], target, StyleLibrary.load(args["library"])))
+	else:
+		source = imutils.resize(cv2.imread(args["source"]), width = 700)
+		cv2.imshow("Source", source)
+		cv2.imshow("Transfer", color_transfer(source, target))
+	cv2.waitKey(0)
+
+def tiled(args):
+	import time
+
+	from computer_vision.tiled import peak_rss_mb
+	from computer_vision.tiled_color import color_transfer_tiled, open_image
+
+	library = None
+	if args["style"] is not None:
+		from computer_vision.styles import StyleLibrary
+
+		(source, library) = (args["style"], StyleLibrary.load(args["library"]))
+	else:
+		source = open_image(args["source"])
+
+	start = time.perf_counter()
+	((h, w), stats) = color_transfer_tiled(source, open_image(args["target"]), args["tiled"], library,
+		args["budget"], args["sample"])
+	rss = peak_rss_mb()
+	print("{}x{} image written to {} in {:.2f}s, peak RSS {}".format(w, h, args["tiled"],
+		time.perf_counter() - start, "n/a" if rss is None else "{:.0f} MB".format(rss)))
+
+	for name in ("source", "target"):
+		bound = stats[name + "_bound"]
+		values = ["{:.2f}".format(v) if bound is None else "{:.2f} +/- {:.2f}".format(v, b)
+			for (v, b) in zip(stats[name], bound or stats[name])]
+		print("{} L mean {}, std {}; a mean {}, std {}; b mean {}, std {}".format(name, *values))
+
+if __name__ == "__main__":
+	main()
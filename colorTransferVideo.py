@@ -0,0 +1,86 @@
+"""
+Color Transfer on video streams
+
+Requirements:
+- python
+- basic knowledge on usage of comand line
+- NumPy
+
+Algorithm:
+- get the source stats once, from a source image or a style in a style library
+- read frames from a video file or a capture device (webcam index)
+- target stats are not recomputed from scratch on every frame:
+  - they are measured on a small (1/4 size by default) copy of the frame
+  - they are blended into running stats with an exponential moving average,
+    which also keeps the grade from flickering between frames
+- the transfer itself is a per-channel affine map on the 8-bit L*a*b* frame
+  (scale by source std / target std, shift by the means), applied with one
+  saturating cv2.transform call, so there are no float copies of the frame
+- a reader thread decodes the next frames while the current one is graded
+- write the graded video, report frames/sec and the per-frame latency
+
+Usage:
+- python colorTransferVideo.py -s sunset.jpg -v input.mp4 -o graded.mp4
+- python colorTransferVideo.py -l styles.npz --style sunset -v 0 --display
+"""
+
+# import the necessary packages
+import argparse
+
+from computer_vision import profiling
+
+
+def main():
+    # construct the argument parse and parse the arguments
+    ap = argparse.ArgumentParser()
+    group = ap.add_mutually_exclusive_group(required=True)
+    group.add_argument("-s", "--source", help="path to source image")
+    group.add_argument("--style", help="ID of a style in the library given with -l")
+    ap.add_argument("-l", "--library", help="path to a style library built with styleLibrary.py")
+    ap.add_argument("-v", "--video", required=True, help="path to input video, or a capture device index")
+    ap.add_argument("-o", "--output", help="path to write the graded video to")
+    ap.add_argument("--smoothing", type=float, default=0.9, help="weight of the previous frames in the target stats")
+    ap.add_argument("--scale", type=float, default=0.25, help="size of the frame copy the stats are measured on")
+    ap.add_argument("--display", action="store_true", help="show the graded frames, q to stop")
+    profiling.add_arguments(ap)
+    args = vars(ap.parse_args())
+    profiling.from_args(args)
+    if args["style"] is not None and args["library"] is None:
+        ap.error("--style needs a style library (-l/--library)")
+
+    # OpenCV is only imported once the style arguments are checked
+    import cv2
+
+    from computer_vision.video import grade_stream, report
+
+    if args["style"] is not None:
+        from computer_vision.styles import StyleLibrary
+
+        sourceStats = StyleLibrary.load(args["library"]).stats(args["style"])
+    else:
+        from computer_vision.color import lab_stats
+
+        sourceStats = lab_stats(cv2.imread(args["source"]))
+
+    video = args["video"]
+    capture = cv2.VideoCapture(int(video) if video.isdigit() else video)
+    if not capture.isOpened():
+        raise SystemExit("could not open {}".format(video))
+
+    writer = None
+    if args["output"] is not None:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        writer = cv2.VideoWriter(args["output"], cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+
+    try:
+        (latencies, elapsed) = grade_stream(capture, sourceStats, writer, args["display"],
+            args["smoothing"], args["scale"])
+    finally:
+        capture.release()
+        if writer is not None:
+            writer.release()
+    report(latencies, elapsed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Computer vision building blocks behind the scripts of this repository
+
+Importing a module has no side effects: nothing parses arguments, opens
+windows or waits for a key. The functions return their results rather than
+print them, except for the progress and summary lines of batch.run_batch and
+pipeline.run_pipeline_batch, which go to a report callable (print by
+default), and video.report and profiling.report, which exist to print;
+video.grade_stream only shows frames with display = True. The scripts at the
+top of the repository are thin command line entry points around these modules.
+
+Importing the package is cheap: the names below are only resolved (and their
+module, cv2 and NumPy imported) on first access. imutils and scikit-image are
+imported by the stages that need them, when they run.
+
+- geometry:  order_points, four_point_transform and their (N, 4, 2) batched versions
+- threshold: local thresholding (OpenCV or scikit-image backend)
+- scanner:   document scanner pipelines
+- tiled:     memory bounded warp + threshold in strips
+- remap:     cached remap tables of fixed camera rigs
+- bilevel:   1 bit packed scan output, bilevel PNG / TIFF / PBM files
+- batch:     headless batch scanning in a process pool
+- pipeline:  asyncio decode / scan / write pipeline with bounded queues
+- service:   local HTTP scanning service with pre-warmed workers
+- tracking:  live document quad tracking
+- contours:  finding, sorting and labelling contours
+- sweep:     automatic threshold selection from the histogram
+- quads:     4 point polygon search, adaptive epsilon and fallbacks
+- cache:     on-disk cache of contour stages, keyed by image content
+- shapes:    shape centers, bulk shape statistics tables
+- extreme:   extreme points of contours
+- vertices:  vertex co-ordinates of contours
+- color:     color transfer, float and lookup table paths
+- tiled_color: streaming color stats, color transfer strip by strip
+- styles:    precomputed color transfer styles
+- video:     color transfer on video streams
+- profiling: per-stage timing, Chrome traces and Prometheus metrics
+"""
+
+# import the necessary packages
+import importlib
+
+# public name -> submodule defining it
+_EXPORTS = {
+    "order_points": "geometry",
+    "order_points_batch": "geometry",
+    "output_sizes": "geometry",
+    "perspective_matrices": "geometry",
+    "quad_transforms": "geometry",
+    "four_point_transform": "geometry",
+    "four_point_transform_batch": "geometry",
+    "binarize": "threshold",
+    "threshold_local": "threshold",
+    "find_screen_contour": "scanner",
+    "find_quad": "quads",
+    "refine_corners": "scanner",
+    "scan": "scanner",
+    "scan_largest_contour": "scanner",
+    "scan_tiled": "scanner",
+    "scan_packed": "scanner",
+    "detect_corners": "scanner",
+    "detection_threshold": "scanner",
+    "sweep_threshold": "sweep",
+    "warp_binarize_tiled": "tiled",
+    "RemapTable": "remap",
+    "RigTables": "remap",
+    "warp_gray": "bilevel",
+    "binarize_packed": "bilevel",
+    "unpack_bits": "bilevel",
+    "write_bilevel": "bilevel",
+    "read_bilevel": "bilevel",
+    "run_batch": "batch",
+    "run_pipeline": "pipeline",
+    "ScanService": "service",
+    "encode_bilevel": "bilevel",
+    "QuadTracker": "tracking",
+    "find_contours": "contours",
+    "sort_contours": "contours",
+    "draw_contour": "contours",
+    "edge_map": "contours",
+    "largest_contours": "contours",
+    "edge_contours": "contours",
+    "bounding_boxes": "contours",
+    "contour_areas": "contours",
+    "reading_order": "contours",
+    "sort_order": "contours",
+    "detect_shapes": "shapes",
+    "draw_shapes": "shapes",
+    "shape_table": "shapes",
+    "write_table": "shapes",
+    "draw_table": "shapes",
+    "extreme_points": "extreme",
+    "all_extreme_points": "extreme",
+    "getCoordinates": "vertices",
+    "polygon_vertices": "vertices",
+    "polygon_table": "vertices",
+    "write_vertices": "vertices",
+    "read_vertices": "vertices",
+    "annotate_vertices": "vertices",
+    "image_stats": "color",
+    "hist_stats": "color",
+    "lab_stats": "color",
+    "transfer_lut": "color",
+    "color_transfer": "color",
+    "TileStats": "tiled_color",
+    "color_transfer_tiled": "tiled_color",
+    "StyleLibrary": "styles",
+    "ContourCache": "cache",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module("." + _EXPORTS[name], __name__), name)
+    # cache it, later lookups do not come back here
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,87 @@
+"""
+Headless batch scanning in a process pool
+Approach:
+- inputs: a directory, a glob pattern or a manifest (text file, one path per line)
+- every image goes through scanner.scan_packed in a pool of worker processes
+  (one per core by default), each worker running a single OpenCV thread
+- with rig = (directory, name, size) every image is warped by the cached remap
+  tables of a calibrated fixed rig instead of detecting the page (see remap)
+- the output files mirror the inputs' paths relative to the directory holding
+  them all, a/page1.jpg and b/page1.jpg give a/page1.png and b/page1.png; an
+  input that would still overwrite another one's output fails
+- the scans are written 1 bit per pixel (see bilevel): a bilevel .png by
+  default, a group 4 (or other compression) .tif or a .pbm
+- each file gets an "ok" or "failed: <reason>" status line and the run ends
+  with the overall throughput in images/sec, every line goes to
+  report(line), print by default
+"""
+
+# import the necessary packages
+import os
+import time
+from functools import partial
+from multiprocessing import Pool
+
+import cv2
+
+from .bilevel import write_bilevel
+from .files import collect_inputs, output_paths
+from .remap import rig_table
+from .scanner import scan_packed
+
+
+def init_worker():
+    # one OpenCV thread per process, the pool already uses every core;
+    # the scan processes of pipeline and the service workers start with it too
+    cv2.setNumThreads(1)
+
+def scan_file(job):
+    (path, dest, backend, refine, compression, threshold, rig) = job
+    start = time.perf_counter()
+
+    try:
+        orig = cv2.imread(path)
+        if orig is None:
+            raise ValueError("could not read image")
+
+        table = rig_table(*rig) if rig is not None else None
+        (packed, width, _, _) = scan_packed(orig, backend, refine, threshold, table)
+
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok = True)
+        write_bilevel(dest, packed, width, compression)
+        status = "ok"
+    except Exception as e:
+        status = "failed: {}".format(e)
+
+    return (path, status, time.perf_counter() - start)
+
+def run_batch(source, output, workers = None, backend = "opencv", refine = True, fmt = "png", compression = None,
+        threshold = 60, rig = None, report = partial(print, flush = True)):
+    paths = collect_inputs(source)
+    os.makedirs(output, exist_ok = True)
+
+    # inputs that would overwrite the output of an earlier one fail straight away
+    (jobs, failed) = ([], 0)
+    for (path, (dest, clash)) in zip(paths, output_paths(paths, output, fmt)):
+        if clash is not None:
+            failed += 1
+            report("{}\tfailed: {} is already the output of {}\t{:.3f}s".format(path, dest, clash, 0.0))
+        else:
+            jobs.append((path, dest, backend, refine, compression, threshold, rig))
+
+    start = time.perf_counter()
+    with Pool(workers, initializer = init_worker) as pool:
+        # chunks of a few files keep the workers busy without
+        # making the per-file status lines lag too far behind
+        chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 8))
+        for (path, status, elapsed) in pool.imap_unordered(scan_file, jobs, chunksize):
+            if status != "ok":
+                failed += 1
+            report("{}\t{}\t{:.3f}s".format(path, status, elapsed))
+    elapsed = time.perf_counter() - start
+
+    rate = len(paths) / elapsed if elapsed > 0 else 0.0
+    report("{} images, {} ok, {} failed in {:.2f}s ({:.2f} images/sec)".format(
+        len(paths), len(paths) - failed, failed, elapsed, rate))
+
+    return failed
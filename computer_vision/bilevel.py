@@ -0,0 +1,183 @@
+"""
+1 bit output stage of the document scanners
+Approach:
+- only the gray plane is warped: the bounding box of the quad is cut out of
+  the source and converted to gray, then warped with the page homography
+  shifted to that box, instead of warping all three channels of the page and
+  converting it afterwards
+- the local threshold runs over strips of rows, with the kernel radius as
+  overlap (like tiled), and every strip is packed to 1 bit per pixel straight
+  away: the float surfaces of the threshold are strip sized, and neither the
+  0/255 page nor its boolean mask is ever built
+- packed rows follow np.packbits: 8 pixels per byte, most significant bit
+  first, every row padded to whole bytes, 1 = white (paper); that is also the
+  raw layout of a Pillow "1" image, so it is written without unpacking
+- write_bilevel saves a packed page as
+  - .png: 1 bit grayscale PNG
+  - .tif / .tiff: bilevel TIFF, CCITT group 4 (fax) compression by default,
+    or any of TIFF_COMPRESSIONS
+  - .pbm: binary PBM (P4), no dependency
+  - .npz: the packed array and the width
+- write_bilevel encodes into a temporary file next to the destination and
+  renames it, an existing file is only replaced by a complete one
+- encode_bilevel returns the bytes of the same files, nothing touches the disk
+- Pillow is only imported when a PNG or TIFF is written; without it PNG falls
+  back to OpenCV's bilevel PNG writer and TIFF is not available
+"""
+
+# import the necessary packages
+import io
+import os
+
+import cv2
+import numpy as np
+
+from .geometry import quad_transforms
+from .profiling import stage
+from .threshold import binarize
+from .tiled import threshold_halo
+
+# rows of output binarized per strip
+DEFAULT_STRIP_ROWS = 256
+
+# file extensions write_bilevel and encode_bilevel know
+BILEVEL_FORMATS = ("png", "tif", "tiff", "pbm", "npz")
+
+# TIFF compressions by name -> Pillow's name for them
+TIFF_COMPRESSIONS = {
+    "group4": "group4",
+    "group3": "group3",
+    "lzw": "tiff_lzw",
+    "deflate": "tiff_adobe_deflate",
+    "packbits": "packbits",
+    "none": "raw",
+}
+
+
+def warp_gray(orig, pts):
+    # top-down grayscale view of the quad pts of orig, only its bounding box is converted to gray
+    (_, sizes, matrices) = quad_transforms(np.asarray(pts, dtype = "float64")[None])
+    (width, height) = (int(sizes[0][0]), int(sizes[0][1]))
+
+    # bounding box of the quad, with a pixel of margin for the interpolation
+    (h, w) = orig.shape[:2]
+    pts = np.asarray(pts, dtype = "float64")
+    (x0, y0) = np.maximum(np.floor(pts.min(axis = 0)).astype(int) - 1, 0)
+    (x1, y1) = np.minimum(np.ceil(pts.max(axis = 0)).astype(int) + 2, (w, h))
+
+    box = orig[y0:y1, x0:x1]
+    if box.ndim == 3:
+        with stage("gray"):
+            box = cv2.cvtColor(box, cv2.COLOR_BGR2GRAY)
+
+    # box pixel (x, y) is source pixel (x + x0, y + y0)
+    shift = np.array([[1, 0, x0], [0, 1, y0], [0, 0, 1]], dtype = "float64")
+    with stage("warpPerspective"):
+        return cv2.warpPerspective(box, matrices[0] @ shift, (width, height))
+
+def binarize_packed(gray, block_size = 51, offset = 10, method = "gaussian", backend = "opencv",
+        strip_rows = DEFAULT_STRIP_ROWS):
+    # grayscale image -> (height, ceil(width / 8)) uint8 of packed bits, same pixels as binarize
+    (h, w) = gray.shape[:2]
+    halo = threshold_halo(block_size, method)
+    packed = np.empty((h, (w + 7) // 8), dtype = "uint8")
+
+    for y0 in range(0, h, strip_rows):
+        y1 = min(h, y0 + strip_rows)
+        (a0, a1) = (max(0, y0 - halo), min(h, y1 + halo))
+        with stage("threshold_local"):
+            binary = binarize(gray[a0:a1], block_size, offset, method, backend)
+        with stage("packbits"):
+            packed[y0:y1] = np.packbits(binary[y0 - a0:y1 - a0], axis = 1)
+
+    return packed
+
+def unpack_bits(packed, width):
+    # packed bits -> uint8 image holding 0 and 255, like binarize returns
+    binary = np.unpackbits(packed, axis = 1, count = width)
+    return np.multiply(binary, 255, out = binary)
+
+def packed_image(packed, width):
+    # Pillow "1" image over the packed rows, no unpacking
+    from PIL import Image
+
+    return Image.frombytes("1", (width, len(packed)), np.ascontiguousarray(packed).tobytes())
+
+def write_pbm(path, packed, width):
+    with open(path, "wb") as f:
+        save_pbm(f, packed, width)
+
+def save_pbm(f, packed, width):
+    # PBM stores 1 = black, the opposite of the packed rows
+    f.write("P4\n{} {}\n".format(width, len(packed)).encode())
+    f.write(np.invert(packed).tobytes())
+
+def write_bilevel(path, packed, width, compression = None):
+    # save packed bits as .png, .tif/.tiff, .pbm or .npz
+    ext = path.lower().rsplit(".", 1)[-1]
+    if ext not in BILEVEL_FORMATS:
+        raise ValueError("bilevel output must be a .png, .tif, .pbm or .npz file, got {}".format(path))
+    # written next to path first (with the usual permissions, unlike mkstemp),
+    # a failed encode leaves neither an empty nor a partial file at path
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        with stage("write"), open(tmp, "wb") as f:
+            save_bilevel(f, ext, packed, width, compression)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+def encode_bilevel(packed, width, fmt = "png", compression = None):
+    # the bytes of the file write_bilevel would write, fmt is its extension
+    if fmt not in BILEVEL_FORMATS:
+        raise ValueError("bilevel format must be one of {}, got {!r}".format(", ".join(BILEVEL_FORMATS), fmt))
+    f = io.BytesIO()
+    with stage("encode"):
+        save_bilevel(f, fmt, packed, width, compression)
+    return f.getvalue()
+
+def save_bilevel(f, ext, packed, width, compression):
+    if ext == "pbm":
+        save_pbm(f, packed, width)
+    elif ext == "npz":
+        np.savez(f, packed = packed, width = width)
+    elif ext in ("tif", "tiff"):
+        compression = compression or "group4"
+        if compression not in TIFF_COMPRESSIONS:
+            raise ValueError("unknown TIFF compression {!r}, expected one of {}".format(
+                compression, sorted(TIFF_COMPRESSIONS)))
+        packed_image(packed, width).save(f, format = "TIFF", compression = TIFF_COMPRESSIONS[compression])
+    else:
+        try:
+            image = packed_image(packed, width)
+        except ImportError:
+            # OpenCV can write a 1 bit PNG too, from the unpacked pixels
+            (ok, data) = cv2.imencode(".png", unpack_bits(packed, width), [cv2.IMWRITE_PNG_BILEVEL, 1])
+            if not ok:
+                raise ValueError("could not encode a bilevel PNG")
+            f.write(data.tobytes())
+            return
+        image.save(f, format = "PNG")
+
+def read_bilevel(path):
+    # the (packed, width) saved by write_bilevel
+    ext = path.lower().rsplit(".", 1)[-1]
+    if ext == "npz":
+        with np.load(path) as data:
+            return (data["packed"], int(data["width"]))
+    if ext == "pbm":
+        with open(path, "rb") as f:
+            # "P4" line, then the "width height" line written by write_pbm
+            f.readline()
+            (width, height) = f.readline().split()
+            packed = np.fromfile(f, dtype = "uint8").reshape(int(height), -1)
+        return (np.invert(packed), int(width))
+
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image = image.convert("1")
+        packed = np.frombuffer(image.tobytes(), dtype = "uint8").reshape(image.height, -1)
+        return (packed, image.width)
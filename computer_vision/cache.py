@@ -0,0 +1,144 @@
+"""
+Content addressed on-disk cache for contour stages
+Approach:
+- the key of an entry is the SHA-256 of the image pixels (plus shape and
+  dtype) and of the stage name and its parameters, so the same image gives a
+  hit whatever file or frame it came from, and changing e.g. the threshold
+  gives a miss
+- an entry holds the contours in a flat layout: all points in one array (in
+  the smallest integer type that fits them) and the number of points of every
+  contour, saved as a small uncompressed .npz
+- the cache has a size cap: when a new entry pushes it over, the least
+  recently used entries are deleted; a hit refreshes the modification time of
+  its file, which is what recency is read from, so it survives across runs
+- hits, misses and evictions are counted, stats() returns them
+
+Usage:
+- cache = ContourCache("~/.cache/computer_vision")
+- cnts = find_contours(image, cache = cache)
+- print(cache.stats())
+"""
+
+# import the necessary packages
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from . import profiling
+
+# default size cap of a cache directory
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def image_digest(image):
+    # SHA-256 of the pixels, shape and dtype of an image
+    h = hashlib.sha256()
+    h.update("{}{}".format(image.shape, image.dtype.str).encode())
+    h.update(memoryview(np.ascontiguousarray(image)).cast("B"))
+    return h.hexdigest()
+
+def pack_contours(cnts):
+    # all contour points in the smallest integer type that fits them, plus the number of points per contour
+    counts = np.fromiter(map(len, cnts), dtype = "uint32", count = len(cnts))
+    points = np.concatenate(cnts).reshape(-1, 2) if len(cnts) else np.zeros((0, 2), dtype = "int32")
+    if len(points) and points.min() >= 0:
+        top = points.max()
+        points = points.astype("uint16" if top <= np.iinfo("uint16").max else "int32")
+    return (points, counts)
+
+def unpack_contours(points, counts):
+    # back to a list of (k, 1, 2) int32 arrays, like cv2.findContours
+    points = points.astype("int32").reshape(-1, 1, 2)
+    return list(np.split(points, np.cumsum(counts[:-1].astype("int64"))) if len(counts) else [])
+
+class ContourCache:
+    def __init__(self, directory, max_bytes = DEFAULT_MAX_BYTES):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok = True)
+
+        # size of every entry already on disk
+        self.sizes = {}
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz"):
+                self.sizes[entry.path] = entry.stat().st_size
+
+    def key(self, image, stage, **params):
+        # one entry per image content, stage and parameter values
+        h = hashlib.sha256(image_digest(image).encode())
+        h.update(stage.encode())
+        h.update(repr(sorted(params.items())).encode())
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        # the contours of an entry, or None
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                cnts = unpack_contours(data["points"], data["counts"])
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+
+        # refresh the recency of the entry
+        os.utime(path)
+        self.hits += 1
+        return cnts
+
+    def put(self, key, cnts):
+        (points, counts) = pack_contours(cnts)
+        path = self.path(key)
+
+        # write to a temporary file first, a reader never sees half an entry
+        (fd, tmp) = tempfile.mkstemp(dir = self.directory, suffix = ".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, points = points, counts = counts)
+        os.replace(tmp, path)
+
+        self.sizes[path] = os.path.getsize(path)
+        self.evict()
+
+    def contours(self, image, stage, compute, **params):
+        # the cached contours of a stage, computed and stored on a miss
+        with profiling.stage("cache.lookup"):
+            key = self.key(image, stage, **params)
+            cnts = self.get(key)
+        if cnts is None:
+            cnts = list(compute())
+            with profiling.stage("cache.store"):
+                self.put(key, cnts)
+        return cnts
+
+    def evict(self):
+        # delete the least recently used entries until the cache fits its cap
+        total = sum(self.sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        def recency(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0.0
+
+        for path in sorted(self.sizes, key = recency):
+            if total <= self.max_bytes:
+                break
+            total -= self.sizes.pop(path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.evictions += 1
+
+    def stats(self):
+        return dict(hits = self.hits, misses = self.misses, evictions = self.evictions,
+            entries = len(self.sizes), bytes = sum(self.sizes.values()))
@@ -0,0 +1,152 @@
+"""
+Color Transfer
+Algorithm:
+- convert both the source and the target image to the L*a*b* color space
+  (as float32, the transfer produces negative and decimal values)
+- subtract the mean of each target channel
+- scale by (standard dev of source) / (standard dev of target)
+- add in the source mean
+- clip any values that fall outside the range [0, 255], merge, back to BGR
+- the source only matters through its 6 stats, so a style library can
+  stand in for the source image
+Lookup table path (method = "lut", the default):
+- the L*a*b* image from cv2.cvtColor is 8-bit, and the transfer is a
+  per-channel affine map with clipping, so it is fully described by what it
+  does to the 256 possible values of each channel: a 256 x 3 lookup table
+- the table is computed with the same float32 operations as the float path
+  (method = "float"), on 256 values instead of every pixel, and applied with
+  one cv2.LUT pass over the uint8 image
+- the target stats come from the channel histograms of the 8-bit image
+  (hist_stats) instead of a float32 copy of it
+- dst and lab are optional preallocated buffers (the BGR output and the
+  L*a*b* intermediate, both uint8 and the size of the target), to be reused
+  across calls, e.g. on every frame of a video
+"""
+
+# import the necessary packages
+import cv2
+import numpy as np
+
+from .profiling import stage
+
+# split L*a*b and get stats for source and traget
+
+def image_stats(image):
+    # return the mean and standard deviation of each channel
+    with stage("stats"):
+        (l, a, b) = cv2.split(image)
+
+        (lMean, lStd) = (l.mean(), l.std())
+        (aMean, aStd) = (a.mean(), a.std())
+        (bMean, bStd) = (b.mean(), b.std())
+
+    return (lMean, lStd, aMean, aStd, bMean, bStd)
+
+def hist_stats(image):
+    # image_stats of an 8-bit image, from the histogram of each channel
+    with stage("stats"):
+        values = np.arange(256, dtype = "float64")
+        stats = []
+        for c in range(image.shape[2]):
+            hist = cv2.calcHist([image], [c], None, [256], [0, 256]).ravel().astype("float64")
+            n = hist.sum()
+            mean = hist @ values / n
+            # population variance, as ndarray.std
+            var = max(0.0, hist @ (values * values) / n - mean * mean)
+            # Python floats, like StyleLibrary.stats: the float path keeps computing in float32
+            stats.extend([float(mean), float(np.sqrt(var))])
+
+    return tuple(stats)
+
+def lab_stats(image):
+    # image_stats of a BGR image, in the L*a*b* color space
+    with stage("lab"):
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+    return hist_stats(image)
+
+def transfer_lut(sourceStats, targetStats):
+    # 1 x 256 x 3 uint8 table of the transfer of every 8-bit L*a*b* value
+    with stage("lut"):
+        lut = np.empty((1, 256, 3), dtype = "uint8")
+        for c in range(3):
+            (meanSrc, stdSrc) = (np.float32(sourceStats[2 * c]), np.float32(sourceStats[2 * c + 1]))
+            (meanTar, stdTar) = (np.float32(targetStats[2 * c]), np.float32(targetStats[2 * c + 1]))
+
+            # the operations of transfer_float, in the same order and precision
+            v = np.arange(256, dtype = "float32")
+            v -= meanTar
+            v = (stdSrc / stdTar) * v
+            v += meanSrc
+            lut[0, :, c] = np.clip(v, 0, 255).astype("uint8")
+
+    return lut
+
+def transfer_lut_stats(sourceStats, target, dst = None, lab = None):
+    # the transfer as one lookup table pass over the 8-bit L*a*b* target
+    with stage("lab"):
+        lab = cv2.cvtColor(target, cv2.COLOR_BGR2LAB, dst = lab)
+    lut = transfer_lut(sourceStats, hist_stats(lab))
+
+    with stage("transfer"):
+        # in place, every pixel only depends on itself
+        lab = cv2.LUT(lab, lut, dst = lab)
+
+    with stage("lab"):
+        return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR, dst = dst)
+
+def transfer_float(sourceStats, target):
+    (lMeanSrc, lStdSrc, aMeanSrc, aStdSrc, bMeanSrc, bStdSrc) = sourceStats
+
+    with stage("lab"):
+        target = cv2.cvtColor(target, cv2.COLOR_BGR2LAB).astype("float32")
+    (lMeanTar, lStdTar, aMeanTar, aStdTar, bMeanTar, bStdTar) = image_stats(target)
+
+    with stage("transfer"):
+        # make target mean = 0
+        (l, a, b) = cv2.split(target)
+        l -= lMeanTar
+        a -= aMeanTar
+        b -= bMeanTar
+
+        # normalize by the standard deviations
+        l = (lStdSrc / lStdTar) * l
+        a = (aStdSrc / aStdTar) * a
+        b = (bStdSrc / bStdTar) * b
+
+        # add in the source mean
+        l += lMeanSrc
+        a += aMeanSrc
+        b += bMeanSrc
+
+        # clip the pixel intensities to [0, 255]
+        l = np.clip(l, 0, 255)
+        a = np.clip(a, 0, 255)
+        b = np.clip(b, 0, 255)
+
+        # merge the channels together
+        transfer = cv2.merge([l, a, b])
+
+    # convert back to the RGB color
+    # make sure to utilize the 8-bit unsigned integer data type
+    with stage("lab"):
+        transfer = cv2.cvtColor(transfer.astype("uint8"), cv2.COLOR_LAB2BGR)
+
+    # return the color transferred image
+    return transfer
+
+def transfer_stats(sourceStats, target, method = "lut", dst = None, lab = None):
+    # dst and lab (reused buffers) only apply to the lookup table path
+    if method == "lut":
+        return transfer_lut_stats(sourceStats, target, dst, lab)
+    if method == "float":
+        return transfer_float(sourceStats, target)
+    raise ValueError("unknown transfer method {!r}, expected 'lut' or 'float'".format(method))
+
+def color_transfer(source, target, library = None, method = "lut", dst = None, lab = None):
+    # source is either an image or the ID of a style stored in library
+    if isinstance(source, str):
+        if library is None:
+            raise ValueError("a style library is needed to transfer style {!r}".format(source))
+        return transfer_stats(library.stats(source), target, method, dst, lab)
+
+    return transfer_stats(lab_stats(source), target, method, dst, lab)
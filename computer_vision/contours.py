@@ -0,0 +1,245 @@
+"""
+Finding, sorting and labelling contours
+Approach:
+- find_contours: the gray -> blur -> threshold -> findContours front half
+  shared by the scripts; threshold = "auto" picks the threshold where a large
+  4 vertex contour shows up (sweep.sweep_threshold) instead of a fixed one,
+  and raises ValueError when there is none
+- flatten_contours: the points of all contours in one (M, 2) array plus the
+  start and length of every contour in it, so that per-contour reductions
+  (bounding boxes, areas, ...) run as np.minimum/np.add.reduceat calls instead
+  of one OpenCV call per contour
+- sort_contours: rank contours by the position of their bounding box:
+  top-to-bottom, bottom-to-top, left-to-right, right-to-left or reading-order
+  (rows top to bottom, left to right inside a row); the boxes are an (N, 4)
+  array sorted with a stable argsort, sort_order does the sorting on the boxes
+  alone for callers that keep them around
+- edge_map / largest_contours: contours of objects that do not stand out in a
+  single threshold, from the Canny edges of every color channel; only the k
+  largest are kept, picked with argpartition rather than a full sort
+- the channels of edge_map are processed in a thread pool (OpenCV releases
+  the GIL, so the 11 px median blurs really run side by side on a multi-core
+  machine) and ORed into one edge map in place
+"""
+
+# import the necessary packages
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .profiling import stage
+
+
+def grab_contours(cnts):
+    # the contours out of cv2.findContours, whatever the OpenCV version
+    import imutils
+
+    return imutils.grab_contours(cnts)
+
+def find_contours(image, threshold = 60, cache = None):
+    # with a cache.ContourCache, a repeat run on the same image skips straight to the contours
+    if cache is not None:
+        return cache.contours(image, "find_contours", lambda: find_contours(image, threshold), threshold = threshold)
+
+    with stage("gray"):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    with stage("blur"):
+        blur = cv2.GaussianBlur(gray, (5, 5), 0)
+
+    if threshold == "auto":
+        from .sweep import sweep_threshold
+
+        # no 4 vertex contour at any threshold: fail like scanner.scan does
+        threshold = sweep_threshold(blur)[0]
+        if threshold is None:
+            raise ValueError("no threshold gives a 4 point contour")
+
+    with stage("threshold"):
+        thresh = cv2.threshold(blur, threshold, 255, cv2.THRESH_BINARY)[1]
+
+    with stage("findContours"):
+        cs = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return grab_contours(cs)
+
+# methods of sort_contours
+SORT_METHODS = ("left-to-right", "right-to-left", "top-to-bottom", "bottom-to-top", "reading-order")
+
+
+# all contour points in one array
+# parameters: contours
+# returns (M, 2) points, start index and number of points of every contour
+def flatten_contours(cnts):
+    counts = np.fromiter(map(len, cnts), dtype = "int64", count = len(cnts))
+    starts = np.zeros(len(cnts), dtype = "int64")
+    np.cumsum(counts[:-1], out = starts[1:])
+    pts = np.concatenate(cnts).reshape(-1, 2) if len(cnts) else np.empty((0, 2), dtype = "int32")
+    return (pts, starts, counts)
+
+# bounding boxes of all contours, the same as cv2.boundingRect
+# parameters: contours
+# returns (N, 4) int32 array of (x, y, w, h)
+def bounding_boxes(cnts):
+    boxes = np.zeros((len(cnts), 4), dtype = "int32")
+    if len(cnts) == 0:
+        return boxes
+
+    (pts, starts, _) = flatten_contours(cnts)
+    # one column at a time, reduceat is faster on contiguous data
+    for axis in (0, 1):
+        col = np.ascontiguousarray(pts[:, axis])
+        boxes[:, axis] = np.minimum.reduceat(col, starts)
+        boxes[:, axis + 2] = np.maximum.reduceat(col, starts) - boxes[:, axis] + 1
+    return boxes
+
+# areas of all contours, cv2.contourArea is cheap enough per contour that
+# gathering its results beats flattening the contours for a shoelace sum
+# parameters: contours
+# returns (N,) float64 array
+def contour_areas(cnts):
+    return np.fromiter(map(cv2.contourArea, cnts), dtype = "float64", count = len(cnts))
+
+# indices of the k largest values, largest first, without sorting all of them
+# parameters: values, k
+# returns index array
+def top_k(values, k):
+    values = np.asarray(values)
+    if k < len(values):
+        idx = np.argpartition(-values, k - 1)[:k]
+    else:
+        idx = np.arange(len(values))
+    return idx[np.argsort(-values[idx], kind = "stable")]
+
+# reading order of boxes: rows from top to bottom, left to right inside a row
+# a new row starts where the vertical centers jump by more than row_tolerance
+# (default: half the median box height)
+# parameters: (N, 4) boxes, row tolerance in pixels
+# returns index array
+def reading_order(boxes, row_tolerance = None):
+    boxes = np.asarray(boxes)
+    if len(boxes) == 0:
+        return np.zeros(0, dtype = "int64")
+    if row_tolerance is None:
+        row_tolerance = max(1.0, 0.5 * float(np.median(boxes[:, 3])))
+
+    # twice the vertical centers, integers with no rounding
+    centerY = 2 * boxes[:, 1].astype("int64") + boxes[:, 3]
+    byY = np.argsort(centerY, kind = "stable")
+    rows = np.zeros(len(boxes), dtype = "int64")
+    rows[byY[1:]] = np.cumsum(np.diff(centerY[byY]) > 2 * row_tolerance)
+
+    # a single sort on (row, x) packed into one integer key
+    x = boxes[:, 0].astype("int64")
+    x -= x.min()
+    return np.argsort(rows * (int(x.max()) + 1) + x, kind = "stable")
+
+# order of bounding boxes for a sorting method
+# parameters: (N, 4) boxes, method to sort(left-to-right, right-to-left, top-to-bottom, bottom-to-top, reading-order)
+# returns index array
+def sort_order(boundingBoxes, method="left-to-right"):
+    if method not in SORT_METHODS:
+        raise ValueError("unknown method {!r}, expected one of {}".format(method, ", ".join(SORT_METHODS)))
+    boundingBoxes = np.asarray(boundingBoxes)
+
+    if method == "reading-order":
+        return reading_order(boundingBoxes)
+
+    # handle if we are sorting against the y-coordinate rather than
+    # the x-coordinate of the bounding box
+    key = boundingBoxes[:, 1 if method in ("top-to-bottom", "bottom-to-top") else 0]
+
+    # handle if we need to sort in reverse; a stable sort on the negated key
+    # keeps equal keys in their original order, like sorted(reverse=True)
+    if method in ("right-to-left", "bottom-to-top"):
+        key = -key.astype("int64")
+    return np.argsort(key, kind = "stable")
+
+# function to sort
+# parameters: conotours in the image, method to sort, their (N, 4) bounding boxes if already known
+# returns sorted contours and their (N, 4) bounding boxes
+def sort_contours(cnts, method="left-to-right", boundingBoxes=None):
+    # construct the array of bounding boxes, unless the caller already has it
+    if boundingBoxes is None:
+        with stage("boundingRect"):
+            boundingBoxes = bounding_boxes(cnts)
+    with stage("sort"):
+        order = sort_order(boundingBoxes, method)
+
+    # return the list of sorted contours and bounding boxes
+    return ([cnts[i] for i in order.tolist()], np.asarray(boundingBoxes)[order])
+
+# adds ranked text on the image
+# parameters: image, specific contour, rank
+# returns image
+def draw_contour(image, c, i):
+    # compute the center of the contour area and draw a circle
+    # representing the center
+    M = cv2.moments(c)
+    cX = int(M["m10"] / M["m00"])
+    cY = int(M["m01"] / M["m00"])
+
+    # draw the countour number on the image
+    # parameters: image, text, initial point, font, font scale, color, thickness
+    cv2.putText(image, "#{}".format(i + 1), (cX - 20, cY), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+    # return the image with the contour number drawn on it
+    return image
+
+# edges of one color channel
+# parameters: image, channel index
+# returns single channel edge map
+def channel_edges(image, i):
+    # blur the channel, extract edges from it
+    with stage("medianBlur"):
+        chan = cv2.medianBlur(cv2.extractChannel(image, i), 11)
+    with stage("Canny"):
+        return cv2.Canny(chan, 50, 200)
+
+# accumulated edge map of the blue, green and red channels
+# parameters: image, number of threads (default: one per channel, at most one per core)
+# returns single channel edge map
+def edge_map(image, workers=None):
+    channels = range(image.shape[2]) if image.ndim == 3 else [0]
+    if workers is None:
+        workers = min(len(channels), os.cpu_count() or 1)
+
+    if workers > 1:
+        with ThreadPoolExecutor(workers) as pool:
+            edges = pool.map(lambda i: channel_edges(image, i), channels)
+            return accumulate(edges)
+    return accumulate(channel_edges(image, i) for i in channels)
+
+# OR edge maps together, in place into the first one
+# parameters: iterable of edge maps
+# returns single channel edge map
+def accumulate(edges):
+    accumEdged = None
+    for edged in edges:
+        if accumEdged is None:
+            accumEdged = edged
+        else:
+            cv2.bitwise_or(accumEdged, edged, dst = accumEdged)
+    return accumEdged
+
+# find contours in the accumulated edge map, keeping only the largest ones
+# parameters: edge map, number of contours to keep
+# returns list of contours
+def largest_contours(accumEdged, k=5):
+    with stage("findContours"):
+        cnts = cv2.findContours(accumEdged, cv2.RETR_EXTERNAL,
+            cv2.CHAIN_APPROX_SIMPLE)
+        cnts = grab_contours(cnts)
+    with stage("contourArea"):
+        return [cnts[i] for i in top_k(contour_areas(cnts), k)]
+
+# contours of the accumulated edge map, through a cache.ContourCache if given
+# parameters: image, cache
+# returns list of contours
+def edge_contours(image, cache=None):
+    if cache is not None:
+        return cache.contours(image, "edge_contours", lambda: edge_contours(image))
+
+    edged = edge_map(image)
+    with stage("findContours"):
+        cnts = cv2.findContours(edged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return grab_contours(cnts)
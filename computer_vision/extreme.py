@@ -0,0 +1,89 @@
+"""
+Extreme points of contours
+Approach:
+- threshold, then erode and dilate to remove small regions of noise
+- the largest external contour is the object
+- its left, right, top and bottom most points are the argmin / argmax of its
+  x and y co-ordinates
+
+Bulk mode (every object, e.g. hundreds of parts on a conveyor):
+- all_extreme_points works on the points of all contours concatenated into
+  one array, with the start of every contour in it
+- numpy has no per-segment argmin, so every co-ordinate is packed together
+  with the position of its point inside the contour into one integer key:
+  a min (max) reduceat over the keys then gives the smallest (largest)
+  co-ordinate of every contour and, in the low digits, where it is; ties go
+  to the first such point, like argmin / argmax
+- the result is an (N, 4, 2) array: left, right, top and bottom point per contour
+"""
+
+# import the necessary packages
+import cv2
+import numpy as np
+
+from .contours import flatten_contours, grab_contours
+from .profiling import stage
+
+
+def object_contours(image, cache = None):
+    # with a cache.ContourCache, a repeat run on the same image skips straight to the contours
+    if cache is not None:
+        return cache.contours(image, "object_contours", lambda: object_contours(image))
+
+    # conevert image to gray and blur it a bit
+    # blurring to reduce high frequency noise to make our contour detection process more accurate.
+    with stage("gray"):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    with stage("blur"):
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+
+    # threshold the image, then perform a series of erosions +
+    # dilations to remove any small regions of noise
+    with stage("threshold"):
+        thresh = cv2.threshold(gray, 45, 255, cv2.THRESH_BINARY)[1]
+    with stage("morphology"):
+        thresh = cv2.erode(thresh, None, iterations=2)
+        thresh = cv2.dilate(thresh, None, iterations=2)
+
+    # find and grab countours
+    with stage("findContours"):
+        cnts = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return grab_contours(cnts)
+
+def extreme_points(image, cache = None):
+    # save the maxinum countour by area
+    cnts = object_contours(image, cache)
+    with stage("contourArea"):
+        c = max(cnts, key = cv2.contourArea)
+
+    # determine the most extreme points along the contour
+    with stage("extremePoints"):
+        extLeft = tuple(c[c[:, :, 0].argmin()][0])
+        extRight = tuple(c[c[:, :, 0].argmax()][0])
+        extTop = tuple(c[c[:, :, 1].argmin()][0])
+        extBot = tuple(c[c[:, :, 1].argmax()][0])
+
+    return (c, (extLeft, extRight, extTop, extBot))
+
+def all_extreme_points(cnts):
+    # left, right, top and bottom most point of every contour, as an (N, 4, 2) array
+    ext = np.zeros((len(cnts), 4, 2), dtype = "int32")
+    if len(cnts) == 0:
+        return ext
+
+    with stage("extremePoints"):
+        (pts, starts, counts) = flatten_contours(cnts)
+        # position of every point inside its own contour
+        local = np.arange(len(pts)) - np.repeat(starts, counts)
+        size = int(counts.max())
+
+        for axis in (0, 1):
+            coord = pts[:, axis].astype("int64") * size
+            # smallest co-ordinate, lowest position first
+            key = np.minimum.reduceat(coord + local, starts)
+            ext[:, 2 * axis] = pts[starts + key % size]
+            # largest co-ordinate, lowest position first
+            key = np.maximum.reduceat(coord + (size - 1 - local), starts)
+            ext[:, 2 * axis + 1] = pts[starts + (size - 1 - key % size)]
+
+    return ext
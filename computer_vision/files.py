@@ -0,0 +1,53 @@
+"""
+Finding input images on disk
+"""
+
+# import the necessary packages
+import glob
+import os
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def is_image(path):
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+def list_images(directory):
+    # every image file directly inside directory, sorted by name
+    paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+    return sorted(p for p in paths if is_image(p))
+
+def collect_inputs(source):
+    # a directory: every image file inside it
+    if os.path.isdir(source):
+        return list_images(source)
+
+    # a manifest: one path per line, relative paths are relative to the manifest
+    if os.path.isfile(source) and not is_image(source):
+        root = os.path.dirname(source)
+        with open(source) as f:
+            lines = [line.strip() for line in f]
+        return [os.path.join(root, line) for line in lines if line and not line.startswith("#")]
+
+    # anything else is treated as a glob pattern
+    return sorted(glob.glob(source, recursive = True))
+
+def output_paths(paths, output, ext):
+    """
+    The output file of every input path: its path relative to the deepest
+    directory holding all the inputs, mirrored under output, with extension
+    ext.
+
+    returns a list of (dest, clash): clash is the earlier input that already
+    writes dest (page1.jpg and page1.png side by side), None for most inputs
+    """
+    if not paths:
+        return []
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    (result, writers) = ([], {})
+    for path in paths:
+        source = os.path.abspath(path)
+        dest = os.path.join(output, os.path.splitext(os.path.relpath(source, root))[0] + "." + ext)
+        earlier = writers.setdefault(dest, (path, source))
+        result.append((dest, earlier[0] if earlier[1] != source else None))
+    return result
@@ -0,0 +1,159 @@
+"""
+Quad geometry shared by the perspective transform and the document scanners
+Requirements:
+- python
+- NumPy
+Approach:
+- every function works on a stack of quads, an array of shape (N, 4, 2)
+- order the corners of all the quads at once: top-left, top-right, bottom-right, bottom-left
+- get the output width and height of every quad from the lengths of its edges
+- solve the N 8x8 linear systems of the homographies in one np.linalg.solve call;
+  a degenerate quad (repeated or collinear corners) gets a NaN matrix instead
+  of failing the whole batch, and no warp
+- the single quad helpers (order_points, four_point_transform) are the N = 1 case
+"""
+
+# import the necessary packages
+import cv2
+import numpy as np
+
+from .profiling import stage
+
+# smallest area of a triangle of 3 corners, relative to the squared extent
+# of the quad, for the quad not to count as degenerate (collinear corners)
+MIN_RELATIVE_AREA = 1e-9
+
+
+def order_points_batch(quads):
+    """
+    Order the corners of N quads, quads has shape (N, K, 2) with K >= 4
+    (usually 4, a rough polygon also works: its extreme points are used).
+
+    Logically for a certain perspective of the image,
+    top-left: min sum of coordinates
+    bottom-right: max sum of coordinates
+
+    top-right: min diff of coordinates
+    bottom-left: max diff of coordinates
+
+    returns a float32 array of shape (N, 4, 2)
+    """
+    quads = np.asarray(quads, dtype = "float32")
+
+    # sum and diff (y - x) of every corner, shape (N, K)
+    s = quads.sum(axis = 2)
+    diff = quads[:, :, 1] - quads[:, :, 0]
+
+    # index of tl, tr, br, bl within each quad, shape (N, 4)
+    idx = np.stack([s.argmin(axis = 1), diff.argmin(axis = 1),
+                    s.argmax(axis = 1), diff.argmax(axis = 1)], axis = 1)
+
+    return np.take_along_axis(quads, idx[:, :, None], axis = 1)
+
+def output_sizes(ordered):
+    """
+    Width and height of the "birds eye view" of N ordered quads:
+    the longest of the two opposite edges, truncated to int.
+
+    returns an int array of shape (N, 2) holding (width, height)
+    """
+    # edge vectors tl->tr, tr->br, br->bl, bl->tl and their lengths, shape (N, 4)
+    edges = np.roll(ordered, -1, axis = 1) - ordered
+    lengths = np.hypot(edges[:, :, 0], edges[:, :, 1]).astype(int)
+
+    width = np.maximum(lengths[:, 0], lengths[:, 2])
+    height = np.maximum(lengths[:, 1], lengths[:, 3])
+
+    return np.stack([width, height], axis = 1)
+
+def regular_quads(quads, sizes):
+    """
+    Which of N quads (N, 4, 2) have a homography onto their (width, height)
+    rectangles: no 3 corners on a line and at least 2x2 pixels of output.
+
+    returns a bool array of shape (N,)
+    """
+    # twice the signed area of the triangles (i, i + 1, i + 2) of the corners
+    (a, b, c) = (quads, np.roll(quads, -1, axis = 1), np.roll(quads, -2, axis = 1))
+    areas = (b[:, :, 0] - a[:, :, 0]) * (c[:, :, 1] - a[:, :, 1]) - (b[:, :, 1] - a[:, :, 1]) * (c[:, :, 0] - a[:, :, 0])
+    extent = np.ptp(quads, axis = 1).max(axis = 1) ** 2
+    return (np.abs(areas).min(axis = 1) > MIN_RELATIVE_AREA * extent) & (sizes > 1).all(axis = 1)
+
+def perspective_matrices(ordered, sizes = None):
+    """
+    Homographies mapping N ordered quads onto their (width, height)
+    rectangles, the batched equivalent of cv2.getPerspectiveTransform.
+
+    returns a float64 array of shape (N, 3, 3), all NaN for the quads whose
+    system is singular (repeated or collinear corners, an empty rectangle)
+    """
+    ordered = np.asarray(ordered, dtype = "float64")
+    if sizes is None:
+        sizes = output_sizes(ordered)
+    n = len(ordered)
+
+    # destination corners in the same tl, tr, br, bl order, shape (N, 4, 2)
+    (w, h) = (sizes[:, 0] - 1.0, sizes[:, 1] - 1.0)
+    zero = np.zeros(n)
+    dst = np.stack([np.stack([zero, zero], axis = 1),
+                    np.stack([w, zero], axis = 1),
+                    np.stack([w, h], axis = 1),
+                    np.stack([zero, h], axis = 1)], axis = 1)
+
+    # the quads are centered on their mean corner first, the systems are
+    # badly conditioned for quads far away from the origin otherwise
+    center = ordered.mean(axis = 1)
+    (x, y) = (ordered[:, :, 0] - center[:, 0:1], ordered[:, :, 1] - center[:, 1:2])
+    (u, v) = (dst[:, :, 0], dst[:, :, 1])
+    ones = np.ones_like(x)
+    zeros = np.zeros_like(x)
+
+    # two rows per correspondence (x, y) -> (u, v):
+    # [x, y, 1, 0, 0, 0, -x*u, -y*u] . m = u
+    # [0, 0, 0, x, y, 1, -x*v, -y*v] . m = v
+    A = np.empty((n, 8, 8))
+    A[:, 0::2] = np.stack([x, y, ones, zeros, zeros, zeros, -x * u, -y * u], axis = 2)
+    A[:, 1::2] = np.stack([zeros, zeros, zeros, x, y, ones, -x * v, -y * v], axis = 2)
+    b = np.empty((n, 8))
+    b[:, 0::2] = u
+    b[:, 1::2] = v
+
+    # solve all the regular systems at once, the singular ones stay NaN, and append m33 = 1
+    valid = regular_quads(np.stack([x, y], axis = 2), sizes)
+    if valid.all():
+        m = np.linalg.solve(A, b[:, :, None])[:, :, 0]
+    else:
+        m = np.full((n, 8), np.nan)
+        m[valid] = np.linalg.solve(A[valid], b[valid, :, None])[:, :, 0]
+    M = np.concatenate([m, np.ones((n, 1))], axis = 1).reshape(n, 3, 3)
+
+    # undo the centering: M = M_centered . translate(-center), then m33 = 1 again
+    T = np.tile(np.eye(3), (n, 1, 1))
+    T[:, :2, 2] = -center
+    M = M @ T
+    return M / M[:, 2:3, 2:3]
+
+def quad_transforms(quads):
+    """
+    Ordered corners, output sizes and homographies for N quads.
+
+    returns (ordered (N, 4, 2), sizes (N, 2), matrices (N, 3, 3))
+    """
+    ordered = order_points_batch(quads)
+    sizes = output_sizes(ordered)
+    return (ordered, sizes, perspective_matrices(ordered, sizes))
+
+def four_point_transform_batch(image, quads):
+    # the geometry is vectorized, the warps themselves are one call per quad, None for a degenerate quad
+    (_, sizes, matrices) = quad_transforms(quads)
+    with stage("warpPerspective"):
+        return [cv2.warpPerspective(image, M, (int(w), int(h))) if np.isfinite(M).all() else None
+                for (M, (w, h)) in zip(matrices, sizes)]
+
+def order_points(pts):
+    # single quad (K, 2) -> ordered (4, 2)
+    return order_points_batch(np.asarray(pts)[None])[0]
+
+def four_point_transform(image, pts):
+    # single quad version, pts does not need to be ordered
+    return four_point_transform_batch(image, np.asarray(pts)[None])[0]
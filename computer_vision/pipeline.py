@@ -0,0 +1,270 @@
+"""
+asyncio ingest pipeline for the document scanner
+Approach:
+- three stages connected by bounded asyncio queues:
+  - decode: cv2.imread on a thread pool (OpenCV releases the GIL, and the
+    threads overlap the disk reads)
+  - scan: corner detection, gray warp and packed threshold
+    (scanner.scan_packed) on a process pool, one OpenCV thread per process,
+    or with rig = (directory, name, size) the cached remap tables of a fixed rig
+    instead of the detection (see remap), loaded once per process;
+    the decode stage leaves the pixels in a shared memory block (SharedImage),
+    so only its name goes to the process instead of a pickled copy of the
+    image, and only the packed bits, 1/8 of the page, come back
+  - write: bilevel.write_bilevel on a thread pool
+- every stage has its own number of workers; a worker takes an item off its
+  inbox, runs it on the stage's executor and puts the result on the next
+  queue; a full queue blocks the stage feeding it (backpressure), so decoded
+  images never pile up in memory faster than they are scanned
+- the output files mirror the inputs' paths relative to the directory holding
+  them all (files.output_paths); an input that would overwrite another one's
+  output is reported as failed before the run starts
+- a file that fails in any stage is passed along as a failure and reported,
+  the rest of the run goes on
+- while the pipeline runs, the queue depths are sampled; at the end every
+  queue reports its mean and largest depth, every stage its items, busy time
+  and utilization (busy time / (wall time x workers)); the busy time of the
+  scan stage includes sending the image to its process
+- with profiling enabled, every item of every stage is also recorded as a
+  "pipeline.<stage>" span, one trace row per worker
+- a queue that stays full feeds the bottleneck stage, an empty one sits after it
+"""
+
+# import the necessary packages
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+
+import cv2
+import numpy as np
+
+from . import profiling
+from .batch import init_worker
+from .bilevel import write_bilevel
+from .files import collect_inputs, output_paths
+from .remap import rig_table
+from .scanner import scan_packed
+
+# end of input, passed from stage to stage
+DONE = object()
+
+# seconds between two samples of the queue depths
+SAMPLE_INTERVAL = 0.01
+
+
+class SharedImage:
+    """
+    An image in a shared memory block. Pickling it only sends the name, shape
+    and dtype of the block: the scan process maps the same memory instead of
+    receiving a copy of the pixels. The process closes its mapping, release()
+    in the parent frees the block.
+    """
+
+    def __init__(self, image):
+        (self.shape, self.dtype) = (image.shape, image.dtype.str)
+        self.shm = SharedMemory(create = True, size = max(1, image.nbytes))
+        self.name = self.shm.name
+        self.array()[...] = image
+
+    def array(self):
+        return np.ndarray(self.shape, self.dtype, buffer = self.shm.buf)
+
+    def __getstate__(self):
+        return (self.name, self.shape, self.dtype)
+
+    def __setstate__(self, state):
+        (self.name, self.shape, self.dtype) = state
+        self.shm = SharedMemory(self.name)
+
+    def close(self):
+        self.shm.close()
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+# the stage functions: fn(value, path) -> value of the next stage
+# they are module level so that the process pool can pickle them
+
+def decode_image(value, path):
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError("could not read image")
+    return SharedImage(image)
+
+def scan_image(shared, path, backend = "opencv", refine = True, threshold = 60, rig = None):
+    image = shared.array()
+    try:
+        table = rig_table(*rig) if rig is not None else None
+        (packed, width, _, _) = scan_packed(image, backend, refine, threshold, table)
+    finally:
+        # the mapping can only be closed once no array points into it
+        del image
+        shared.close()
+    return (packed, width)
+
+def write_image(result, path, dests, compression = None):
+    # dests: input path -> output file, see files.output_paths
+    (packed, width) = result
+    dest = dests[path]
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok = True)
+    write_bilevel(dest, packed, width, compression)
+    return dest
+
+class Stage:
+    """
+    One step of the pipeline: fn(value, path) runs on executor, up to workers
+    items at once; release(value), if given, is called on every input once
+    the stage is done with it. Counts the items it handled and the time its
+    workers spent waiting on the executor.
+    """
+
+    def __init__(self, name, fn, executor, workers, release = None):
+        self.name = name
+        self.fn = fn
+        self.executor = executor
+        self.workers = workers
+        self.release = release
+        self.items = 0
+        self.busy = 0.0
+
+    async def run(self, inbox, outbox, row = 0):
+        await asyncio.gather(*[self.work(inbox, outbox, row + i) for i in range(self.workers)])
+        await outbox.put(DONE)
+
+    async def work(self, inbox, outbox, row):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await inbox.get()
+            if item is DONE:
+                # leave it for the other workers of this stage
+                await inbox.put(DONE)
+                return
+
+            (path, value, error) = item
+            if error is None:
+                start = time.perf_counter_ns()
+                try:
+                    result = await loop.run_in_executor(self.executor, self.fn, value, path)
+                except Exception as e:
+                    (result, error) = (None, "{}: {}".format(self.name, e))
+                wall = time.perf_counter_ns() - start
+                self.busy += wall / 1e9
+                profiling.record("pipeline." + self.name, start, wall, thread = row)
+                if self.release is not None:
+                    self.release(value)
+                value = result
+                self.items += 1
+
+            await outbox.put((path, value, error))
+
+    def stats(self, elapsed):
+        utilization = self.busy / (elapsed * self.workers) if elapsed > 0 else 0.0
+        return dict(workers = self.workers, items = self.items, busy = self.busy, utilization = utilization)
+
+async def feed(paths, queue):
+    for path in paths:
+        await queue.put((path, path, None))
+    await queue.put(DONE)
+
+async def sample_depths(queues, depths):
+    # qsize of every queue, every SAMPLE_INTERVAL seconds, until cancelled
+    while True:
+        for (name, queue) in queues.items():
+            depths[name].append(queue.qsize())
+        await asyncio.sleep(SAMPLE_INTERVAL)
+
+async def run_stages(paths, stages, queue_size, on_result):
+    # paths -> stages[0] -> ... -> stages[-1] -> on_result(path, value, error)
+    # a queue is named after the stage it feeds, the last one is "done"
+    names = ["to " + stage.name for stage in stages] + ["done"]
+    queues = {name: asyncio.Queue(queue_size) for name in names}
+    depths = {name: [] for name in names}
+
+    tasks = [asyncio.create_task(feed(paths, queues[names[0]]))]
+    for (i, (stage, inbox, outbox)) in enumerate(zip(stages, names[:-1], names[1:])):
+        # trace rows 100, 101, ... for the workers of the first stage, 200, ... for the second
+        tasks.append(asyncio.create_task(stage.run(queues[inbox], queues[outbox], 100 * (i + 1))))
+    sampler = asyncio.create_task(sample_depths(queues, depths))
+
+    # drain the last queue
+    last = queues[names[-1]]
+    while True:
+        item = await last.get()
+        if item is DONE:
+            break
+        on_result(*item)
+
+    await asyncio.gather(*tasks)
+    sampler.cancel()
+    return {name: dict(maxsize = queue_size, mean = sum(d) / max(1, len(d)), max = max(d, default = 0))
+        for (name, d) in depths.items()}
+
+def run_pipeline(paths, output, decode_workers = 2, scan_workers = None, write_workers = 2, queue_size = 4,
+        backend = "opencv", refine = True, fmt = "png", compression = None, threshold = 60, rig = None, report = print):
+    """
+    Scans every image of paths into output as 1 bit fmt files, decode, scan
+    and write overlapping. report(line) gets an "ok" / "failed: <reason>"
+    line per file.
+
+    returns a dict: images, failed, elapsed, "stages" (per stage stats) and
+    "queues" (per queue depths)
+    """
+    os.makedirs(output, exist_ok = True)
+    scan_workers = scan_workers or os.cpu_count() or 1
+
+    results = {"failed": 0}
+
+    def on_result(path, value, error):
+        if error is not None:
+            results["failed"] += 1
+        report("{}\t{}".format(path, "ok" if error is None else "failed: " + error))
+
+    # inputs that would overwrite the output of an earlier one fail straight away
+    (queued, dests) = ([], {})
+    for (path, (dest, clash)) in zip(paths, output_paths(paths, output, fmt)):
+        if clash is not None:
+            on_result(path, None, "{} is already the output of {}".format(dest, clash))
+        else:
+            queued.append(path)
+            dests[path] = dest
+
+    with ThreadPoolExecutor(decode_workers) as decoders, \
+            ProcessPoolExecutor(scan_workers, initializer = init_worker) as scanners, \
+            ThreadPoolExecutor(write_workers) as writers:
+        stages = [
+            Stage("decode", decode_image, decoders, decode_workers),
+            Stage("scan", partial(scan_image, backend = backend, refine = refine, threshold = threshold, rig = rig),
+                scanners, scan_workers, SharedImage.release),
+            Stage("write", partial(write_image, dests = dests, compression = compression),
+                writers, write_workers),
+        ]
+
+        start = time.perf_counter()
+        queues = asyncio.run(run_stages(queued, stages, queue_size, on_result))
+        elapsed = time.perf_counter() - start
+
+    return dict(images = len(paths), failed = results["failed"], elapsed = elapsed,
+        stages = {stage.name: stage.stats(elapsed) for stage in stages}, queues = queues)
+
+def format_stats(stats):
+    # the summary lines of a run_pipeline result
+    rate = stats["images"] / stats["elapsed"] if stats["elapsed"] > 0 else 0.0
+    lines = ["{} images, {} ok, {} failed in {:.2f}s ({:.2f} images/sec)".format(stats["images"],
+        stats["images"] - stats["failed"], stats["failed"], stats["elapsed"], rate)]
+    for (name, s) in stats["stages"].items():
+        lines.append("stage {:<7} {:2d} workers, {:5d} items, busy {:7.2f}s, utilization {:4.0%}".format(
+            name, s["workers"], s["items"], s["busy"], s["utilization"]))
+    for (name, q) in stats["queues"].items():
+        lines.append("queue {:<10} depth mean {:5.2f}, max {:2d} of {}".format(name, q["mean"], q["max"], q["maxsize"]))
+    return lines
+
+def run_pipeline_batch(source, output, report = print, **kwargs):
+    # run_pipeline over a directory, glob pattern or manifest, reports the summary, returns the failures
+    stats = run_pipeline(collect_inputs(source), output, report = report, **kwargs)
+    for line in format_stats(stats):
+        report(line)
+    return stats["failed"]
@@ -0,0 +1,267 @@
+"""
+Per-stage profiling and tracing of the pipelines
+Approach:
+- the pipelines wrap every named step (resize, blur, threshold, findContours,
+  approxPolyDP, warpPerspective, threshold_local, lab, ...) in
+  "with stage(name):"
+- disabled (the default), stage() returns one shared do-nothing context
+  manager: a global lookup and two empty method calls per stage, nothing is
+  recorded or allocated
+- enable() installs a Profiler; from then on every stage records its wall
+  time, the CPU time of its thread, the wall time of the stages nested in it
+  (which gives its self time) and, with memory = True, its peak allocation
+  over what was allocated when it started, from tracemalloc (Python objects
+  and NumPy arrays, including the arrays OpenCV returns, not OpenCV's
+  internal buffers; tracemalloc slows Python allocations down, so it is off
+  unless asked for)
+- record() adds a span measured elsewhere, e.g. a stage that ran on a worker
+  process (stages inside worker processes are not recorded, the profiler
+  lives in the process that enabled it)
+- outputs:
+  - format_summary(): one line per stage name, sorted by self time
+  - write_trace(path): Chrome trace event JSON, opens in chrome://tracing
+    and https://ui.perfetto.dev
+  - prometheus(): text exposition format, counters per stage
+- only the standard library is imported, json, threading and tracemalloc
+  only when they are used, so the scripts can import this before parsing their
+  arguments
+"""
+
+# import the necessary packages
+import atexit
+import os
+import time
+
+
+class _NullStage:
+    # the context manager of every stage while profiling is disabled
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+# the active Profiler, None while profiling is disabled
+_profiler = None
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start", "cpu", "child", "base", "peak")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        profiler = self.profiler
+        stack = profiler.stack()
+        if profiler.memory:
+            import tracemalloc
+
+            # the peak so far belongs to the enclosing stage, then measure this one from here
+            (self.base, peak) = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.peak = self.base
+        stack.append(self)
+        self.child = 0
+        self.cpu = time.thread_time_ns()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        cpu = time.thread_time_ns() - self.cpu
+        profiler = self.profiler
+        stack = profiler.stack()
+        stack.pop()
+
+        wall = end - self.start
+        alloc = 0
+        if profiler.memory:
+            import tracemalloc
+
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            alloc = self.peak - self.base
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+        if stack:
+            stack[-1].child += wall
+
+        profiler.add(self.name, self.start, wall, wall - self.child, cpu, alloc)
+        return False
+
+class Profiler:
+    """
+    Collects one event per stage run: (name, start, wall, self, cpu, alloc,
+    thread), times in nanoseconds, alloc in bytes.
+    """
+
+    def __init__(self, memory = False):
+        import threading
+
+        self.memory = memory
+        self.events = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.ident = threading.get_ident
+        self.origin = time.perf_counter_ns()
+
+    def stack(self):
+        # open stages of the calling thread
+        try:
+            return self.local.stack
+        except AttributeError:
+            self.local.stack = []
+            return self.local.stack
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def add(self, name, start, wall, own = None, cpu = None, alloc = 0, thread = None):
+        event = (name, start, wall, wall if own is None else own, cpu, alloc,
+            self.ident() if thread is None else thread)
+        with self.lock:
+            self.events.append(event)
+
+    def summary(self):
+        # per stage name: calls, wall, self, cpu (ns) and the largest alloc (bytes)
+        rows = {}
+        for (name, _, wall, own, cpu, alloc, _) in self.events:
+            row = rows.setdefault(name, dict(calls = 0, wall = 0, self = 0, cpu = 0, alloc = 0))
+            row["calls"] += 1
+            row["wall"] += wall
+            row["self"] += own
+            # spans added with record() may not know their CPU time
+            row["cpu"] += 0 if cpu is None else cpu
+            row["alloc"] = max(row["alloc"], alloc)
+        return rows
+
+    def trace_events(self):
+        # Chrome trace "complete" events, microseconds since the profiler started
+        pid = os.getpid()
+        events = []
+        for (name, start, wall, own, cpu, alloc, thread) in self.events:
+            args = dict(self_ms = own / 1e6)
+            if cpu is not None:
+                args["cpu_ms"] = cpu / 1e6
+            if self.memory:
+                args["alloc_bytes"] = alloc
+            events.append(dict(name = name, cat = "stage", ph = "X", ts = (start - self.origin) / 1e3,
+                dur = wall / 1e3, pid = pid, tid = thread, args = args))
+        return events
+
+def enable(memory = False):
+    # start recording, returns the Profiler
+    global _profiler
+    if memory:
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+    _profiler = Profiler(memory)
+    return _profiler
+
+def disable():
+    # stop recording, returns the Profiler that was active (or None)
+    global _profiler
+    (profiler, _profiler) = (_profiler, None)
+    if profiler is not None and profiler.memory:
+        import tracemalloc
+
+        tracemalloc.stop()
+    return profiler
+
+def active():
+    return _profiler
+
+def stage(name):
+    # "with stage(name):" around a step of a pipeline
+    if _profiler is None:
+        return _NULL_STAGE
+    return _profiler.stage(name)
+
+def record(name, start, wall, cpu = None, thread = None):
+    # a span measured by the caller (perf_counter_ns start, ns durations), thread is the trace row
+    if _profiler is not None:
+        _profiler.add(name, start, wall, cpu = cpu, thread = thread)
+
+def format_summary(profiler):
+    # one line per stage, the largest self time first
+    rows = profiler.summary()
+    total = sum(row["self"] for row in rows.values()) or 1
+    lines = ["{:<18} {:>7} {:>10} {:>10} {:>9} {:>10} {:>6} {:>10}".format(
+        "stage", "calls", "wall ms", "self ms", "mean ms", "cpu ms", "self%", "alloc MB")]
+    for (name, row) in sorted(rows.items(), key = lambda item: -item[1]["self"]):
+        lines.append("{:<18} {:>7d} {:>10.2f} {:>10.2f} {:>9.3f} {:>10.2f} {:>5.1f}% {:>10}".format(
+            name, row["calls"], row["wall"] / 1e6, row["self"] / 1e6, row["wall"] / row["calls"] / 1e6,
+            row["cpu"] / 1e6, 100.0 * row["self"] / total,
+            "{:.2f}".format(row["alloc"] / 2 ** 20) if profiler.memory else "-"))
+    return lines
+
+def write_trace(path, profiler):
+    # Chrome trace event format, for chrome://tracing or ui.perfetto.dev
+    import json
+
+    with open(path, "w") as f:
+        json.dump(dict(traceEvents = profiler.trace_events(), displayTimeUnit = "ms"), f)
+
+def prometheus(profiler, prefix = "cv_stage"):
+    # Prometheus text exposition format, one series per stage and metric
+    rows = profiler.summary()
+    metrics = [
+        ("calls_total", "counter", "Number of runs of the stage", lambda row: row["calls"]),
+        ("seconds_total", "counter", "Wall time spent in the stage", lambda row: row["wall"] / 1e9),
+        ("self_seconds_total", "counter", "Wall time in the stage outside of nested stages",
+            lambda row: row["self"] / 1e9),
+        ("cpu_seconds_total", "counter", "CPU time of the thread running the stage", lambda row: row["cpu"] / 1e9),
+    ]
+    if profiler.memory:
+        metrics.append(("peak_alloc_bytes", "gauge", "Largest allocation peak of one run of the stage",
+            lambda row: row["alloc"]))
+
+    lines = []
+    for (suffix, kind, text, value) in metrics:
+        name = "{}_{}".format(prefix, suffix)
+        lines.append("# HELP {} {}".format(name, text))
+        lines.append("# TYPE {} {}".format(name, kind))
+        for (stage_name, row) in sorted(rows.items()):
+            lines.append('{}{{stage="{}"}} {!r}'.format(name, stage_name, value(row)))
+    return "\n".join(lines) + "\n"
+
+def write_output(path, profiler):
+    # .json: Chrome trace, anything else: Prometheus metrics
+    if path.endswith(".json"):
+        write_trace(path, profiler)
+    else:
+        with open(path, "w") as f:
+            f.write(prometheus(profiler))
+
+def add_arguments(ap):
+    # the profiling options of the scripts
+    ap.add_argument("--profile", action="store_true", help="print the time spent in every stage")
+    ap.add_argument("--profile-out", help="write the stages as a Chrome trace (.json) or Prometheus metrics (.prom)")
+    ap.add_argument("--profile-memory", action="store_true", help="also record the peak allocation of every stage")
+
+def from_args(args):
+    # enable profiling if the parsed arguments ask for it, the report comes out when the script exits
+    if args.get("profile") or args.get("profile_out") or args.get("profile_memory"):
+        atexit.register(report, args)
+        return enable(args.get("profile_memory", False))
+    return None
+
+def report(args):
+    # print / write what from_args enabled, then stop recording
+    profiler = disable()
+    if profiler is None:
+        return
+    if args.get("profile") or not args.get("profile_out"):
+        for line in format_summary(profiler):
+            print(line)
+    if args.get("profile_out"):
+        write_output(args["profile_out"], profiler)
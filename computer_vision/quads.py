@@ -0,0 +1,141 @@
+"""
+Finding the 4 point polygon of a document among candidate contours
+Approach:
+- the scanners used to try a single approxPolyDP(c, 0.02 * perimeter) on the
+  5 largest contours and gave up when none came out with exactly 4 points (a
+  folded or torn corner, a thumb over the page edge, a slightly rounded
+  corner); documentScanner used 0.009 and assumed 4 points came out
+- find_quad goes through the candidates largest first, and tries on each:
+  - approx: approxPolyDP at the scanner's epsilon, as before
+  - hull: the convex hull loses one edge at a time, the one whose removal
+    (its neighbours extended to their intersection) adds the least area,
+    until 4 are left: a folded or cut off corner gets its corner back
+  - bisect: the vertex count falls as epsilon grows, so epsilon is bisected
+    (geometrically, between min_epsilon and max_epsilon of the perimeter)
+    until exactly 4 vertices come out, starting from what the first try gave:
+    an object touching the page gets cut off
+  - rect: the minimum area rectangle of the contour
+- the fallbacks would make a quad out of any blob, so their quads are only
+  kept when they describe the contour: a quad must be convex and cover the
+  contour's area within max_deviation (5%), and the contour must be at least
+  min_area pixels; the approx try keeps accepting what it always did
+- the perimeters, areas and approx tries of all candidates are computed in
+  one go, the fallbacks only run on the candidates that are larger than the
+  first one resolved by approx
+"""
+
+# import the necessary packages
+import cv2
+import numpy as np
+
+from .profiling import stage
+
+# order of the tries, the method find_quad reports
+METHODS = ("approx", "hull", "bisect", "rect")
+
+
+def vertex_count_quad(c, peri, lo, hi, steps, counts = None):
+    # 4 point approxPolyDP of c for an epsilon in [lo, hi] (fractions of peri), None if bisection finds none
+    # counts: {epsilon: vertex count} already known, used to narrow the range first
+    for (eps, n) in (counts or {}).items():
+        if n > 4:
+            lo = max(lo, eps)
+        elif n < 4:
+            hi = min(hi, eps)
+    for _ in range(steps):
+        if lo >= hi:
+            break
+        eps = np.sqrt(lo * hi)
+        approx = cv2.approxPolyDP(c, eps * peri, True)
+        if len(approx) == 4:
+            return approx
+        if len(approx) > 4:
+            lo = eps
+        else:
+            hi = eps
+    return None
+
+def hull_quad(c, epsilon = 0.01):
+    # convex hull of c (lightly simplified) reduced to 4 vertices by edge removal, None if it cannot be
+    hull = cv2.convexHull(c)
+    poly = cv2.approxPolyDP(hull, epsilon * cv2.arcLength(hull, True), True).reshape(-1, 2).astype("float64")
+    while len(poly) > 4:
+        n = len(poly)
+        best = None
+        for i in range(n):
+            (a, b, p, q) = (poly[i - 1], poly[i], poly[(i + 1) % n], poly[(i + 2) % n])
+            # intersection x of the lines a -> b and q -> p
+            (d1, d2) = (b - a, p - q)
+            det = d1[0] * d2[1] - d1[1] * d2[0]
+            if abs(det) < 1e-9:
+                continue
+            t = ((q - a)[0] * d2[1] - (q - a)[1] * d2[0]) / det
+            if t < 1:
+                # the lines meet behind b, not outside of the edge b -> p
+                continue
+            x = a + t * d1
+            added = abs((p - b)[0] * (x - b)[1] - (p - b)[1] * (x - b)[0]) / 2.0
+            if best is None or added < best[0]:
+                best = (added, i, x)
+        if best is None:
+            return None
+        (_, i, x) = best
+        poly[i] = x
+        poly = np.delete(poly, (i + 1) % n, axis = 0)
+    if len(poly) < 4:
+        return None
+    return np.round(poly).astype("int32").reshape(4, 1, 2)
+
+def rect_quad(c):
+    # corners of the minimum area rectangle of c, in the (4, 1, 2) int32 layout of approxPolyDP
+    box = cv2.boxPoints(cv2.minAreaRect(c))
+    return np.round(box).astype("int32").reshape(4, 1, 2)
+
+def fits(quad, area, max_deviation):
+    # a convex quad covering the contour's area within max_deviation
+    if quad is None or not cv2.isContourConvex(quad):
+        return False
+    return abs(cv2.contourArea(quad) - area) <= max_deviation * area
+
+def find_quad(cnts, epsilon = 0.02, min_area = 0, max_deviation = 0.05, min_epsilon = 0.002, max_epsilon = 0.1,
+        steps = 12):
+    """
+    The 4 point polygon of the largest of the candidate contours cnts that
+    has one, see the module docstring for the tries.
+
+    returns (approx, method): approx is (4, 1, 2) int32 like approxPolyDP,
+    method one of METHODS; (None, None) when no candidate gives a quad
+    """
+    if len(cnts) == 0:
+        return (None, None)
+
+    # every candidate at the fixed epsilon first
+    with stage("approxPolyDP"):
+        areas = [cv2.contourArea(c) for c in cnts]
+        order = sorted(range(len(cnts)), key = lambda i: -areas[i])
+        peris = [cv2.arcLength(c, True) for c in cnts]
+        approxes = [cv2.approxPolyDP(c, epsilon * peri, True) for (c, peri) in zip(cnts, peris)]
+
+    with stage("quad_search"):
+        for i in order:
+            if len(approxes[i]) == 4:
+                return (approxes[i], "approx")
+
+            # the fallbacks, larger candidates than the first approx hit only
+            if areas[i] < max(min_area, 1):
+                continue
+            (c, peri, area) = (cnts[i], peris[i], areas[i])
+
+            quad = hull_quad(c)
+            if fits(quad, area, max_deviation):
+                return (quad, "hull")
+
+            quad = vertex_count_quad(c, peri, min_epsilon, max_epsilon, steps, {epsilon: len(approxes[i])})
+            if fits(quad, area, max_deviation):
+                return (quad, "bisect")
+
+            quad = rect_quad(c)
+            if fits(quad, area, max_deviation):
+                return (quad, "rect")
+
+    return (None, None)
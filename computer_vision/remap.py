@@ -0,0 +1,222 @@
+"""
+Cached remap tables for fixed camera rigs
+Approach:
+- on a fixed overhead rig the document is always in the same place, so the
+  corners, the homography and the output size are found once, on a
+  calibration frame, instead of on every frame
+- warpPerspective maps every output pixel back through the homography (a
+  division per pixel) on every call; remap_tables does that once and stores
+  the result in the fixed point format of cv2.remap (CV_16SC2): per output
+  pixel an int16 (x, y) source pixel and a uint16 index into the 32x32
+  bilinear interpolation table, 6 bytes per page pixel on disk and in memory
+  (color warps)
+- the coordinates are computed in double precision and rounded to 1/32 px,
+  the precision of OpenCV's fixed point interpolation; warpPerspective (from
+  OpenCV 5 on) interpolates at full precision, the pages differ by a few
+  gray levels at most, on sharp edges
+- 1 channel remap is faster on float32 maps than on fixed point ones (on
+  OpenCV 5, 12 vs 30 ms for a 1618x2286 page; on 3 channels it is the other
+  way round), so warp_gray expands the tables to float32 maps once, on first
+  use, and keeps them with the table: 8 more bytes per page pixel in memory,
+  14 in all; the gray warp then costs about what warpPerspective does, the
+  time a rig saves there is the detection (see scanner.scan_packed)
+- the tables only address the bounding box of the quad (plus a margin for
+  the interpolation), a frame is cropped to it first and only that crop is
+  converted to gray by warp_gray
+- RigTables keeps the tables of every rig and output size as an .npz file in a
+  directory and the most recently used ones in memory, an LRU of `capacity`
+  tables; rig_table shares one RigTables per directory within a process (the
+  batch and pipeline workers)
+"""
+
+# import the necessary packages
+import os
+import re
+import tempfile
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from .geometry import perspective_matrices, quad_transforms
+from .profiling import stage
+
+# sub-pixel steps of the remap tables, cv2.INTER_TAB_SIZE
+INTER_TAB_SIZE = 32
+# LRU size of RigTables
+DEFAULT_CAPACITY = 4
+
+
+def remap_tables(M, size, origin = (0, 0), rows = 256):
+    # CV_16SC2 tables of the warp by M onto size (width, height), source coordinates relative to origin
+    (width, height) = size
+    Minv = np.linalg.inv(M)
+    map1 = np.empty((height, width, 2), dtype = "int16")
+    map2 = np.empty((height, width), dtype = "uint16")
+    xs = np.arange(width, dtype = "float64")[None, :]
+
+    # a block of rows at a time, the float64 coordinates of the whole output are not needed at once
+    for y0 in range(0, height, rows):
+        ys = np.arange(y0, min(height, y0 + rows), dtype = "float64")[:, None]
+        w = Minv[2, 0] * xs + Minv[2, 1] * ys + Minv[2, 2]
+        w = np.where(w != 0, 1.0 / np.where(w != 0, w, 1.0), 0.0)
+        x = (Minv[0, 0] * xs + Minv[0, 1] * ys + Minv[0, 2]) * w - origin[0]
+        y = (Minv[1, 0] * xs + Minv[1, 1] * ys + Minv[1, 2]) * w - origin[1]
+
+        # fixed point, 1/32 px: integer part in map1, fractional parts as a table index in map2
+        limit = np.iinfo("int16").max * INTER_TAB_SIZE
+        ix = np.clip(np.rint(x * INTER_TAB_SIZE), -limit, limit).astype("int64")
+        iy = np.clip(np.rint(y * INTER_TAB_SIZE), -limit, limit).astype("int64")
+        map1[y0:y0 + len(ys), :, 0] = ix >> 5
+        map1[y0:y0 + len(ys), :, 1] = iy >> 5
+        map2[y0:y0 + len(ys)] = (iy & (INTER_TAB_SIZE - 1)) * INTER_TAB_SIZE + (ix & (INTER_TAB_SIZE - 1))
+
+    return (map1, map2)
+
+class RemapTable:
+    """
+    The warp of one rig onto one output size: the ordered quad and the
+    homography (in the coordinates of the full frame), the frame shape it was
+    calibrated on, the crop the tables address, (x, y, width, height), and
+    the tables themselves.
+    """
+
+    def __init__(self, quad, M, size, source, roi, map1, map2):
+        self.quad = np.asarray(quad, dtype = "float32")
+        self.M = np.asarray(M, dtype = "float64")
+        self.size = tuple(int(v) for v in size)
+        self.source = tuple(int(v) for v in source)
+        self.roi = tuple(int(v) for v in roi)
+        self.map1 = map1
+        self.map2 = map2
+        self.float_maps = None
+
+    @classmethod
+    def calibrate(cls, pts, source, size = None, margin = 2):
+        # tables of the quad pts of a frame of shape source, onto size (default: the quad's own)
+        (ordered, sizes, matrices) = quad_transforms(np.asarray(pts, dtype = "float64")[None])
+        if size is not None:
+            sizes = np.array([size])
+            matrices = perspective_matrices(ordered, sizes)
+        (h, w) = source[:2]
+        (x, y, bw, bh) = cv2.boundingRect(ordered[0].astype("float32"))
+        (x0, y0) = (max(0, x - margin), max(0, y - margin))
+        (x1, y1) = (min(w, x + bw + margin), min(h, y + bh + margin))
+
+        with stage("remap_tables"):
+            (map1, map2) = remap_tables(matrices[0], sizes[0], (x0, y0))
+        return cls(ordered[0], matrices[0], sizes[0], (h, w), (x0, y0, x1 - x0, y1 - y0), map1, map2)
+
+    def crop(self, image):
+        if image.shape[:2] != self.source:
+            raise ValueError("frame is {}x{}, the rig was calibrated on {}x{} frames".format(
+                image.shape[1], image.shape[0], self.source[1], self.source[0]))
+        (x, y, w, h) = self.roi
+        return image[y:y + h, x:x + w]
+
+    def warp(self, image, dst = None):
+        # the same as four_point_transform(image, quad), through the tables
+        with stage("remap"):
+            return cv2.remap(self.crop(image), self.map1, self.map2, cv2.INTER_LINEAR, dst = dst)
+
+    def warp_gray(self, image, dst = None):
+        # the gray top-down view, only the crop is converted to gray
+        crop = self.crop(image)
+        if crop.ndim == 3:
+            with stage("gray"):
+                crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        if self.float_maps is None:
+            self.float_maps = cv2.convertMaps(self.map1, self.map2, cv2.CV_32FC1)
+        with stage("remap"):
+            return cv2.remap(crop, self.float_maps[0], self.float_maps[1], cv2.INTER_LINEAR, dst = dst)
+
+    def save(self, path):
+        # uncompressed .npz, written to a temporary file first
+        (fd, tmp) = tempfile.mkstemp(dir = os.path.dirname(path) or ".", suffix = ".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, quad = self.quad, M = self.M, size = self.size, source = self.source, roi = self.roi,
+                map1 = self.map1, map2 = self.map2)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["quad"], data["M"], data["size"], data["source"], data["roi"], data["map1"],
+                data["map2"])
+
+class RigTables:
+    def __init__(self, directory, capacity = DEFAULT_CAPACITY):
+        self.directory = os.path.expanduser(directory)
+        self.capacity = capacity
+        # (rig, (width, height)) -> RemapTable, least recently used first
+        self.tables = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok = True)
+
+    def path(self, rig, size):
+        if not rig or os.sep in rig or (os.altsep and os.altsep in rig):
+            raise ValueError("invalid rig name {!r}".format(rig))
+        return os.path.join(self.directory, "{}_{}x{}.npz".format(rig, size[0], size[1]))
+
+    def calibrate(self, rig, pts, source, size = None):
+        # compute and store the tables of a rig from the quad pts of a frame of shape source
+        table = RemapTable.calibrate(pts, source, size)
+        table.save(self.path(rig, table.size))
+        self.remember((rig, table.size), table)
+        return table
+
+    def get(self, rig, size = None):
+        # the tables of a rig, for size (width, height) or the most recently calibrated one
+        if size is None:
+            size = self.latest_size(rig)
+        key = (rig, tuple(int(v) for v in size))
+        table = self.tables.get(key)
+        if table is not None:
+            self.tables.move_to_end(key)
+            self.hits += 1
+            return table
+
+        self.misses += 1
+        path = self.path(rig, key[1])
+        if not os.path.exists(path):
+            raise KeyError("rig {!r} is not calibrated for {}x{}".format(rig, key[1][0], key[1][1]))
+        with stage("remap_load"):
+            table = RemapTable.load(path)
+        self.remember(key, table)
+        return table
+
+    def latest_size(self, rig):
+        # exactly <rig>_<width>x<height>.npz, not the files of a rig named <rig>_<something>
+        pattern = re.compile(r"^{}_(\d+)x(\d+)\.npz$".format(re.escape(rig)))
+        (latest, size) = (None, None)
+        for name in os.listdir(self.directory):
+            m = pattern.match(name)
+            if m is None:
+                continue
+            mtime = os.path.getmtime(os.path.join(self.directory, name))
+            if latest is None or mtime > latest:
+                (latest, size) = (mtime, (int(m.group(1)), int(m.group(2))))
+        if size is None:
+            raise KeyError("rig {!r} is not calibrated".format(rig))
+        return size
+
+    def remember(self, key, table):
+        self.tables[key] = table
+        self.tables.move_to_end(key)
+        while len(self.tables) > self.capacity:
+            self.tables.popitem(last = False)
+            self.evictions += 1
+
+    def stats(self):
+        return dict(hits = self.hits, misses = self.misses, evictions = self.evictions, loaded = len(self.tables))
+
+# RigTables per directory, shared by everything in this process
+_rigs = {}
+
+def rig_table(directory, rig, size = None):
+    # the tables of a rig through the RigTables of this process for directory
+    if directory not in _rigs:
+        _rigs[directory] = RigTables(directory)
+    return _rigs[directory].get(rig, size)
@@ -0,0 +1,205 @@
+"""
+Document scanner pipelines
+Approach:
+- scan(): the docScannerOptimized pipeline
+  - find the largest 4 point contour on a 500 px high pyramid level
+  - scale it back up and refine every corner on a small window of the full
+    resolution image
+  - four point transform of the full resolution image, then local threshold
+- scan_packed(): the same detection, then only the gray plane is warped and the
+  threshold is packed to 1 bit per pixel strip by strip (see bilevel)
+- scan_packed(orig, table = RemapTable) skips the detection altogether: on a
+  fixed rig the page is where it was at calibration, the cached remap tables
+  of the rig warp it (see remap)
+- scan_tiled(): the same detection, then the warp and threshold in horizontal
+  strips written straight to a file, within a memory budget (see tiled)
+- scan_largest_contour(): the documentScanner pipeline, vertices of the largest
+  contour straight away, no multi-scale detection
+- every pipeline binarizes the detection image at threshold 60 by default,
+  threshold = "auto" picks it per image with sweep.sweep_threshold instead;
+  either way the same contour, min_area and find_quad steps give the quad
+- the 4 point polygon comes from quads.find_quad: when approxPolyDP at the
+  usual epsilon gives no quad, epsilon is searched, then the convex hull and
+  the minimum area rectangle are tried
+"""
+
+# import the necessary packages
+import cv2
+import numpy as np
+
+from .bilevel import binarize_packed, warp_gray
+from .contours import grab_contours
+from .geometry import four_point_transform, order_points
+from .profiling import stage
+from .quads import find_quad
+from .sweep import sweep_threshold
+from .threshold import binarize
+from .tiled import DEFAULT_BUDGET_MB, warp_binarize_tiled
+
+
+def find_screen_contour(image, threshold = 60, min_area = 0.05):
+    # preprocess and get max contour
+    with stage("gray"):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    with stage("blur"):
+        blur = cv2.GaussianBlur(gray, (5, 5), 0)
+
+    # the sweep only picks the threshold (it scores thresholds by the
+    # approxPolyDP test at 0.02), the quad comes out of the same steps as
+    # with a fixed one: min_area and the find_quad fallbacks apply too
+    if threshold == "auto":
+        threshold = sweep_threshold(blur)[0]
+        if threshold is None:
+            return None
+
+    with stage("threshold"):
+        thresh = cv2.threshold(blur, threshold, 255, cv2.THRESH_BINARY)[1]
+
+    with stage("findContours"):
+        cs = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        cs = grab_contours(cs)
+        cnts = sorted(cs, key = cv2.contourArea, reverse = True)[:5]
+
+    # the 4 point polygon of the largest candidate that has one, adapting
+    # epsilon (see quads) when approxPolyDP at 0.02 does not give 4 points;
+    # None if no candidate gives a quad
+    return find_quad(cnts, 0.02, min_area = min_area * gray.size)[0]
+
+def pyramid_level(image, height = 500):
+    # decimating a 40 MP image with INTER_AREA in one go costs more than the
+    # whole detection, nearest neighbour down to 2x the target height is almost
+    # free and the last 2x INTER_AREA step still averages out the aliasing
+    (h, w) = image.shape[:2]
+    if h > 2 * height:
+        image = cv2.resize(image, (max(1, int(w * 2 * height / h)), 2 * height), interpolation = cv2.INTER_NEAREST)
+        (h, w) = image.shape[:2]
+    return cv2.resize(image, (max(1, int(w * height / float(h))), height), interpolation = cv2.INTER_AREA)
+
+def refine_corners(orig, corners, ratio):
+    # the upscaled corners are off by up to a few ratio pixels,
+    # the search window has to cover that
+    win = max(11, int(3 * ratio))
+    margin = 2 * win + 2
+    criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 50, 0.01)
+    (h, w) = orig.shape[:2]
+
+    refined = np.array(corners, dtype = "float32")
+    for (i, (x, y)) in enumerate(refined):
+        # only this patch of the full resolution image is ever looked at
+        (x0, y0) = (max(0, int(x) - margin), max(0, int(y) - margin))
+        (x1, y1) = (min(w, int(x) + margin + 1), min(h, int(y) + margin + 1))
+        patch = orig[y0:y1, x0:x1]
+        # a corner on the image border leaves too small a patch, keep the coarse one
+        if min(patch.shape[:2]) < 2 * win + 5:
+            continue
+        if patch.ndim == 3:
+            patch = cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY)
+        patch = cv2.GaussianBlur(patch, (5, 5), 0)
+
+        p = np.array([[x - x0, y - y0]], dtype = "float32")
+        cv2.cornerSubPix(patch, p, (win, win), (-1, -1), criteria)
+        p = p[0] + (x0, y0)
+
+        # keep the coarse corner if the refinement ran off
+        if np.hypot(*(p - (x, y))) <= 1.5 * win:
+            refined[i] = p
+
+    return refined
+
+def detection_threshold(orig, height = 500):
+    # (threshold, stats) picked by sweep.sweep_threshold on the detection copy of orig
+    with stage("resize"):
+        image = pyramid_level(orig, height)
+    with stage("gray"):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    with stage("blur"):
+        blur = cv2.GaussianBlur(gray, (5, 5), 0)
+    (threshold, _, stats) = sweep_threshold(blur)
+    return (threshold, stats)
+
+def detect_corners(orig, refine = True, threshold = 60):
+    # detect on a 500 px high copy and keep track of the ratio
+    # of original height to the new one to scale the contour back up
+    with stage("resize"):
+        image = pyramid_level(orig, 500)
+    ratio = orig.shape[0] / 500.0
+
+    screenCnt = find_screen_contour(image, threshold)
+    if screenCnt is None:
+        raise ValueError("no 4 point contour found")
+
+    pts = screenCnt.reshape(4, 2) * ratio
+    if refine and ratio > 1:
+        with stage("refine"):
+            pts = refine_corners(orig, pts, ratio)
+
+    return (pts, screenCnt, ratio)
+
+def scan(orig, backend = "opencv", refine = True, threshold = 60):
+    (pts, screenCnt, ratio) = detect_corners(orig, refine, threshold)
+
+    # apply the four point transform to obtain a top-down
+    # view of the original image
+    warped = four_point_transform(orig, pts)
+
+    # convert the warped image to grayscale, then threshold it
+    # to give it that 'black and white' paper effect
+    with stage("gray"):
+        warped = cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
+    with stage("threshold_local"):
+        warped = binarize(warped, 51, offset = 10, method = "gaussian", backend = backend)
+
+    return (warped, screenCnt, ratio)
+
+def scan_packed(orig, backend = "opencv", refine = True, threshold = 60, table = None):
+    # same as scan, but the page comes out as packed bits, (height, ceil(width / 8)) uint8
+    # table: the remap.RemapTable of a fixed rig, used instead of detecting the page
+    if table is not None:
+        ratio = orig.shape[0] / 500.0
+        screenCnt = np.round(table.quad / ratio).astype("int32").reshape(4, 1, 2)
+        warped = table.warp_gray(orig)
+    else:
+        (pts, screenCnt, ratio) = detect_corners(orig, refine, threshold)
+        warped = warp_gray(orig, pts)
+    packed = binarize_packed(warped, 51, offset = 10, method = "gaussian", backend = backend)
+    return (packed, warped.shape[1], screenCnt, ratio)
+
+def scan_tiled(orig, output, budget_mb = DEFAULT_BUDGET_MB, backend = "opencv", refine = True, threshold = 60):
+    # same as scan, but the warp and threshold run in strips written straight to output (.npy, .pgm or .pbm)
+    (pts, screenCnt, ratio) = detect_corners(orig, refine, threshold)
+    shape = warp_binarize_tiled(orig, pts, output, budget_mb, backend)
+    return (shape, screenCnt, ratio)
+
+def scan_largest_contour(image, threshold = 60):
+    # preprocess and get max contour
+    with stage("gray"):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    with stage("blur"):
+        blur = cv2.GaussianBlur(gray, (5, 5), 0)
+    if threshold == "auto":
+        threshold = sweep_threshold(blur)[0]
+        if threshold is None:
+            raise ValueError("no threshold gives a 4 point contour")
+    with stage("threshold"):
+        thresh = cv2.threshold(blur, threshold, 255, cv2.THRESH_BINARY)[1]
+
+    with stage("findContours"):
+        cs = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        cs = grab_contours(cs)
+        cnts = sorted(cs, key = cv2.contourArea, reverse = True)[:5]
+
+    # get arranged coordinates of the vertices of the max contour,
+    # approxPolyDP at 0.009 first, then the quad search
+    (approx, _) = find_quad(cnts, 0.009, min_area = 0.05 * gray.size)
+    if approx is None:
+        raise ValueError("no 4 point contour found")
+    ordered = order_points(approx.reshape(4, 2))
+
+    # transform
+    warped = four_point_transform(image, ordered)
+    with stage("gray"):
+        warped = cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
+    with stage("threshold_local"):
+        warped = binarize(warped, 51, offset = 10, method = "gaussian")
+
+    return (warped, ordered)
@@ -0,0 +1,376 @@
+"""
+Local scanning service with pre-warmed workers
+Approach:
+- a one-off scan is dominated by the start of a fresh interpreter: importing
+  NumPy, OpenCV, imutils and scikit-image, parsing the arguments, OpenCV's
+  lazy initialisation on the first call; the service pays that once
+- an HTTP server on localhost (or on a Unix socket) takes image bytes in the
+  body of a POST and answers with the result, nothing goes through the disk:
+  - POST /scan: the docScannerOptimized pipeline (scanner.scan_packed), the
+    page comes back as a bilevel file, ?format=png|tif|pbm|npz (png),
+    ?threshold=60|auto, ?refine=0, ?compression=..., ?rig=<name> warps through
+    the cached tables of a fixed rig in --rig-dir (see remap)
+  - POST /color?style=<id>: color transfer of a style of the style library
+    (see styles), the image comes back as ?format=png|jpg (png),
+    ?method=lut|float
+  - POST /shapes: the shape table (shapes.shape_table) as JSON, one object per
+    shape, ?threshold=60, ?min_area=0, ?method=contours|components
+  - GET /health: workers, requests served and failed, uptime
+  - GET /metrics: with profiling on, the stages of every request so far in
+    the Prometheus text format (profiling.prometheus)
+- the work runs in a multiprocessing pool of worker processes started with
+  the server, one OpenCV thread each; every worker imports everything and
+  runs each pipeline once on a small drawn page before the server accepts
+  requests, so no request pays for a cold worker
+- the HTTP side is a thread per connection (keep-alive, HTTP/1.1): it only
+  reads the body, hands it to the pool and writes the answer back, the pool
+  queues requests beyond the number of workers
+- a bad request (unknown style, no page found, bad parameter) is a 400 with
+  the reason as text, a request still waiting after --timeout seconds a 504;
+  every answer carries the worker time in an X-Worker-Time header (seconds)
+- the style library is loaded once in the server process before the pool
+  starts, so a broken file is a ValueError and not workers crashing in a
+  loop; workers still not warm after `startup` seconds are a RuntimeError
+- with profile = True (memory = True: and allocations), every worker records the stages of each request with
+  its own profiler and sends the events back with the result; the server
+  adds them to the profiler of its process (one trace row per worker), so
+  that --profile, --profile-out and /metrics cover the work done in the pool
+- connect() and request() are a small client for both kinds of address,
+  "host:port" or the path of a Unix socket
+"""
+
+# import the necessary packages
+import http.client
+import importlib
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Pool, TimeoutError
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import cv2
+import numpy as np
+
+from . import batch, profiling
+from .bilevel import encode_bilevel
+from .color import color_transfer
+from .profiling import stage
+from .remap import rig_table
+from .scanner import scan_packed
+from .shapes import shape_table
+from .styles import StyleLibrary
+from .sweep import parse_threshold
+
+# POST endpoints
+ENDPOINTS = ("scan", "color", "shapes")
+
+# content type of every output format
+CONTENT_TYPES = {
+    "png": "image/png",
+    "tif": "image/tiff",
+    "tiff": "image/tiff",
+    "pbm": "image/x-portable-bitmap",
+    "npz": "application/octet-stream",
+    "jpg": "image/jpeg",
+    "json": "application/json",
+}
+
+# largest request body, in MB
+DEFAULT_MAX_MB = 64
+
+# seconds a request may wait for its result
+DEFAULT_TIMEOUT = 60
+
+# seconds the workers may take to start and warm up
+DEFAULT_STARTUP = 120
+
+# the state of a worker process, set by init_worker
+_worker = {}
+
+
+def init_worker(styles = None, rig_dir = None, warm = True, profile = False, memory = False):
+    # runs once in every worker process: one OpenCV thread, style library, warm-up
+    batch.init_worker()
+    _worker["library"] = None if styles is None else StyleLibrary.load(styles)
+    _worker["rig_dir"] = rig_dir
+    if warm:
+        warm_up()
+    # the warm-up is not profiled
+    _worker["profile"] = profile
+    _worker["memory"] = memory
+
+def warm_up():
+    # the packages the pipelines import when they first run, then every
+    # pipeline once on a small drawn page (OpenCV initialises lazily too)
+    for name in ("imutils", "skimage.filters"):
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+    image = np.full((300, 400, 3), 30, dtype = "uint8")
+    image[:, :, 2] = np.linspace(20, 90, 400, dtype = "uint8")
+    cv2.fillConvexPoly(image, np.array([[90, 40], [320, 60], [300, 260], [70, 240]], dtype = "int32"),
+        (230, 230, 230))
+    data = cv2.imencode(".png", image)[1].tobytes()
+    handle("scan", {}, data)
+    handle("shapes", {}, data)
+    library = _worker["library"]
+    if library is not None and len(library) > 0:
+        handle("color", {"style": library.ids[0]}, data)
+    else:
+        cv2.imencode(".png", color_transfer(image, image))
+
+def ready(_):
+    # holds the worker a moment, so that the other workers get the next tasks
+    time.sleep(0.01)
+    return os.getpid()
+
+def decode(body):
+    # an empty or undecodable body is a bad request (400), not an error of the worker
+    if not body:
+        raise ValueError("the body is empty, expected the bytes of an image")
+    with stage("decode"):
+        try:
+            image = cv2.imdecode(np.frombuffer(body, dtype = "uint8"), cv2.IMREAD_COLOR)
+        except cv2.error:
+            image = None
+    if image is None:
+        raise ValueError("the body is not an image OpenCV can decode")
+    return image
+
+def handle(endpoint, params, body):
+    """
+    Runs an endpoint on the image bytes body in a worker process.
+
+    returns (status, content type, result bytes, worker seconds); status is
+    200, or 400 with the reason as the result for a bad request
+    """
+    start = time.perf_counter()
+    try:
+        (fmt, data) = ENDPOINT_FUNCTIONS[endpoint](decode(body), params)
+        (status, contentType) = (200, CONTENT_TYPES[fmt])
+    except (ValueError, KeyError) as e:
+        (status, contentType, data) = (400, "text/plain", (e.args[0] if e.args else str(e)).encode())
+    return (status, contentType, data, time.perf_counter() - start)
+
+def profiled_handle(endpoint, params, body):
+    # (handle(), the stage events of the request), no events unless the worker profiles
+    if not _worker.get("profile"):
+        return (handle(endpoint, params, body), [])
+    profiling.enable(_worker["memory"])
+    try:
+        result = handle(endpoint, params, body)
+    finally:
+        events = profiling.disable().events
+    # one trace row per worker process
+    pid = os.getpid()
+    return (result, [event[:6] + (pid,) for event in events])
+
+def scan_endpoint(image, params):
+    table = None
+    if params.get("rig"):
+        if _worker.get("rig_dir") is None:
+            raise ValueError("the service has no rig directory (--rig-dir)")
+        table = rig_table(_worker["rig_dir"], params["rig"])
+
+    fmt = params.get("format", "png")
+    (packed, width, _, _) = scan_packed(image, refine = params.get("refine", "1") != "0",
+        threshold = parse_threshold(params.get("threshold", "60")), table = table)
+    return (fmt, encode_bilevel(packed, width, fmt, params.get("compression")))
+
+def color_endpoint(image, params):
+    fmt = params.get("format", "png")
+    if fmt not in ("png", "jpg"):
+        raise ValueError("color output format must be png or jpg, got {!r}".format(fmt))
+
+    if "style" not in params:
+        raise ValueError("a style is needed, ?style=<id>")
+    result = color_transfer(params["style"], image, _worker.get("library"), params.get("method", "lut"))
+
+    with stage("encode"):
+        return (fmt, cv2.imencode("." + fmt, result)[1].tobytes())
+
+def shapes_endpoint(image, params):
+    table = shape_table(image, int(params.get("threshold", 60)), float(params.get("min_area", 0)),
+        params.get("method", "contours"))
+    rows = [dict(zip(table.dtype.names, row.tolist())) for row in table]
+    return ("json", json.dumps(dict(shapes = len(rows), table = rows)).encode())
+
+ENDPOINT_FUNCTIONS = {
+    "scan": scan_endpoint,
+    "color": color_endpoint,
+    "shapes": shapes_endpoint,
+}
+
+class ScanService:
+    """
+    The worker pool and the counters of a running service.
+    """
+
+    def __init__(self, workers = None, styles = None, rig_dir = None, timeout = DEFAULT_TIMEOUT, profile = False,
+            memory = False, startup = DEFAULT_STARTUP):
+        # a worker that fails to load the library is replaced by the pool forever, check it here first
+        if styles is not None:
+            try:
+                StyleLibrary.load(styles)
+            except Exception as e:
+                raise ValueError("could not load the style library {}: {}".format(styles, e))
+
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.pool = Pool(self.workers, initializer = init_worker, initargs = (styles, rig_dir, True, profile, memory))
+        # a worker only takes tasks once it has warmed up, wait until every one has answered
+        (pids, deadline) = (set(), time.monotonic() + startup)
+        try:
+            while len(pids) < self.workers:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError
+                pids.update(self.pool.map_async(ready, range(self.workers), chunksize = 1).get(remaining))
+        except TimeoutError:
+            self.close()
+            raise RuntimeError("the workers did not warm up within {:.0f} s".format(startup))
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.counts = dict(requests = 0, failed = 0)
+
+    def run(self, endpoint, params, body):
+        try:
+            (result, events) = self.pool.apply_async(profiled_handle, (endpoint, params, body)).get(self.timeout)
+            # perf_counter_ns is the same clock in every process
+            profiler = profiling.active()
+            if profiler is not None:
+                for event in events:
+                    profiler.add(*event)
+        except TimeoutError:
+            result = (504, "text/plain", b"timed out", float(self.timeout))
+        except Exception as e:
+            # an error of the pipeline itself, the worker goes on
+            result = (500, "text/plain", "{}: {}".format(type(e).__name__, e).encode(), 0.0)
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts["failed"] += result[0] != 200
+        return result
+
+    def health(self):
+        with self.lock:
+            return dict(workers = self.workers, uptime = time.time() - self.started, **self.counts)
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # the headers and the body go out in two writes, with Nagle's algorithm
+    # the body waits for the client's delayed ACK of the headers (~40 ms)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        endpoint = urlsplit(self.path).path.strip("/")
+        if endpoint == "health":
+            return self.reply(200, CONTENT_TYPES["json"], json.dumps(self.server.service.health()).encode())
+        if endpoint == "metrics":
+            profiler = profiling.active()
+            if profiler is None:
+                return self.reply(404, "text/plain", b"profiling is off, start the service with --profile")
+            return self.reply(200, "text/plain; version=0.0.4", profiling.prometheus(profiler).encode())
+        self.reply(404, "text/plain", b"unknown endpoint")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        endpoint = url.path.strip("/")
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # where the body ends is unknown, the connection cannot be reused
+            self.close_connection = True
+            return self.reply(400, "text/plain", b"bad Content-Length")
+        if endpoint not in ENDPOINTS:
+            self.rfile.read(length)
+            return self.reply(404, "text/plain", b"unknown endpoint")
+        if length > self.server.max_bytes:
+            # the connection cannot be reused with the body left unread
+            self.close_connection = True
+            return self.reply(413, "text/plain", b"image too large")
+
+        body = self.rfile.read(length)
+        (status, contentType, data, elapsed) = self.server.service.run(endpoint, dict(parse_qsl(url.query)), body)
+        self.reply(status, contentType, data, {"X-Worker-Time": "{:.6f}".format(elapsed)})
+
+    def reply(self, status, contentType, data, headers = None):
+        self.send_response(status)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(data)))
+        for (name, value) in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def address_string(self):
+        # a Unix socket client has no address
+        return self.client_address[0] if self.client_address else "unix"
+
+class UnixHandler(Handler):
+    # no TCP options on a Unix socket
+    disable_nagle_algorithm = False
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(service, host = "127.0.0.1", port = 8080, unix = None, max_mb = DEFAULT_MAX_MB, verbose = False):
+    # an HTTP server on host:port, or on the Unix socket unix, answering with service
+    if unix is not None:
+        if os.path.exists(unix):
+            os.unlink(unix)
+        server = ThreadingUnixHTTPServer(unix, UnixHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), Handler)
+    server.service = service
+    server.max_bytes = int(max_mb * 2 ** 20)
+    server.verbose = verbose
+    return server
+
+def server_address(server):
+    # "host:port" or the socket path, as request() takes it
+    if isinstance(server.server_address, tuple):
+        return "{}:{}".format(*server.server_address[:2])
+    return server.server_address
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout = DEFAULT_TIMEOUT):
+        super().__init__("localhost", timeout = timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def connect(address, timeout = DEFAULT_TIMEOUT):
+    # a keep-alive connection to "host:port" or to a Unix socket path
+    if ":" in address and not address.startswith(("/", ".")):
+        (host, port) = address.rsplit(":", 1)
+        return http.client.HTTPConnection(host, int(port), timeout = timeout)
+    return UnixHTTPConnection(address, timeout)
+
+def request(connection, endpoint, body = None, **params):
+    # (status, headers, result bytes) of one request over connection
+    path = "/" + endpoint + ("?" + urlencode(params) if params else "")
+    if body is None:
+        connection.request("GET", path)
+    else:
+        connection.request("POST", path, body, {"Content-Type": "application/octet-stream"})
+    response = connection.getresponse()
+    return (response.status, dict(response.getheaders()), response.read())
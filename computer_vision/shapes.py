@@ -0,0 +1,177 @@
+"""
+Shape detection and analysis
+Approach:
+- blur to reduce high frequency noise, threshold to binarize the image
+- find the external contours, the center of every shape comes from its moments
+- drawing the contours and centers is a separate step
+
+Bulk analysis (images with thousands of shapes):
+- shape_table measures every shape at once and returns a NumPy structured
+  array, one row per shape (SHAPE_DTYPE), that write_table saves as CSV or .npy
+- method "contours" (default): the points of all contours are concatenated
+  into one array and the area and centroid of every polygon come from the
+  shoelace (Green's theorem) sums, computed for all shapes with np.add.reduceat
+  instead of one cv2.moments call per contour; the numbers are the ones
+  detect_shapes gets from cv2.moments
+- method "components": connectedComponentsWithStats, the area is then the
+  number of foreground pixels (holes inside a shape are not counted)
+- draw_table annotates an image from the table, only when asked for
+"""
+
+# import the necessary packages
+import cv2
+import numpy as np
+
+from .contours import find_contours, flatten_contours
+from .profiling import stage
+
+
+# one row per shape: centroid, area and bounding box
+SHAPE_DTYPE = np.dtype([
+    ("x", "float64"),
+    ("y", "float64"),
+    ("area", "float64"),
+    ("left", "int32"),
+    ("top", "int32"),
+    ("width", "int32"),
+    ("height", "int32"),
+])
+
+# printf formats of the SHAPE_DTYPE columns, for CSV output
+SHAPE_FORMATS = ["%.2f", "%.2f", "%.1f", "%d", "%d", "%d", "%d"]
+
+
+def foreground(image, threshold = 60):
+    # load the image, convert it to grayscale, blur it slightly, and threshold it
+    # Blurring to reduce high frequency noise to make our contour detection process more accurate.
+    # By thresholding, we are "binarizing the image" (black and white)
+    with stage("gray"):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    with stage("blur"):
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    with stage("threshold"):
+        return cv2.threshold(blurred, threshold, 255, cv2.THRESH_BINARY)[1]
+
+def detect_shapes(image, cache = None):
+    # find and grab contours in the thresholded image
+    cnts = find_contours(image, cache = cache)
+
+    # compute the center of every contour
+    centers = []
+    with stage("moments"):
+        for c in cnts:
+            # edge case: avoid a division by zero by adding a tiny number to the denominator
+            M = cv2.moments(c)
+            cX = int(M["m10"] / (M["m00"] + 1e-7))
+            cY = int(M["m01"] / (M["m00"] + 1e-7))
+            centers.append((cX, cY))
+
+    return (cnts, centers)
+
+def draw_shapes(image, cnts, centers):
+    # loop over the contours
+    for (c, (cX, cY)) in zip(cnts, centers):
+        # draw the contour on the image
+        cv2.drawContours(image, [c], -1, (0, 255, 0), 2)
+
+        # mark the center of the shape on the image
+        # parameters: image_name, coordinates, radius, color, thickness
+        # use thickness of -1 px to fill the circle
+        cv2.circle(image, (cX, cY), 7, (255, 255, 255), -1)
+
+        # parameters: image_name, text, start_coordinates, font, font_scale, color, thickness 
+        cv2.putText(image, "center", (cX - 20, cY - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+
+    return image
+
+def contour_stats(cnts):
+    # area, centroid and bounding box of every contour, without a loop over them
+    table = np.zeros(len(cnts), dtype = SHAPE_DTYPE)
+    if len(cnts) == 0:
+        return table
+
+    (pts, starts, counts) = flatten_contours(cnts)
+
+    # next vertex of every vertex, the last one of a contour wraps to its first
+    nxt = np.arange(len(pts)) + 1
+    nxt[starts + counts - 1] = starts
+    (x, y) = (pts[:, 0].astype("float64"), pts[:, 1].astype("float64"))
+    (x1, y1) = (x[nxt], y[nxt])
+
+    # shoelace sums: m00 = sum(cross) / 2, m10 = sum((x + x1) * cross) / 6, ...
+    cross = x * y1 - x1 * y
+    m00 = np.add.reduceat(cross, starts) / 2.0
+    m10 = np.add.reduceat((x + x1) * cross, starts) / 6.0
+    m01 = np.add.reduceat((y + y1) * cross, starts) / 6.0
+
+    # edge case: avoid a division by zero by adding a tiny number to the denominator,
+    # the same as detect_shapes does (the sign of m00 follows the contour orientation)
+    m00 = np.where(m00 < 0, m00 - 1e-7, m00 + 1e-7)
+    table["x"] = m10 / m00
+    table["y"] = m01 / m00
+    table["area"] = np.abs(np.add.reduceat(cross, starts) / 2.0)
+
+    left = np.minimum.reduceat(pts[:, 0], starts)
+    top = np.minimum.reduceat(pts[:, 1], starts)
+    table["left"] = left
+    table["top"] = top
+    table["width"] = np.maximum.reduceat(pts[:, 0], starts) - left + 1
+    table["height"] = np.maximum.reduceat(pts[:, 1], starts) - top + 1
+
+    return table
+
+def component_stats(thresh, connectivity = 8):
+    # pixel statistics of every connected component, label 0 is the background
+    (n, labels, stats, centroids) = cv2.connectedComponentsWithStatsWithAlgorithm(
+        thresh, connectivity, cv2.CV_32S, cv2.CCL_GRANA)
+
+    table = np.empty(n - 1, dtype = SHAPE_DTYPE)
+    table["x"] = centroids[1:, 0]
+    table["y"] = centroids[1:, 1]
+    table["area"] = stats[1:, cv2.CC_STAT_AREA]
+    table["left"] = stats[1:, cv2.CC_STAT_LEFT]
+    table["top"] = stats[1:, cv2.CC_STAT_TOP]
+    table["width"] = stats[1:, cv2.CC_STAT_WIDTH]
+    table["height"] = stats[1:, cv2.CC_STAT_HEIGHT]
+
+    return table
+
+def shape_table(image, threshold = 60, min_area = 0, method = "contours", cache = None):
+    if method == "contours":
+        cnts = find_contours(image, threshold, cache)
+        with stage("moments"):
+            table = contour_stats(cnts)
+    elif method == "components":
+        thresh = foreground(image, threshold)
+        with stage("connectedComponents"):
+            table = component_stats(thresh)
+    else:
+        raise ValueError("unknown method {!r}, expected 'contours' or 'components'".format(method))
+
+    if min_area > 0:
+        table = table[table["area"] >= min_area]
+    return table
+
+def write_table(path, table):
+    # .npy keeps the structured array as is, anything else is written as CSV
+    with stage("write"):
+        if path.endswith(".npy"):
+            np.save(path, table)
+        else:
+            np.savetxt(path, table, fmt = SHAPE_FORMATS, delimiter = ",",
+                header = ",".join(table.dtype.names), comments = "")
+
+def draw_table(image, table):
+    # bounding boxes of all the shapes in a single polylines call
+    (left, top) = (table["left"], table["top"])
+    (right, bottom) = (left + table["width"] - 1, top + table["height"] - 1)
+    boxes = np.stack([left, top, right, top, right, bottom, left, bottom], axis = 1)
+    cv2.polylines(image, list(boxes.reshape(-1, 4, 2).astype("int32")), True, (0, 255, 0), 1)
+
+    # mark the center of every shape
+    xs = np.round(table["x"]).astype("int32").tolist()
+    ys = np.round(table["y"]).astype("int32").tolist()
+    for center in zip(xs, ys):
+        cv2.circle(image, center, 3, (255, 255, 255), -1)
+
+    return image
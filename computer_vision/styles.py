@@ -0,0 +1,98 @@
+"""
+Style library for color transfer
+Approach:
+- color transfer only needs the L*a*b* mean and standard deviation of the source
+- compute those 6 numbers once per reference image ("style") and keep them
+  in a (N, 6) float32 array next to the N style IDs
+- save the library as a small .npz file (a few KB for hundreds of styles)
+- color.color_transfer(style_id, target, library) reads the stats
+  from here and never opens the reference image again
+- nearest() finds the styles whose stats are closest to given stats or image,
+  one vectorized distance computation over the whole library
+"""
+
+# import the necessary packages
+import os
+
+import cv2
+import numpy as np
+
+from .color import lab_stats
+
+
+class StyleLibrary:
+    def __init__(self, ids = (), stats = None):
+        # style ID -> row of self._stats
+        self.ids = [str(i) for i in ids]
+        self._index = {style_id: row for (row, style_id) in enumerate(self.ids)}
+        if len(self._index) != len(self.ids):
+            raise ValueError("style IDs must be unique")
+
+        # (lMean, lStd, aMean, aStd, bMean, bStd) per style
+        if stats is None:
+            stats = np.zeros((0, 6))
+        self._stats = np.asarray(stats, dtype = "float32").reshape(-1, 6)
+        if len(self._stats) != len(self.ids):
+            raise ValueError("got {} style IDs but {} rows of stats".format(len(self.ids), len(self._stats)))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, style_id):
+        return style_id in self._index
+
+    def add(self, style_id, image):
+        # add or replace a style from its reference image (BGR)
+        return self.add_stats(style_id, lab_stats(image))
+
+    def add_stats(self, style_id, stats):
+        stats = np.asarray(stats, dtype = "float32").reshape(1, 6)
+        if style_id in self._index:
+            self._stats[self._index[style_id]] = stats
+        else:
+            self._index[style_id] = len(self.ids)
+            self.ids.append(style_id)
+            self._stats = np.concatenate([self._stats, stats])
+        return self
+
+    def stats(self, style_id):
+        # the 6 stats of a style, in the order returned by colorTransfer.image_stats
+        if style_id not in self._index:
+            raise KeyError("unknown style {!r}".format(style_id))
+        return tuple(float(v) for v in self._stats[self._index[style_id]])
+
+    def nearest(self, query, k = 1):
+        # query is a BGR image or 6 stats, returns the k closest (style ID, distance)
+        if len(self) == 0:
+            return []
+        query = np.asarray(query)
+        if query.ndim == 3:
+            query = lab_stats(query)
+        query = np.asarray(query, dtype = "float32").reshape(6)
+
+        dist = np.linalg.norm(self._stats - query, axis = 1)
+        k = min(k, len(dist))
+
+        # partial selection of the k best, only those get sorted
+        best = np.argpartition(dist, k - 1)[:k]
+        best = best[np.argsort(dist[best])]
+        return [(self.ids[i], float(dist[i])) for i in best]
+
+    def save(self, path):
+        np.savez_compressed(path, ids = np.array(self.ids, dtype = str), stats = self._stats)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["ids"].tolist(), data["stats"])
+
+    @classmethod
+    def build(cls, paths):
+        # one style per reference image, named after the file
+        library = cls()
+        for path in paths:
+            image = cv2.imread(path)
+            if image is None:
+                raise ValueError("could not read image {}".format(path))
+            library.add(os.path.splitext(os.path.basename(path))[0], image)
+        return library
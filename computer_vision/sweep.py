@@ -0,0 +1,124 @@
+"""
+Automatic threshold selection for the contour pipelines
+Approach:
+- instead of a fixed cv2.threshold(blur, 60, ...), many candidate thresholds
+  are scored on the (blurred, grayscale, usually 500 px high) detection image
+  and the best one is kept
+- the histogram decides which thresholds are worth looking at, in one pass
+  over the pixels:
+  - thresholds t and t + 1 give the same binary image unless some pixel is
+    exactly t + 1, so only the gray levels that occur are candidates
+  - a level where the foreground (pixels > t) is below min_fraction or above
+    max_fraction of the image cannot hold a large object on a background
+  - a level that changes the foreground by less than min_step of the image
+    w.r.t. the previous candidate gives almost the same image, it is skipped
+- the remaining candidates are searched coarse to fine: about `coarse` evenly
+  spaced ones first, then every candidate between the neighbours of the best
+  one; findContours runs once per evaluated candidate, on a reused buffer
+- quad_score (the default) scores a binary image by the area of the largest
+  contour among the 5 largest that approximates to 4 vertices, i.e. how much
+  of the image a document-like quad covers; a quad over (nearly) the whole
+  image is the frame, e.g. a bright table that became foreground, it is skipped
+- the evaluated thresholds next to the best one that score within
+  `tolerance` of it form a plateau over which the quad hardly moves, the one
+  in the middle of it is returned: it is the threshold farthest away from the
+  ones where the quad falls apart
+- sweep_threshold returns (threshold, contour, stats), stats tells how many
+  levels were candidates, how many were evaluated, and how long it took
+"""
+
+# import the necessary packages
+import time
+
+import cv2
+import numpy as np
+
+from .contours import grab_contours
+from .profiling import stage
+
+# evenly spaced candidates evaluated in the first, coarse pass
+DEFAULT_COARSE = 16
+
+
+def parse_threshold(value):
+    # a threshold as given on the command line: "auto" or a gray level
+    if value == "auto":
+        return value
+    t = int(value)
+    if not 0 <= t <= 255:
+        raise ValueError("threshold must be 'auto' or a gray level in [0, 255], got {}".format(value))
+    return t
+
+def candidate_levels(gray, min_fraction = 0.05, max_fraction = 0.95, min_step = 0.001):
+    # thresholds worth evaluating, from the histogram of gray
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+    total = float(gray.size)
+    # fraction of pixels above every threshold t (they become foreground)
+    above = (total - np.cumsum(hist)) / total
+
+    levels = []
+    last = None
+    for t in np.flatnonzero(hist).tolist():
+        if not min_fraction <= above[t] <= max_fraction:
+            continue
+        if last is not None and last - above[t] < min_step:
+            continue
+        levels.append(t)
+        last = above[t]
+    return levels
+
+def quad_score(thresh, max_area = 0.95):
+    # (area fraction, contour) of the largest 4 vertex contour among the 5 largest ones, (0, None) if none;
+    # a quad covering more than max_area of the image is the image frame, not a document
+    cs = grab_contours(cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE))
+    for c in sorted(cs, key = cv2.contourArea, reverse = True)[:5]:
+        approx = cv2.approxPolyDP(c, 0.02 * cv2.arcLength(c, True), True)
+        if len(approx) == 4:
+            area = cv2.contourArea(approx) / float(thresh.size)
+            if area <= max_area:
+                return (area, approx)
+    return (0.0, None)
+
+def sweep_threshold(gray, score = quad_score, coarse = DEFAULT_COARSE, tolerance = 0.02, **levels):
+    """
+    Best binarization threshold of a blurred grayscale image, scored by
+    score(binary image) -> (value, contour).
+
+    returns (threshold, contour, stats), threshold is None and contour is None
+    when no candidate scores above 0; stats is a dict: candidates,
+    evaluated, elapsed (seconds)
+    """
+    start = time.perf_counter()
+    with stage("threshold_sweep"):
+        candidates = candidate_levels(gray, **levels)
+        buffer = np.empty_like(gray)
+        results = {}
+
+        def evaluate(i):
+            if i not in results:
+                cv2.threshold(gray, candidates[i], 255, cv2.THRESH_BINARY, dst = buffer)
+                results[i] = score(buffer)
+            return results[i][0]
+
+        if candidates:
+            # coarse pass, then everything between the neighbours of the best coarse candidate
+            step = max(1, len(candidates) // coarse)
+            coarse_idx = list(range(0, len(candidates), step))
+            best = max(coarse_idx, key = evaluate)
+            for i in range(max(0, best - step + 1), min(len(candidates), best + step)):
+                evaluate(i)
+
+    stats = dict(candidates = len(candidates), evaluated = len(results), elapsed = time.perf_counter() - start)
+    top = max((value for (value, _) in results.values()), default = 0.0)
+    if top <= 0:
+        return (None, None, stats)
+
+    # the evaluated candidates next to the best one that score (nearly) as well, and the middle one of them
+    order = sorted(results)
+    lo = hi = order.index(max(order, key = lambda i: results[i][0]))
+    while lo > 0 and results[order[lo - 1]][0] >= (1 - tolerance) * top:
+        lo -= 1
+    while hi < len(order) - 1 and results[order[hi + 1]][0] >= (1 - tolerance) * top:
+        hi += 1
+    i = order[(lo + hi) // 2]
+    return (candidates[i], results[i][1], stats)
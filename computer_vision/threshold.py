@@ -0,0 +1,78 @@
+"""
+Local (adaptive) thresholding for the document scanners
+Requirements:
+- python
+- NumPy
+- scikit-image only for the "skimage" reference backend
+Approach:
+- a pixel is foreground when it is brighter than the weighted mean of its
+  block_size x block_size neighbourhood minus an offset
+- "opencv" backend (default): separable cv2.GaussianBlur / cv2.blur on float32
+  with the same sigma, kernel radius and border mode as scikit-image, then a single
+  cv2.compare that directly gives the 0/255 uint8 output
+- "skimage" backend: skimage.filters.threshold_local, imported only when used
+- both backends agree on at least 99.99% of the pixels (BINARIZE_TOLERANCE),
+  the rare differences are pixels sitting exactly on the threshold where
+  float32 and float64 round differently
+"""
+
+# import the necessary packages
+import cv2
+
+# largest fraction of pixels the opencv backend may flip w.r.t. skimage
+BINARIZE_TOLERANCE = 1e-4
+
+
+def gaussian_sigma(block_size):
+    # same sigma as skimage.filters.threshold_local(method="gaussian")
+    return (block_size - 1) / 6.0
+
+def gaussian_radius(block_size):
+    # scipy.ndimage.gaussian_filter truncates the kernel at 4 sigma
+    return int(4.0 * gaussian_sigma(block_size) + 0.5)
+
+def _opencv_threshold(image, block_size, offset, method):
+    image = image.astype("float32")
+
+    # BORDER_REFLECT is scipy's "reflect" mode: (d c b a | a b c d)
+    if method == "gaussian":
+        k = 2 * gaussian_radius(block_size) + 1
+        sigma = gaussian_sigma(block_size)
+        T = cv2.GaussianBlur(image, (k, k), sigma, borderType = cv2.BORDER_REFLECT)
+    elif method == "mean":
+        T = cv2.blur(image, (block_size, block_size), borderType = cv2.BORDER_REFLECT)
+    else:
+        raise ValueError("method {!r} is not supported by the opencv backend".format(method))
+
+    T -= offset
+    return (image, T)
+
+def _skimage_threshold(image, block_size, offset, method):
+    from skimage.filters import threshold_local
+
+    T = threshold_local(image, block_size, offset = offset, method = method)
+    return (image, T)
+
+BACKENDS = {
+    "opencv": _opencv_threshold,
+    "skimage": _skimage_threshold,
+}
+
+def _run(image, block_size, offset, method, backend):
+    if backend not in BACKENDS:
+        raise ValueError("unknown backend {!r}, expected one of {}".format(backend, sorted(BACKENDS)))
+    if block_size % 2 == 0:
+        raise ValueError("block_size must be odd, got {}".format(block_size))
+
+    return BACKENDS[backend](image, block_size, offset, method)
+
+def threshold_local(image, block_size, offset = 0, method = "gaussian", backend = "opencv"):
+    # threshold surface T, same meaning as skimage.filters.threshold_local
+    return _run(image, block_size, offset, method, backend)[1]
+
+def binarize(image, block_size = 51, offset = 10, method = "gaussian", backend = "opencv"):
+    # grayscale image -> uint8 image holding 0 and 255, i.e. (image > T) * 255
+    (image, T) = _run(image, block_size, offset, method, backend)
+    if backend == "opencv":
+        return cv2.compare(image, T, cv2.CMP_GT)
+    return (image > T).astype("uint8") * 255
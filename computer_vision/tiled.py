@@ -0,0 +1,225 @@
+"""
+Memory bounded warp + local threshold for very large scans
+Approach:
+- the top-down view is computed in horizontal strips of the output instead of
+  one warpPerspective call for the whole page: every strip is warped with the
+  page homography shifted to its first row, converted to gray and binarized
+- the local threshold of a pixel looks at rows up to the kernel radius away
+  (33 px for the 51 px gaussian block), so every strip is computed with that
+  many extra rows above and below it, which are dropped again: the kept rows
+  come out the same as with the whole page in memory, and the strips join
+  without seams
+- the strip height follows from a memory budget and from how many bytes per
+  pixel the warp and the threshold backend hold at once (the source image is
+  not counted, it is already in memory)
+- each finished strip is written out right away, to a .npy file (that can be
+  memory mapped when read back), to a binary PGM image or, 1 bit per pixel, to
+  a binary PBM image, so the full page never exists in memory
+- StripReader is the other direction, for inputs that do not fit in memory:
+  rows of a .npy array or binary PPM image read with plain reads
+"""
+
+# import the necessary packages
+import sys
+
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+from .geometry import quad_transforms
+from .profiling import stage
+from .threshold import binarize, gaussian_radius
+
+# bytes held per output pixel while a strip is processed: color warp, gray,
+# the float copies of the threshold backend and the binary output
+BYTES_PER_PIXEL = {
+    "opencv": 3 + 1 + 4 + 4 + 4 + 1,
+    "skimage": 3 + 1 + 8 + 8 + 8 + 8 + 8 + 8 + 1,
+}
+
+# default memory budget of the strips
+DEFAULT_BUDGET_MB = 256
+
+
+def peak_rss_mb():
+    # peak resident memory of this process so far, None where it cannot be read
+    if resource is None:
+        return None
+    # kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2.0 ** 20 if sys.platform == "darwin" else rss / 1024.0
+
+def threshold_halo(block_size, method = "gaussian"):
+    # rows of context the local threshold of a pixel depends on
+    if method == "gaussian":
+        return gaussian_radius(block_size)
+    return block_size // 2
+
+def strip_height(width, budget_bytes, halo, backend = "opencv"):
+    # output rows per strip that fit the budget, halo rows included
+    rows = budget_bytes // (width * BYTES_PER_PIXEL[backend]) - 2 * halo
+    if rows < 1:
+        raise ValueError("a memory budget of {:.1f} MB is too small for a {} px wide page".format(
+            budget_bytes / 2 ** 20, width))
+    return int(rows)
+
+class StripWriter:
+    """
+    Streams an (height, width) uint8 image to a file strip by strip, top to
+    bottom: a .npy array (np.load(path, mmap_mode="r") reads it back without
+    loading it), a binary PGM (P5) image or a binary PBM (P4) image, where
+    every strip of 0/255 pixels is packed to 1 bit per pixel. With
+    channels = 3 the strips are (rows, width, 3) BGR and the file is a .npy
+    array or a binary PPM (P6, RGB) image. Plain writes rather than a memory
+    map, so the written rows do not stay in the resident memory.
+    """
+
+    def __init__(self, path, width, height, channels = 1):
+        formats = (".npy", ".pgm", ".pbm") if channels == 1 else (".npy", ".ppm")
+        if not path.endswith(formats):
+            raise ValueError("tiled output must be a {} file, got {}".format(
+                ", ".join(formats[:-1]) + " or " + formats[-1], path))
+        self.path = path
+        self.packed = path.endswith(".pbm")
+        self.rgb = path.endswith(".ppm")
+        self.file = open(path, "wb")
+        if path.endswith(".npy"):
+            shape = (height, width) if channels == 1 else (height, width, channels)
+            header = {"descr": "|u1", "fortran_order": False, "shape": shape}
+            np.lib.format.write_array_header_1_0(self.file, header)
+        elif self.packed:
+            self.file.write("P4\n{} {}\n".format(width, height).encode())
+        elif self.rgb:
+            self.file.write("P6\n{} {}\n255\n".format(width, height).encode())
+        else:
+            self.file.write("P5\n{} {}\n255\n".format(width, height).encode())
+
+    def write(self, strip):
+        if self.packed:
+            # PBM stores 1 = black: pack the dark pixels
+            self.file.write(np.packbits(strip == 0, axis = 1))
+            return
+        if self.rgb:
+            strip = strip[..., ::-1]
+        # the array's own buffer, no bytes copy of the strip
+        self.file.write(np.ascontiguousarray(strip, dtype = "uint8"))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class StripReader:
+    """
+    Reads rows of a (height, width, 3) uint8 .npy array or binary PPM (P6)
+    image with plain reads: reader[y0:y1] and reader[indices] return those
+    rows as an array, nothing else of the file is held in memory (a memory
+    map would keep every row it has read in the resident memory). PPM rows
+    come as stored, RGB, which reader.rgb tells.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rgb = path.endswith(".ppm")
+        with open(path, "rb") as f:
+            if self.rgb:
+                (width, height) = self.read_ppm_header(f)
+            elif path.endswith(".npy"):
+                version = np.lib.format.read_magic(f)
+                read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else \
+                    np.lib.format.read_array_header_2_0
+                (shape, fortran, dtype) = read_header(f)
+                if len(shape) != 3 or shape[2] != 3 or fortran or dtype != np.uint8:
+                    raise ValueError("{} is not a (height, width, 3) uint8 C order array".format(path))
+                (height, width) = shape[:2]
+            else:
+                raise ValueError("rows can only be read from a .npy or .ppm file, got {}".format(path))
+            self.offset = f.tell()
+        self.shape = (height, width, 3)
+        self.row_bytes = width * 3
+        self.file = open(path, "rb")
+
+    @staticmethod
+    def read_ppm_header(f):
+        # (width, height) of a binary PPM file, f is left at the first pixel
+        tokens = []
+        while len(tokens) < 4:
+            line = f.readline()
+            if not line:
+                raise ValueError("truncated PPM header")
+            tokens += line.split(b"#")[0].split()
+        if tokens[0] != b"P6" or int(tokens[3]) != 255:
+            raise ValueError("only 8-bit binary PPM (P6) files can be read in strips")
+        return (int(tokens[1]), int(tokens[2]))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, rows):
+        if isinstance(rows, slice):
+            (y0, y1, step) = rows.indices(self.shape[0])
+            if step == 1:
+                out = np.empty((max(0, y1 - y0),) + self.shape[1:], dtype = "uint8")
+                self.file.seek(self.offset + y0 * self.row_bytes)
+                self.file.readinto(memoryview(out).cast("B"))
+                return out
+            rows = range(y0, y1, step)
+
+        # any other rows, one read each
+        rows = np.asarray(rows).ravel()
+        out = np.empty((len(rows),) + self.shape[1:], dtype = "uint8")
+        for (i, y) in enumerate(rows.tolist()):
+            self.file.seek(self.offset + y * self.row_bytes)
+            self.file.readinto(memoryview(out[i]).cast("B"))
+        return out
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def warp_strips(orig, M, width, height, rows, halo):
+    # (first row, warped strip with up to halo extra rows on both sides, halo rows above it)
+    for y0 in range(0, height, rows):
+        y1 = min(height, y0 + rows)
+        (a0, a1) = (max(0, y0 - halo), min(height, y1 + halo))
+
+        # shift the homography so that output row a0 lands on row 0 of the strip
+        shift = np.array([[1, 0, 0], [0, 1, -a0], [0, 0, 1]], dtype = "float64")
+        with stage("warpPerspective"):
+            warped = cv2.warpPerspective(orig, shift @ M, (width, a1 - a0))
+        yield (y0, warped, y0 - a0)
+
+def warp_binarize_tiled(orig, pts, output, budget_mb = DEFAULT_BUDGET_MB, backend = "opencv",
+        block_size = 51, offset = 10, method = "gaussian"):
+    # top-down, thresholded view of the quad pts of orig written to output, strip by strip
+    (_, sizes, matrices) = quad_transforms(np.asarray(pts, dtype = "float64")[None])
+    (width, height) = (int(sizes[0][0]), int(sizes[0][1]))
+
+    halo = threshold_halo(block_size, method)
+    rows = strip_height(width, int(budget_mb * 2 ** 20), halo, backend)
+
+    with StripWriter(output, width, height) as writer:
+        for (y0, warped, top) in warp_strips(orig, matrices[0], width, height, rows, halo):
+            if warped.ndim == 3:
+                with stage("gray"):
+                    warped = cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
+            with stage("threshold_local"):
+                warped = binarize(warped, block_size, offset, method, backend)
+            with stage("write"):
+                writer.write(warped[top:top + min(rows, height - y0)])
+
+    return (height, width)
@@ -0,0 +1,220 @@
+"""
+Color transfer on images larger than memory (panoramas, gigapixel scans)
+Approach:
+- images are read in horizontal strips of rows, from a .npy array or a
+  binary PPM (P6) file through tiled.StripReader, so only the strip being
+  processed is in memory; any other format is decoded whole by cv2.imread,
+  and in-memory arrays (or memory maps) work as well
+- the strip height follows from a memory budget and from how many bytes per
+  pixel a strip holds at once
+- exact stats (tiled_lab_stats): every strip is converted to 8-bit L*a*b*
+  and reduced to its per-channel count, mean and sum of squared deviations
+  (cv2.meanStdDev, in double precision); the strips are merged with the
+  parallel form of Welford's update, TileStats, so there is one pass over
+  the image and never a float copy of it
+- sampled stats (sampled_lab_stats): only a random fraction of the rows is
+  read; the rows are the sampling units, and the spread of the per-row
+  moments between them gives a standard error for each of the 6 stats, the
+  reported bound is z of those standard errors
+- the transfer (transfer_tiled) builds the lookup table of color.transfer_lut
+  once from the stats, then converts, looks up and converts back one strip at
+  a time, writing every finished strip out with tiled.StripWriter: peak memory
+  is set by the budget, not by the image size
+"""
+
+# import the necessary packages
+import cv2
+import numpy as np
+
+from .color import transfer_lut
+from .profiling import stage
+from .tiled import DEFAULT_BUDGET_MB, StripReader, StripWriter
+
+# bytes held per pixel of a strip: the rows read, their L*a*b* copy and the BGR output
+TRANSFER_BYTES_PER_PIXEL = 3 + 3 + 3
+# the rows read, their L*a*b* copy, and the float32 values and squares of the sampled rows
+SAMPLE_BYTES_PER_PIXEL = 3 + 3 + 12 + 12
+
+
+class TileStats:
+    """
+    Running per-channel count, mean and sum of squared deviations (m2) of the
+    pixels added so far. Tiles are merged with the parallel form of Welford's
+    update (Chan et al.), exact in any order, so the tiles can also be
+    reduced separately (e.g. on several workers) and merged at the end.
+    """
+
+    def __init__(self, channels = 3):
+        self.n = 0
+        self.mean = np.zeros(channels)
+        self.m2 = np.zeros(channels)
+
+    def add(self, tile):
+        # a (rows, width, channels) tile
+        (mean, std) = cv2.meanStdDev(tile)
+        n = tile.shape[0] * tile.shape[1]
+        return self.merge_moments(n, mean.ravel(), n * std.ravel() ** 2)
+
+    def merge(self, other):
+        return self.merge_moments(other.n, other.mean, other.m2)
+
+    def merge_moments(self, n, mean, m2):
+        if n == 0:
+            return self
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + m2 + delta * delta * (self.n * n / total)
+        self.n = total
+        return self
+
+    def std(self):
+        # population standard deviation, as ndarray.std
+        return np.sqrt(self.m2 / max(self.n, 1))
+
+    def stats(self):
+        # (lMean, lStd, aMean, aStd, bMean, bStd), in the order of color.image_stats
+        return tuple(float(v) for pair in zip(self.mean, self.std()) for v in pair)
+
+def open_image(path):
+    # a (height, width, 3) image at path: a StripReader for .npy and .ppm files, else decoded whole (BGR)
+    if path.endswith((".npy", ".ppm")):
+        return StripReader(path)
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError("could not read {}".format(path))
+    return image
+
+def to_lab(image, rows, dst = None):
+    # 8-bit L*a*b* of rows read from image, BGR unless image says its rows are RGB
+    code = cv2.COLOR_RGB2LAB if getattr(image, "rgb", False) else cv2.COLOR_BGR2LAB
+    return cv2.cvtColor(rows, code, dst = dst)
+
+def strip_rows(width, budget_mb = DEFAULT_BUDGET_MB, bytes_per_pixel = TRANSFER_BYTES_PER_PIXEL):
+    # rows per strip that fit the budget
+    rows = int(budget_mb * 2 ** 20) // (width * bytes_per_pixel)
+    if rows < 1:
+        raise ValueError("a memory budget of {:.1f} MB is too small for a {} px wide image".format(budget_mb, width))
+    return rows
+
+def lab_strips(image, rows):
+    # (first row, 8-bit L*a*b* strip) over the whole image
+    lab = None
+    for y0 in range(0, image.shape[0], rows):
+        with stage("read"):
+            strip = np.ascontiguousarray(image[y0:y0 + rows])
+        with stage("lab"):
+            # the buffer is reused, only the last, shorter strip gets a new one
+            lab = to_lab(image, strip, lab if lab is not None and len(lab) == len(strip) else None)
+        # not kept while the next strip is read
+        del strip
+        yield (y0, lab)
+
+def tiled_lab_stats(image, budget_mb = DEFAULT_BUDGET_MB):
+    # exact color.lab_stats of an image, one strip at a time
+    running = TileStats()
+    for (_, lab) in lab_strips(image, strip_rows(image.shape[1], budget_mb)):
+        with stage("stats"):
+            running.add(lab)
+    return running.stats()
+
+def sampled_lab_stats(image, fraction = 0.01, z = 3.0, seed = 0, budget_mb = DEFAULT_BUDGET_MB):
+    """
+    L*a*b* stats of an image estimated from a random sample of its rows,
+    with a bound on the error of each stat.
+
+    The rows are a simple random sample (without replacement) of r of the H
+    rows. The standard error of an image mean is estimated as
+    sqrt((1 - r / H) * s2 / r), s2 being the variance of the per-row means
+    between the sampled rows, which accounts for the pixels of a row being
+    alike; the standard deviations get theirs from the per-row means of x and
+    x * x with the delta method. The bound is z standard errors (z = 3 covers
+    about 99.7% under the normal approximation); it is 0 when every row is
+    read.
+
+    returns (stats, bounds), both in the order of color.image_stats
+    """
+    (height, width) = image.shape[:2]
+    r = min(height, max(2, int(round(fraction * height))))
+    rng = np.random.default_rng(seed)
+    picked = np.sort(rng.choice(height, r, replace = False))
+
+    # per sampled row: the mean of the values and of their squares, per channel
+    (means, squares) = ([], [])
+    batch = strip_rows(width, budget_mb, SAMPLE_BYTES_PER_PIXEL)
+    for i in range(0, r, batch):
+        with stage("read"):
+            rows = np.ascontiguousarray(image[picked[i:i + batch]])
+        with stage("lab"):
+            lab = to_lab(image, rows)
+        with stage("stats"):
+            values = lab.astype("float32")
+            means.append(values.mean(axis = 1, dtype = "float64"))
+            squares.append(np.square(values).mean(axis = 1, dtype = "float64"))
+    (means, squares) = (np.concatenate(means), np.concatenate(squares))
+
+    # every row holds as many pixels, the sample moments are the averages of the row moments
+    (m1, m2) = (means.mean(axis = 0), squares.mean(axis = 0))
+    std = np.sqrt(np.maximum(m2 - m1 * m1, 0))
+
+    # covariance of (m1, m2) between sampled rows, with the finite population correction
+    correction = (1.0 - r / float(height)) / r
+    c11 = means.var(axis = 0, ddof = 1) * correction
+    c22 = squares.var(axis = 0, ddof = 1) * correction
+    c12 = ((means - m1) * (squares - m2)).sum(axis = 0) / (r - 1) * correction
+
+    # delta method: std = sqrt(m2 - m1^2), gradient (-m1 / std, 1 / (2 std))
+    safe = np.maximum(std, 1e-12)
+    (g1, g2) = (-m1 / safe, 0.5 / safe)
+    stdVar = np.maximum(g1 * g1 * c11 + 2 * g1 * g2 * c12 + g2 * g2 * c22, 0)
+
+    stats = tuple(float(v) for pair in zip(m1, std) for v in pair)
+    bounds = tuple(float(z * np.sqrt(v)) for pair in zip(c11, stdVar) for v in pair)
+    return (stats, bounds)
+
+def transfer_tiled(sourceStats, target, output, budget_mb = DEFAULT_BUDGET_MB, targetStats = None):
+    # color transfer of the target written to output (.npy or .ppm) strip by strip, returns (height, width)
+    if targetStats is None:
+        targetStats = tiled_lab_stats(target, budget_mb)
+    lut = transfer_lut(sourceStats, targetStats)
+
+    (height, width) = target.shape[:2]
+    out = None
+    with StripWriter(output, width, height, channels = 3) as writer:
+        for (_, lab) in lab_strips(target, strip_rows(width, budget_mb)):
+            with stage("transfer"):
+                cv2.LUT(lab, lut, dst = lab)
+            with stage("lab"):
+                out = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR, dst = out if out is not None and len(out) == len(lab) else None)
+            with stage("write"):
+                writer.write(out)
+
+    return (height, width)
+
+def color_transfer_tiled(source, target, output, library = None, budget_mb = DEFAULT_BUDGET_MB, sample = None):
+    """
+    color.color_transfer for images larger than memory: source is an image
+    or the ID of a style stored in library, target an image, both BGR arrays
+    or from open_image. With sample (a fraction of the rows) the stats
+    are estimated by sampled_lab_stats instead of computed exactly.
+
+    returns ((height, width), stats), stats is a dict: source, target (the 6
+    stats of each) and source_bound, target_bound (None when exact, and for a
+    library style)
+    """
+    def measure(image):
+        if sample is None:
+            return (tiled_lab_stats(image, budget_mb), None)
+        return sampled_lab_stats(image, sample, budget_mb = budget_mb)
+
+    if isinstance(source, str):
+        if library is None:
+            raise ValueError("a style library is needed to transfer style {!r}".format(source))
+        (sourceStats, sourceBound) = (library.stats(source), None)
+    else:
+        (sourceStats, sourceBound) = measure(source)
+    (targetStats, targetBound) = measure(target)
+
+    shape = transfer_tiled(sourceStats, target, output, budget_mb, targetStats)
+    return (shape, dict(source = sourceStats, target = targetStats, source_bound = sourceBound,
+        target_bound = targetBound))
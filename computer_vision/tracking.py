@@ -0,0 +1,136 @@
+"""
+Document quad tracking for live capture
+Approach:
+- detect the quad once (scanner.find_screen_contour on a small copy of the frame)
+- track its four corners with pyramidal Lucas-Kanade optical flow, checked
+  forward and backward
+- when lost: re-detect inside a window around the last quad, then on the
+  whole frame
+- report when the quad has been still for a number of frames, that is when
+  the expensive warp + threshold should run
+"""
+
+# import the necessary packages
+import cv2
+import numpy as np
+
+from .geometry import four_point_transform, order_points
+from .profiling import stage
+from .scanner import find_screen_contour, pyramid_level
+from .threshold import binarize
+
+
+LK_PARAMS = dict(winSize = (21, 21), maxLevel = 3,
+    criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+
+class QuadTracker:
+    def __init__(self, height = 500, stable_px = 1.0, stable_frames = 10, min_area = 0.05, threshold = 60):
+        # detection and tracking run on a copy of the frame this many px high
+        self.height = height
+        # largest corner motion (in px of the small copy) that still counts as still
+        self.stable_px = stable_px
+        # how many still frames in a row before the quad is stable
+        self.stable_frames = stable_frames
+        # smallest quad, as a fraction of the frame area
+        self.min_area = min_area
+        # binarization threshold of the detection, or "auto" (see sweep)
+        self.threshold = threshold
+
+        self.quad = None
+        self.prevGray = None
+        self.still = 0
+        self.counts = dict(full = 0, roi = 0, tracked = 0, lost = 0)
+
+    def _valid(self, quad, shape):
+        # convex, big enough, inside the frame
+        area = cv2.contourArea(quad)
+        (h, w) = shape[:2]
+        if area < self.min_area * w * h or not cv2.isContourConvex(quad.astype("float32")):
+            return False
+        return bool(np.all(quad >= -2) and np.all(quad[:, 0] <= w + 2) and np.all(quad[:, 1] <= h + 2))
+
+    def _detect(self, small, roi = None):
+        (x, y) = (0, 0)
+        if roi is not None:
+            (x, y, w, h) = roi
+            small = small[y:y + h, x:x + w]
+        approx = find_screen_contour(small, self.threshold)
+        if approx is None:
+            return None
+        return order_points(approx.reshape(4, 2) + (x, y))
+
+    def _track(self, gray):
+        # forward and backward flow, a good corner comes back where it started
+        p0 = self.quad.reshape(4, 1, 2).astype("float32")
+        with stage("calcOpticalFlowPyrLK"):
+            (p1, st1, _) = cv2.calcOpticalFlowPyrLK(self.prevGray, gray, p0, None, **LK_PARAMS)
+        if p1 is None or not st1.all():
+            return None
+        with stage("calcOpticalFlowPyrLK"):
+            (back, st2, _) = cv2.calcOpticalFlowPyrLK(gray, self.prevGray, p1, None, **LK_PARAMS)
+        if back is None or not st2.all() or np.abs(back - p0).max() > 1.0:
+            return None
+        return p1.reshape(4, 2)
+
+    def _roi(self, shape):
+        # bounding box of the last quad grown by a quarter of its size
+        (x, y, w, h) = cv2.boundingRect(self.quad.astype("float32"))
+        (mx, my) = (w // 4 + 10, h // 4 + 10)
+        (x0, y0) = (max(0, x - mx), max(0, y - my))
+        (x1, y1) = (min(shape[1], x + w + mx), min(shape[0], y + h + my))
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def update(self, frame):
+        """
+        feed the next frame, returns (quad, stable)
+        quad: ordered corners in full frame coordinates, or None
+        stable: True on the frame where the quad becomes stable
+        """
+        with stage("resize"):
+            small = pyramid_level(frame, self.height)
+        ratio = frame.shape[0] / float(small.shape[0])
+        with stage("gray"):
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        quad = None
+        if self.quad is not None:
+            quad = self._track(gray)
+            if quad is not None and self._valid(quad, small.shape):
+                self.counts["tracked"] += 1
+            else:
+                self.counts["lost"] += 1
+                quad = self._detect(small, self._roi(small.shape))
+                if quad is not None and self._valid(quad, small.shape):
+                    self.counts["roi"] += 1
+                else:
+                    quad = None
+
+        if quad is None:
+            quad = self._detect(small)
+            if quad is not None and self._valid(quad, small.shape):
+                self.counts["full"] += 1
+            else:
+                quad = None
+
+        # count the frames the corners stayed still
+        stable = False
+        if quad is not None and self.quad is not None and np.abs(quad - self.quad).max() <= self.stable_px:
+            self.still += 1
+            stable = self.still == self.stable_frames
+        else:
+            self.still = 0
+
+        self.quad = quad
+        self.prevGray = gray
+        if quad is None:
+            return (None, False)
+        return (quad * ratio, stable)
+
+def scan_quad(frame, quad):
+    # the expensive part, only run on stable quads
+    warped = four_point_transform(frame, quad)
+    with stage("gray"):
+        warped = cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
+    with stage("threshold_local"):
+        return binarize(warped, 51, offset = 10, method = "gaussian")
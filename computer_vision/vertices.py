@@ -0,0 +1,134 @@
+"""
+Co-ordinates of the vertices of contours
+Approach:
+- approxPolyDP() approximates the contour by a polygon, its points are the vertices
+- the first vertex is the topmost one, which gives the orientation of e.g. an arrow
+
+Data only (huge contour sets):
+- polygon_table returns the vertices of all polygons in a CSR style layout:
+  one int32 (M, 2) array of vertices, and an (N + 1,) offsets array so that
+  the vertices of polygon i are vertices[offsets[i]:offsets[i + 1]]
+- nothing is drawn and no strings are built; write_vertices saves the table
+  as .npz (both arrays), .npy (two files) or line-delimited JSON, one polygon
+  per line, written as it is generated
+- annotate_vertices draws the polygons and labels from the table, as a
+  separate pass, only when asked for
+"""
+
+# import the necessary packages
+import json
+
+import cv2
+import numpy as np
+
+from .profiling import stage
+
+
+def approx_polygon(c, epsilon = 0.009):
+    # approxPolyDP(): to perform an approximation of a shape of a contour.
+    return cv2.approxPolyDP(c, epsilon * cv2.arcLength(c, True), True)
+
+def polygon_vertices(c, epsilon = 0.009):
+    # vertices of a single contour, as a list of (x, y)
+    return [tuple(p) for p in approx_polygon(c, epsilon).reshape(-1, 2)]
+
+def polygon_table(cs, epsilon = 0.009):
+    # vertices of all contours, CSR style: (M, 2) int32 vertices and (N + 1,) offsets
+    with stage("approxPolyDP"):
+        approx = [approx_polygon(c, epsilon) for c in cs]
+
+    offsets = np.zeros(len(approx) + 1, dtype = "int64")
+    np.cumsum(np.fromiter(map(len, approx), dtype = "int64", count = len(approx)), out = offsets[1:])
+    if len(approx) == 0:
+        return (np.zeros((0, 2), dtype = "int32"), offsets)
+
+    vertices = np.concatenate(approx).reshape(-1, 2).astype("int32", copy = False)
+    return (vertices, offsets)
+
+def iter_polygons(vertices, offsets):
+    # the (k, 2) vertices of every polygon in turn, as views into vertices
+    for (start, end) in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+        yield vertices[start:end]
+
+def offsets_path(path):
+    # where the offsets of a .npy vertex file go: shapes.npy -> shapes_offsets.npy
+    return path[:-len(".npy")] + "_offsets.npy"
+
+def ndjson_lines(vertices, offsets):
+    # one JSON line per polygon, generated as they are written
+    # the co-ordinates go through a single flat tolist() call (much cheaper than
+    # a nested one) and a printf format per polygon size, built once and reused
+    flat = vertices.ravel().tolist()
+    bounds = (2 * offsets).tolist()
+    formats = {}
+    for i in range(len(bounds) - 1):
+        (start, end) = (bounds[i], bounds[i + 1])
+        k = (end - start) // 2
+        if k not in formats:
+            formats[k] = '{"contour": %d, "vertices": [' + ", ".join(["[%d, %d]"] * k) + ']}\n'
+        yield formats[k] % (i, *flat[start:end])
+
+def write_vertices(path, vertices, offsets):
+    with stage("write"):
+        _write_vertices(path, vertices, offsets)
+
+def _write_vertices(path, vertices, offsets):
+    # .npz: one file with both arrays
+    if path.endswith(".npz"):
+        np.savez(path, vertices = vertices, offsets = offsets)
+    # .npy: the vertices, and the offsets next to them
+    elif path.endswith(".npy"):
+        np.save(path, vertices)
+        np.save(offsets_path(path), offsets)
+    # anything else: line-delimited JSON, one polygon per line
+    else:
+        with open(path, "w") as f:
+            f.writelines(ndjson_lines(vertices, offsets))
+
+def read_vertices(path):
+    # the (vertices, offsets) written by write_vertices
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return (data["vertices"], data["offsets"])
+    if path.endswith(".npy"):
+        return (np.load(path), np.load(offsets_path(path)))
+
+    points = []
+    offsets = [0]
+    with open(path) as f:
+        for line in f:
+            polygon = json.loads(line)["vertices"]
+            points.extend(polygon)
+            offsets.append(offsets[-1] + len(polygon))
+    return (np.array(points, dtype = "int32").reshape(-1, 2), np.array(offsets, dtype = "int64"))
+
+def annotate_vertices(image, vertices, offsets, labels = True):
+    with stage("draw"):
+        return _annotate_vertices(image, vertices, offsets, labels)
+
+def _annotate_vertices(image, vertices, offsets, labels):
+    # draws boundary of contours
+    cv2.polylines(image, list(iter_polygons(vertices, offsets)), True, (0, 0, 255), 5)
+    if not labels:
+        return image
+
+    # OPTIONAL:
+    # printing coordinates
+    # the first vertex of every polygon is its topmost one
+    first = np.zeros(len(vertices), dtype = "bool")
+    first[offsets[:-1][offsets[:-1] < len(vertices)]] = True
+    for ((x, y), tip) in zip(vertices.tolist(), first.tolist()):
+        if tip:
+            # text on topmost co-ordinate.
+            cv2.putText(image, "Arrow tip", (x, y), cv2.FONT_HERSHEY_COMPLEX, 0.5, (255, 0, 0))
+        else:
+            # text on remaining co-ordinates.
+            cv2.putText(image, "{} {}".format(x, y), (x, y), cv2.FONT_HERSHEY_COMPLEX, 0.5, (0, 255, 0))
+
+    return image
+
+def getCoordinates(image, cs):
+    # vertices of all contours as a list of (x, y), drawn and labelled on the image
+    (vertices, offsets) = polygon_table(cs)
+    annotate_vertices(image, vertices, offsets)
+    return [tuple(p) for p in vertices.tolist()]
@@ -0,0 +1,125 @@
+"""
+Color transfer on video streams
+Approach:
+- target stats are measured on a small copy of every frame and blended into
+  running stats with an exponential moving average instead of a full recompute
+- the transfer is a per-channel affine map on the 8-bit L*a*b* frame, applied
+  with one saturating cv2.transform call
+- a reader thread decodes the next frames while the current one is graded
+"""
+
+# import the necessary packages
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .profiling import stage
+
+
+class RunningStats:
+    def __init__(self, smoothing = 0.9, scale = 0.25):
+        # weight of the previous stats in the moving average
+        self.smoothing = smoothing
+        # size of the frame copy the stats are measured on
+        self.scale = scale
+        self.mean = None
+        self.std = None
+
+    def update(self, lab):
+        small = lab
+        with stage("stats"):
+            if self.scale < 1.0:
+                small = cv2.resize(lab, None, fx = self.scale, fy = self.scale, interpolation = cv2.INTER_AREA)
+            (mean, std) = cv2.meanStdDev(small)
+            (mean, std) = (mean.ravel(), std.ravel())
+
+        if self.mean is None:
+            (self.mean, self.std) = (mean, std)
+        else:
+            k = self.smoothing
+            self.mean = k * self.mean + (1.0 - k) * mean
+            self.std = k * self.std + (1.0 - k) * std
+        return (self.mean, self.std)
+
+def transfer_matrix(sourceStats, targetMean, targetStd):
+    # 3x4 matrix of the per-channel map: x -> (x - meanTar) * stdSrc / stdTar + meanSrc
+    (lMeanSrc, lStdSrc, aMeanSrc, aStdSrc, bMeanSrc, bStdSrc) = sourceStats
+    meanSrc = np.array([lMeanSrc, aMeanSrc, bMeanSrc])
+    stdSrc = np.array([lStdSrc, aStdSrc, bStdSrc])
+
+    # a flat channel (e.g. a black frame) would divide by zero
+    scale = stdSrc / np.maximum(targetStd, 1e-3)
+    M = np.zeros((3, 4), dtype = "float32")
+    M[[0, 1, 2], [0, 1, 2]] = scale
+    M[:, 3] = meanSrc - scale * targetMean
+    return M
+
+def grade_frame(frame, sourceStats, running):
+    with stage("lab"):
+        lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+    (mean, std) = running.update(lab)
+
+    # uint8 in, uint8 out: cv2.transform rounds and clips to [0, 255]
+    with stage("transfer"):
+        lab = cv2.transform(lab, transfer_matrix(sourceStats, mean, std))
+    with stage("lab"):
+        return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+
+def read_frames(capture, frames, stop):
+    # decode ahead of the grading loop, None marks the end of the stream
+    while not stop.is_set():
+        (grabbed, frame) = capture.read()
+        if not grabbed:
+            break
+        frames.put(frame)
+    frames.put(None)
+
+def grade_stream(capture, sourceStats, writer = None, display = False, smoothing = 0.9, scale = 0.25):
+    running = RunningStats(smoothing, scale)
+    frames = queue.Queue(maxsize = 8)
+    stop = threading.Event()
+    reader = threading.Thread(target = read_frames, args = (capture, frames, stop), daemon = True)
+    reader.start()
+
+    latencies = []
+    start = time.perf_counter()
+    try:
+        while True:
+            frame = frames.get()
+            if frame is None:
+                break
+
+            t = time.perf_counter()
+            graded = grade_frame(frame, sourceStats, running)
+            latencies.append(time.perf_counter() - t)
+
+            if writer is not None:
+                writer.write(graded)
+            if display:
+                cv2.imshow("Transfer", graded)
+                if cv2.waitKey(1) & 0xFF == ord("q"):
+                    break
+    finally:
+        stop.set()
+        # unblock the reader if it is waiting on a full queue
+        while reader.is_alive():
+            try:
+                frames.get_nowait()
+            except queue.Empty:
+                reader.join(0.01)
+    elapsed = time.perf_counter() - start
+
+    return (np.array(latencies), elapsed)
+
+def report(latencies, elapsed):
+    if len(latencies) == 0:
+        print("no frames")
+        return
+    ms = latencies * 1e3
+    print("{} frames in {:.2f}s: {:.1f} frames/sec overall, {:.1f} frames/sec grading only".format(
+        len(ms), elapsed, len(ms) / elapsed, len(ms) / latencies.sum()))
+    print("per-frame latency: mean {:.2f} ms, p50 {:.2f} ms, p95 {:.2f} ms, max {:.2f} ms".format(
+        ms.mean(), np.percentile(ms, 50), np.percentile(ms, 95), ms.max()))
@@ -0,0 +1,103 @@
+"""
+Live document scanner for a camera capture station
+Requirements:
+- python
+- basic knowledge on usage of comand line
+- NumPy
+Approach:
+- detect the document quad once with the usual blur -> threshold -> contours ->
+  approxPolyDP pipeline of docScannerOptimized, on a 500 px high copy of the frame
+- from then on track the four corners from frame to frame with pyramidal
+  Lucas-Kanade optical flow, which costs a tiny fraction of a full detection
+- a track is lost when a corner cannot be followed (or does not come back to
+  where it started when tracked backwards), or when the quad stops being a
+  sane convex quad
+- when lost, first re-detect only inside a window around the last known quad,
+  then fall back to detection on the whole frame
+- with -t auto every (re-)detection sweeps the binarization threshold
+  (computer_vision.sweep) instead of using 60, tracked frames never do
+- the expensive full resolution warp + local threshold only runs once the quad
+  has stayed still for a number of frames, and only once per stable period
+
+Usage:
+- python docScannerLive.py -v 0 --display
+- python docScannerLive.py -v capture.mp4 -o scans/
+"""
+
+# import the necessary packages
+import argparse
+import os
+import time
+
+from computer_vision import profiling
+
+
+def main():
+    # construct the argument parse and parse the arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-v", "--video", required=True, help="path to input video, or a capture device index")
+    ap.add_argument("-o", "--output", help="directory to write a scan to every time the document is stable")
+    ap.add_argument("--stable-frames", type=int, default=10, help="still frames before a scan is taken")
+    ap.add_argument("--stable-px", type=float, default=1.0, help="largest corner motion of a still frame")
+    ap.add_argument("--display", action="store_true", help="show the tracked quad and the scans, q to stop")
+    ap.add_argument("-t", "--threshold", default="60", help="detection threshold: a gray level or 'auto'")
+    profiling.add_arguments(ap)
+    args = vars(ap.parse_args())
+    profiling.from_args(args)
+
+    import cv2
+    import imutils
+
+    from computer_vision.sweep import parse_threshold
+    from computer_vision.tracking import QuadTracker, scan_quad
+
+    try:
+        threshold = parse_threshold(args["threshold"])
+    except ValueError as e:
+        ap.error(str(e))
+
+    video = args["video"]
+    capture = cv2.VideoCapture(int(video) if video.isdigit() else video)
+    if not capture.isOpened():
+        raise SystemExit("could not open {}".format(video))
+    if args["output"] is not None:
+        os.makedirs(args["output"], exist_ok = True)
+
+    tracker = QuadTracker(stable_px = args["stable_px"], stable_frames = args["stable_frames"], threshold = threshold)
+    (frames, scans, scanTime) = (0, 0, 0.0)
+    start = time.perf_counter()
+    while True:
+        (grabbed, frame) = capture.read()
+        if not grabbed:
+            break
+        frames += 1
+
+        (quad, stable) = tracker.update(frame)
+        if stable:
+            t = time.perf_counter()
+            scanned = scan_quad(frame, quad)
+            scanTime += time.perf_counter() - t
+            scans += 1
+            if args["output"] is not None:
+                cv2.imwrite(os.path.join(args["output"], "scan{:04d}.png".format(scans)), scanned)
+            if args["display"]:
+                cv2.imshow("Scanned", imutils.resize(scanned, height = 650))
+
+        if args["display"]:
+            if quad is not None:
+                color = (0, 255, 0) if tracker.still >= tracker.stable_frames else (0, 255, 255)
+                cv2.polylines(frame, [quad.astype("int32")], True, color, 2)
+            cv2.imshow("Live", imutils.resize(frame, height = 650))
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+    elapsed = time.perf_counter() - start
+    capture.release()
+
+    c = tracker.counts
+    print("{} frames in {:.2f}s ({:.1f} frames/sec), {} scans ({:.1f} ms each)".format(
+        frames, elapsed, frames / max(elapsed, 1e-9), scans, scanTime / max(scans, 1) * 1e3))
+    print("tracked {}, lost {}, roi re-detections {}, full detections {}".format(
+        c["tracked"], c["lost"], c["roi"], c["full"]))
+
+if __name__ == "__main__":
+    main()
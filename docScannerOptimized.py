@@ -3,15 +3,84 @@ Document scanner direct application
 Requirements:
 - python
 - basic knowledge on usage of comand line
-- NumPy 
+- NumPy
 Approach:
 - get the max of the contours
 - get coordinates of the vertex from this countour
 - order the coordinates (IMPORTANT)
 - transform
-- 
-
-Image source: 
+- when approxPolyDP at 0.02 gives no 4 point contour (a folded corner, a
+  finger over the edge), epsilon is searched by bisection on the vertex
+  count, then the convex hull and the minimum area rectangle are tried (see
+  computer_vision.quads), so such pages no longer need a rerun by hand
+
+Batch mode:
+- pass a directory, a glob pattern or a manifest (text file, one path per line)
+  with -b/--batch and an output directory with -o/--output
+- every image goes through the same resize -> contour -> transform -> threshold
+  pipeline in a pool of worker processes (one per core by default)
+- nothing is shown on screen, each file gets an "ok" or "failed" status line and
+  the run ends with the overall throughput in images/sec
+- images where no 4 point contour is found are reported as failures instead of
+  stopping the whole run
+- --pipeline runs the batch as an asyncio pipeline instead (see
+  computer_vision.pipeline): decoding and writing on thread pools
+  (--decode-workers, --write-workers), the scan itself on the process pool
+  (-w), bounded queues of --queue-size images in between; the run ends with
+  the depth of every queue and the utilization of every stage
+- the scans are saved 1 bit per pixel, as bilevel .png files by default
+  (--format tif for CCITT group 4 compressed TIFF, --format pbm for PBM)
+
+Coarse to fine:
+- the 500 px high copy is built like a cheap pyramid level: nearest neighbour
+  decimation down to about twice that height, then one INTER_AREA step,
+  instead of a single INTER_AREA resize over the whole full resolution image
+- the contour is found on that copy, so after scaling it back up by
+  ratio the corners are only accurate to a few ratio pixels
+- each corner is then refined with cv2.cornerSubPix, looking only at a small
+  window of the full resolution image around it, which gives full resolution
+  accuracy for the cost of four tiny patches (--no-refine turns it off)
+
+Detection threshold:
+- the page is found at the fixed binarization threshold 60 by default;
+  -t auto scores many thresholds per image instead (computer_vision.sweep):
+  only the gray levels its histogram makes worth trying, coarse to fine, and
+  keeps the one in the middle of the range where a large 4 point contour
+  shows up; -t N uses N
+
+Thresholding:
+- the final local threshold runs on the OpenCV backend of computer_vision.threshold by
+  default, pass --backend skimage to use skimage.filters.threshold_local instead
+
+1 bit output:
+- python docScannerOptimized.py -i bill.jpg --save bill.tif
+- only the gray plane of the page is warped, and the threshold is packed to 1
+  bit per pixel as it is computed, so the scan takes 1/8 of the memory of an
+  8 bit page
+- --save writes it as a bilevel .png, a .tif (CCITT group 4 fax compression,
+  --compression picks another one), a .pbm or a .npz of the packed bits
+
+Very large scans (tiled mode):
+- python docScannerOptimized.py -i scan100mp.tif --tiled page.pgm --budget 256
+- the warp and threshold run in horizontal strips with enough overlap for the
+  51 px threshold block, under a memory budget in MB, and every strip is
+  written straight to a .pgm or 1 bit .pbm image or a .npy file
+- nothing is shown on screen, the peak memory (RSS) of the run is reported
+
+Fixed rigs (cached remap tables):
+- python docScannerOptimized.py -i frame.jpg --rig desk1 --calibrate
+- python docScannerOptimized.py -b frames/ -o scans --rig desk1
+- on a fixed overhead camera the page is in the same place in every frame:
+  --calibrate detects it once on -i, and stores the remap tables of its warp
+  (fixed point, 6 bytes per page pixel) as <rig>_<width>x<height>.npz in
+  --rig-dir, optionally for another page size (--rig-size WxH)
+- with --rig and no --calibrate, single and batch modes skip the detection and
+  warp every frame through the stored tables of the rig (the last calibrated
+  page size, or --rig-size); each worker keeps the few most recently used
+  tables in memory, 14 bytes per page pixel each once the gray scan has
+  expanded them to float maps (see computer_vision.remap)
+
+Image source:
 - https://media-cdn.tripadvisor.com/media/photo-s/06/cf/0c/fe/our-bill.jpg
 - http://clipart-library.com/images_k/sticky-note-transparent-background/sticky-note-transparent-background-21.png
 """
@@ -20,120 +89,156 @@ Image source:
 
 import argparse
 
-import cv2
-import imutils
-import numpy as np
-from skimage.filters import threshold_local
-
-
-# construct the argument parse and parse the arguments
-ap = argparse.ArgumentParser()
-ap.add_argument("-i", "--image", required=True, help="path to source image")
-args = vars(ap.parse_args())
-
-image = cv2.imread(args["image"])
-# image = imutils.rotate_bound(image, 35)
-image = imutils.resize(image, height = 500)
-
-# keep track of the ratio of original height to the new one
-ratio = image.shape[0] / 500.0
-orig = image.copy()
-cv2.imshow("image", image)
-
-# preprocess and get max contour
-gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-blur = cv2.GaussianBlur(gray, (5, 5), 0)
-thresh = cv2.threshold(blur, 60, 255, cv2.THRESH_BINARY)[1]
-
-
-cs = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-cs = imutils.grab_contours(cs)
-cnts = sorted(cs, key = cv2.contourArea, reverse = True)[:5]
-# get coordinate from the max chosen contour
-for c in cnts:
-	# approximate the contour
-	peri = cv2.arcLength(c, True)
-	approx = cv2.approxPolyDP(c, 0.02 * peri, True)
-	# if our approximated contour has four points, then we
-	# can assume that we have found our screen
-	if len(approx) == 4:
-		screenCnt = approx
-		break
-
-cv2.drawContours(image, [screenCnt], -1, (0, 255, 0), 2)
-# apply the four point transform to obtain a top-down
-# view of the original image
-
-def order_points(pts):
-    # initialzie a list of coordinates that will be ordered
-    # such that the first entry in the list is the top-left,
-    # the second entry is the top-right, the third is the
-    # bottom-right, and the fourth is the bottom-left
-    rect = np.zeros((4, 2), dtype = "float32")
-
-    # the top-left point will have the smallest sum, whereas
-    # the bottom-right point will have the largest sum
-    s = pts.sum(axis = 1)
-    rect[0] = pts[np.argmin(s)]
-    rect[2] = pts[np.argmax(s)]
-
-    # now, compute the difference between the points, the
-    # top-right point will have the smallest difference,
-    # whereas the bottom-left will have the largest difference
-    diff = np.diff(pts, axis = 1)
-    rect[1] = pts[np.argmin(diff)]
-    rect[3] = pts[np.argmax(diff)]
-
-    # return the ordered coordinates
-    return rect
-
-def four_point_transform(image, pts):
-    # obtain a consistent order of the points and unpack them
-    # individually
-    rect = order_points(pts)
-    (tl, tr, br, bl) = rect
-
-    # compute the width of the new image, which will be the
-    # maximum distance between bottom-right and bottom-left
-    # x-coordiates or the top-right and top-left x-coordinates
-    widthA = np.sqrt(((br[0] - bl[0]) ** 2) + ((br[1] - bl[1]) ** 2))
-    widthB = np.sqrt(((tr[0] - tl[0]) ** 2) + ((tr[1] - tl[1]) ** 2))
-    maxWidth = max(int(widthA), int(widthB))
-
-    # compute the height of the new image, which will be the
-    # maximum distance between the top-right and bottom-right
-    # y-coordinates or the top-left and bottom-left y-coordinates
-    heightA = np.sqrt(((tr[0] - br[0]) ** 2) + ((tr[1] - br[1]) ** 2))
-    heightB = np.sqrt(((tl[0] - bl[0]) ** 2) + ((tl[1] - bl[1]) ** 2))
-    maxHeight = max(int(heightA), int(heightB))
-
-    # now that we have the dimensions of the new image, construct
-    # the set of destination points to obtain a "birds eye view",
-    # (i.e. top-down view) of the image, again specifying points
-    # in the top-left, top-right, bottom-right, and bottom-left
-    # order
-    dst = np.array([
-        [0, 0],
-        [maxWidth - 1, 0],
-        [maxWidth - 1, maxHeight - 1],
-        [0, maxHeight - 1]], dtype = "float32")
-
-    # compute the perspective transform matrix and then apply it
-    M = cv2.getPerspectiveTransform(rect, dst)
-    warped = cv2.warpPerspective(image, M, (maxWidth, maxHeight))
-
-    # return the warped image
-    return warped
-
-warped = four_point_transform(orig, screenCnt.reshape(4, 2) * ratio)
-
-# convert the warped image to grayscale, then threshold it
-# to give it that 'black and white' paper effect
-warped = cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
-T = threshold_local(warped, 51, offset = 10, method = "gaussian")
-warped = (warped > T).astype("uint8") * 255
-
-# show the original and scanned images
-cv2.imshow("Original", imutils.resize(orig, height = 650))
-cv2.imshow("Scanned", imutils.resize(warped, height = 650))
-cv2.waitKey(0)
+from computer_vision import profiling
+
+
+def main():
+    # construct the argument parse and parse the arguments
+    ap = argparse.ArgumentParser()
+    group = ap.add_mutually_exclusive_group(required=True)
+    group.add_argument("-i", "--image", help="path to source image")
+    group.add_argument("-b", "--batch", help="directory, glob pattern or manifest of images to scan")
+    ap.add_argument("-o", "--output", default="scans", help="output directory for batch mode")
+    ap.add_argument("-w", "--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    ap.add_argument("--pipeline", action="store_true", help="batch mode as a decode / scan / write pipeline")
+    ap.add_argument("--decode-workers", type=int, default=2, help="decoding threads of the pipeline")
+    ap.add_argument("--write-workers", type=int, default=2, help="writing threads of the pipeline")
+    ap.add_argument("--queue-size", type=int, default=4, help="images held between two stages of the pipeline")
+    ap.add_argument("-t", "--threshold", default="60", help="detection threshold: a gray level or 'auto'")
+    ap.add_argument("--backend", default="opencv", choices=["opencv", "skimage"], help="local threshold backend")
+    ap.add_argument("--no-refine", action="store_true", help="skip the full resolution corner refinement")
+    ap.add_argument("-s", "--save", help="also save the scan 1 bit per pixel (.png, .tif, .pbm or .npz)")
+    ap.add_argument("--format", default="png", choices=["png", "tif", "pbm"], help="bilevel file format of batch mode")
+    ap.add_argument("--compression", default=None, choices=["group4", "group3", "lzw", "deflate", "packbits", "none"],
+        help="TIFF compression (default: group4)")
+    ap.add_argument("--tiled", help="warp and threshold in strips, written to this .pgm, .pbm or .npy file")
+    ap.add_argument("--budget", type=float, default=256, help="memory budget of the tiled mode in MB")
+    ap.add_argument("--rig", help="name of a fixed camera rig: scan through its cached remap tables")
+    ap.add_argument("--rig-dir", default="rigs", help="directory of the rig remap tables")
+    ap.add_argument("--rig-size", help="page size WxH of the rig tables (default: the detected page's own)")
+    ap.add_argument("--calibrate", action="store_true", help="detect the page of -i and store the tables of --rig")
+    profiling.add_arguments(ap)
+    args = vars(ap.parse_args())
+    profiling.from_args(args)
+
+    from computer_vision.bilevel import BILEVEL_FORMATS
+    from computer_vision.sweep import parse_threshold
+
+    try:
+        threshold = parse_threshold(args["threshold"])
+    except ValueError as e:
+        ap.error(str(e))
+
+    size = None
+    if args["rig_size"] is not None:
+        try:
+            size = tuple(int(v) for v in args["rig_size"].lower().split("x"))
+        except ValueError:
+            size = ()
+        if len(size) != 2 or min(size) < 1:
+            ap.error("--rig-size must be WxH, e.g. 1700x2200")
+    if args["save"] is not None and args["save"].lower().rsplit(".", 1)[-1] not in BILEVEL_FORMATS:
+        ap.error("--save must be a .png, .tif, .pbm or .npz file, got {}".format(args["save"]))
+    if args["calibrate"] and (args["rig"] is None or args["image"] is None):
+        ap.error("--calibrate needs --rig and -i")
+    if args["rig"] is not None and args["tiled"] is not None:
+        ap.error("--rig does not apply to --tiled")
+    rig = None if args["rig"] is None else (args["rig_dir"], args["rig"], size)
+
+    if args["batch"] is not None and args["pipeline"]:
+        from computer_vision.pipeline import run_pipeline_batch
+
+        failed = run_pipeline_batch(args["batch"], args["output"], decode_workers = args["decode_workers"],
+            scan_workers = args["workers"], write_workers = args["write_workers"], queue_size = args["queue_size"],
+            backend = args["backend"], refine = not args["no_refine"], fmt = args["format"],
+            compression = args["compression"], threshold = threshold, rig = rig)
+        raise SystemExit(1 if failed else 0)
+
+    if args["batch"] is not None:
+        from computer_vision.batch import run_batch
+
+        failed = run_batch(args["batch"], args["output"], args["workers"], args["backend"], not args["no_refine"],
+            args["format"], args["compression"], threshold, rig)
+        raise SystemExit(1 if failed else 0)
+
+    import cv2
+    import imutils
+
+    orig = cv2.imread(args["image"])
+
+    table = None
+    if args["rig"] is not None and not args["calibrate"]:
+        from computer_vision.remap import RigTables
+
+        try:
+            table = RigTables(args["rig_dir"]).get(args["rig"], size)
+        except KeyError as e:
+            raise SystemExit(e.args[0])
+
+    if threshold == "auto" and table is None:
+        from computer_vision.scanner import detection_threshold
+
+        (threshold, stats) = detection_threshold(orig)
+        if threshold is None:
+            raise SystemExit("no threshold gives a 4 point contour")
+        print("threshold {} picked from {} candidate levels ({} evaluated) in {:.1f} ms".format(
+            threshold, stats["candidates"], stats["evaluated"], stats["elapsed"] * 1e3))
+
+    if args["tiled"] is not None:
+        import time
+
+        from computer_vision.scanner import scan_tiled
+        from computer_vision.tiled import peak_rss_mb
+
+        start = time.perf_counter()
+        try:
+            ((h, w), _, _) = scan_tiled(orig, args["tiled"], args["budget"], args["backend"], not args["no_refine"],
+                threshold)
+        except ValueError as e:
+            raise SystemExit("{}: {}".format(args["image"], e))
+        rss = peak_rss_mb()
+        print("{}x{} scan written to {} in {:.2f}s, peak RSS {}".format(w, h, args["tiled"],
+            time.perf_counter() - start, "n/a" if rss is None else "{:.0f} MB".format(rss)))
+        return
+
+    from computer_vision.bilevel import unpack_bits, write_bilevel
+    from computer_vision.scanner import scan_packed
+
+    if args["calibrate"]:
+        import time
+
+        from computer_vision.remap import RigTables
+        from computer_vision.scanner import detect_corners
+
+        rigs = RigTables(args["rig_dir"])
+        try:
+            (pts, _, _) = detect_corners(orig, not args["no_refine"], threshold)
+        except ValueError as e:
+            raise SystemExit("{}: {}".format(args["image"], e))
+        start = time.perf_counter()
+        table = rigs.calibrate(args["rig"], pts, orig.shape, size)
+        print("rig {}: {}x{} page of {}x{} frames, tables built in {:.0f} ms, saved to {}".format(args["rig"],
+            table.size[0], table.size[1], orig.shape[1], orig.shape[0], (time.perf_counter() - start) * 1e3,
+            rigs.path(args["rig"], table.size)))
+
+    # orig = imutils.rotate_bound(orig, 35)
+    image = imutils.resize(orig, height = 500)
+    cv2.imshow("image", image)
+
+    try:
+        (packed, width, screenCnt, ratio) = scan_packed(orig, args["backend"], not args["no_refine"], threshold,
+            table)
+    except ValueError as e:
+        raise SystemExit("{}: {}".format(args["image"], e))
+    if args["save"] is not None:
+        write_bilevel(args["save"], packed, width, args["compression"])
+    warped = unpack_bits(packed, width)
+    cv2.drawContours(image, [screenCnt], -1, (0, 255, 0), 2)
+
+    # show the original and scanned images
+    cv2.imshow("Original", imutils.resize(orig, height = 650))
+    cv2.imshow("Scanned", imutils.resize(warped, height = 650))
+    cv2.waitKey(0)
+
+if __name__ == "__main__":
+    main()
@@ -9,56 +9,87 @@ Recommendation:
 - link to image: https://pyimagesearch.com/wp-content/uploads/2016/04/extreme_points_input.jpg
 - prefer using images with dark backgrounds
 - for other cases, you can update the threshold value to work with
+
+Bulk mode (every object in the image, e.g. parts on a conveyor):
+- python extremePointDetection.py -i conveyor.png --all -o extremes.npy
+- left, right, top and bottom points of every contour at full resolution,
+  saved as an (N, 4, 2) array
 """
 
 # import the necessary packages
 import argparse
 
-import cv2
-import imutils
-import numpy as np
-
-# construct the argument parse and parse the arguments
-ap = argparse.ArgumentParser()
-ap.add_argument("-i", "--image", required=True, help="path to the input image")
-args = vars(ap.parse_args())
-
-# load and resize image
-image = cv2.imread(args["image"])
-image = imutils.resize(image,width = 600)
-
-# conevert image to gray and blur it a bit
-# blurring to reduce high frequency noise to make our contour detection process more accurate.
-
-gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-
-# threshold the image, then perform a series of erosions +
-# dilations to remove any small regions of noise
-thresh = cv2.threshold(gray, 45, 255, cv2.THRESH_BINARY)[1]
-thresh = cv2.erode(thresh, None, iterations=2)
-thresh = cv2.dilate(thresh, None, iterations=2)
-
-# find and grab countours
-# save the maxinum countour by area
-cnts = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-cnts = imutils.grab_contours(cnts)
-c = max(cnts, key = cv2.contourArea)
-
-# determine the most extreme points along the contour
-extLeft = tuple(c[c[:, :, 0].argmin()][0])
-extRight = tuple(c[c[:, :, 0].argmax()][0])
-extTop = tuple(c[c[:, :, 1].argmin()][0])
-extBot = tuple(c[c[:, :, 1].argmax()][0])
-
-# draw the outline of the object
-cv2.drawContours(image, [c], -1, (0, 255, 255), 1)
-
-# mark the extreme points with customized colors
-cv2.circle(image, extLeft, 8, (0, 0, 255), -1)
-cv2.circle(image, extRight, 8, (0, 255, 0), -1)
-cv2.circle(image, extTop, 8, (255, 0, 0), -1)
-cv2.circle(image, extBot, 8, (255, 0, 255), -1)
-
-cv2.imshow("Image", image)
-cv2.waitKey(0)
+from computer_vision import profiling
+
+
+def main():
+    # construct the argument parse and parse the arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-i", "--image", required=True, help="path to the input image")
+    ap.add_argument("--all", action="store_true", help="extreme points of every object, not just the largest")
+    ap.add_argument("--min-area", type=float, default=0, help="with --all: smallest contour area to keep")
+    ap.add_argument("-o", "--output", help="with --all: save the (N, 4, 2) extreme points to this .npy file")
+    ap.add_argument("--cache", help="directory of a contour cache, repeat runs on the same image skip the preprocessing")
+    profiling.add_arguments(ap)
+    args = vars(ap.parse_args())
+    profiling.from_args(args)
+
+    import cv2
+    import imutils
+
+    image = cv2.imread(args["image"])
+    cache = None
+    if args["cache"] is not None:
+        from computer_vision.cache import ContourCache
+
+        cache = ContourCache(args["cache"])
+
+    if args["all"]:
+        import numpy as np
+
+        from computer_vision.contours import contour_areas
+        from computer_vision.extreme import all_extreme_points, object_contours
+
+        cnts = object_contours(image, cache)
+        if args["min_area"] > 0:
+            keep = np.flatnonzero(contour_areas(cnts) >= args["min_area"])
+            cnts = [cnts[i] for i in keep]
+        ext = all_extreme_points(cnts)
+        print("extreme points of {} objects".format(len(ext)))
+        if args["output"] is not None:
+            np.save(args["output"], ext)
+        if cache is not None:
+            print("cache: {}".format(cache.stats()))
+
+        # mark the left, right, top and bottom points of every object
+        cv2.drawContours(image, cnts, -1, (0, 255, 255), 1)
+        for (i, color) in enumerate([(0, 0, 255), (0, 255, 0), (255, 0, 0), (255, 0, 255)]):
+            for p in ext[:, i].tolist():
+                cv2.circle(image, tuple(p), 4, color, -1)
+        cv2.imshow("Image", imutils.resize(image, width = 1000))
+        cv2.waitKey(0)
+        return
+
+    from computer_vision.extreme import extreme_points
+
+    # load and resize image
+    image = imutils.resize(image,width = 600)
+
+    (c, (extLeft, extRight, extTop, extBot)) = extreme_points(image, cache)
+    if cache is not None:
+        print("cache: {}".format(cache.stats()))
+
+    # draw the outline of the object
+    cv2.drawContours(image, [c], -1, (0, 255, 255), 1)
+
+    # mark the extreme points with customized colors
+    cv2.circle(image, extLeft, 8, (0, 0, 255), -1)
+    cv2.circle(image, extRight, 8, (0, 255, 0), -1)
+    cv2.circle(image, extTop, 8, (255, 0, 0), -1)
+    cv2.circle(image, extBot, 8, (255, 0, 255), -1)
+
+    cv2.imshow("Image", image)
+    cv2.waitKey(0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Local scanning service
+Requirements:
+- python
+- basic knowledge on usage of comand line
+- NumPy
+Approach:
+- every one-off "python docScannerOptimized.py -i ..." starts a fresh
+  interpreter that imports NumPy, OpenCV, imutils and scikit-image again,
+  which takes longer than scanning one page
+- this script starts a pool of worker processes once (-w, one per core by
+  default), warms every pipeline up in each of them, and serves requests over
+  HTTP on localhost (--port) or on a Unix socket (--unix) until interrupted
+- the image bytes go in the body of a POST, the result comes back in the
+  answer, nothing is written to disk (see computer_vision.service)
+
+Usage:
+- python scanService.py --port 8080 --styles styles.npz
+- curl --data-binary @bill.jpg "http://127.0.0.1:8080/scan?format=tif" -o bill.tif
+- curl --data-binary @photo.jpg "http://127.0.0.1:8080/color?style=sunset" -o sunset.png
+- curl --data-binary @parts.png "http://127.0.0.1:8080/shapes?min_area=20"
+- curl --unix-socket /tmp/scan.sock --data-binary @bill.jpg http://localhost/scan -o bill.png
+- curl http://127.0.0.1:8080/health
+- python scanService.py --profile: the stages of every request, summed over
+  the workers, are printed when the service stops and served at /metrics
+- python -m benchmarks.bench_service measures the latency under load
+"""
+
+# import the necessary packages
+import argparse
+import os
+import signal
+
+from computer_vision import profiling
+
+
+def main():
+    # construct the argument parse and parse the arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    ap.add_argument("-p", "--port", type=int, default=8080, help="port to listen on (0: any free port)")
+    ap.add_argument("--unix", help="listen on this Unix socket instead of a port")
+    ap.add_argument("-w", "--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    ap.add_argument("--styles", help="style library (.npz) of the /color endpoint")
+    ap.add_argument("--rig-dir", help="directory of the rig remap tables of /scan?rig=<name>")
+    ap.add_argument("--max-mb", type=float, default=64, help="largest request body in MB")
+    ap.add_argument("--timeout", type=float, default=60, help="seconds a request may wait for its result")
+    ap.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    profiling.add_arguments(ap)
+    args = vars(ap.parse_args())
+    profiler = profiling.from_args(args)
+    if args["styles"] is not None and not os.path.isfile(args["styles"]):
+        ap.error("no style library at {}".format(args["styles"]))
+
+    # the service module pulls in OpenCV and NumPy, not needed for a bad style path
+    from computer_vision.service import ScanService, make_server, server_address
+
+    try:
+        service = ScanService(args["workers"], args["styles"], args["rig_dir"], args["timeout"],
+            profiler is not None, profiler is not None and profiler.memory)
+    except (ValueError, RuntimeError) as e:
+        raise SystemExit(str(e))
+    server = make_server(service, args["host"], args["port"], args["unix"], args["max_mb"], args["verbose"])
+    # stop on SIGTERM like on Ctrl+C, so that the workers are stopped too
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print("serving on {} with {} warm workers".format(server_address(server), service.workers), flush = True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args["unix"] is not None and os.path.exists(args["unix"]):
+            os.unlink(args["unix"])
+
+if __name__ == "__main__":
+    main()
@@ -10,50 +10,66 @@ Requirements:
 Recommendation:
 - prefer using images with dark backgrounds
 - for other cases, you can update the threshold value to work with
+
+Bulk mode (thousands of shapes, e.g. particles or parts on a conveyor):
+- python shapeDetection.py -i particles.png -o shapes.csv
+- centroid, area and bounding box of every shape in one pass, written as a
+  CSV (or .npy) table instead of an annotated window
+- add --display to also see the shapes drawn from the table
 """
 
 # import the necessary packages
 import argparse
 
-import cv2
-import imutils
-
-# construct the argument parse and parse the arguments
-ap = argparse.ArgumentParser()
-ap.add_argument("-i", "--image", required=True, help="path to the input image")
-args = vars(ap.parse_args())
-
-# load the image, convert it to grayscale, blur it slightly, and threshold it
-# Blurring to reduce high frequency noise to make our contour detection process more accurate.
-# By thresholding, we are "binarizing the image" (black and white)
-image = cv2.imread(args["image"])
-gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-thresh = cv2.threshold(blurred, 60, 255, cv2.THRESH_BINARY)[1]
-
-# find and grab contours in the thresholded image
-cnts = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-cnts = imutils.grab_contours(cnts)
-
-# loop over the contours
-for c in cnts:
-	# compute the center of the contouredge case by adding a tiny number to denominator
-    # avoid 
-	M = cv2.moments(c)
-	cX = int(M["m10"] / (M["m00"] + 1e-7))
-	cY = int(M["m01"] / (M["m00"] + 1e-7))
-
-	# draw the contour on the image
-	cv2.drawContours(image, [c], -1, (0, 255, 0), 2)
-
-    # mark the center of the shape on the image
-    # parameters: image_name, coordinates, radius, color, thickness
-    # use thickness of -1 px to fill the circle
-	cv2.circle(image, (cX, cY), 7, (255, 255, 255), -1)
-
-    # parameters: image_name, text, start_coordinates, font, font_scale, color, thickness 
-	cv2.putText(image, "center", (cX - 20, cY - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-	
-    # show the image
-cv2.imshow("Image", image)
-cv2.waitKey(0)
+from computer_vision import profiling
+
+
+def main():
+	# construct the argument parse and parse the arguments
+	ap = argparse.ArgumentParser()
+	ap.add_argument("-i", "--image", required=True, help="path to the input image")
+	ap.add_argument("-o", "--output", help="bulk mode: write the shape table to this .csv or .npy file")
+	ap.add_argument("-t", "--threshold", type=int, default=60, help="bulk mode: binarization threshold")
+	ap.add_argument("--min-area", type=float, default=0, help="bulk mode: smallest shape area in pixels")
+	ap.add_argument("--method", default="contours", choices=["contours", "components"], help="bulk mode: shape statistics from contours or connected components")
+	ap.add_argument("--display", action="store_true", help="bulk mode: also show the shapes drawn from the table")
+	ap.add_argument("--cache", help="directory of a contour cache, repeat runs on the same image skip the preprocessing")
+	profiling.add_arguments(ap)
+	args = vars(ap.parse_args())
+	profiling.from_args(args)
+
+	import cv2
+
+	image = cv2.imread(args["image"])
+	cache = None
+	if args["cache"] is not None:
+		from computer_vision.cache import ContourCache
+
+		cache = ContourCache(args["cache"])
+
+	if args["output"] is not None:
+		from computer_vision.shapes import draw_table, shape_table, write_table
+
+		table = shape_table(image, args["threshold"], args["min_area"], args["method"], cache)
+		write_table(args["output"], table)
+		print("{} shapes written to {}".format(len(table), args["output"]))
+		if cache is not None:
+			print("cache: {}".format(cache.stats()))
+
+		if args["display"]:
+			cv2.imshow("Image", draw_table(image, table))
+			cv2.waitKey(0)
+		return
+
+	from computer_vision.shapes import detect_shapes, draw_shapes
+
+	(cnts, centers) = detect_shapes(image, cache)
+	if cache is not None:
+		print("cache: {}".format(cache.stats()))
+
+	# show the image
+	cv2.imshow("Image", draw_shapes(image, cnts, centers))
+	cv2.waitKey(0)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,62 @@
+"""
+Style library for color transfer
+Requirements:
+- python
+- basic knowledge on usage of comand line
+- NumPy
+Approach:
+- color transfer only needs the L*a*b* mean and standard deviation of the source
+- compute those 6 numbers once per reference image ("style") and keep them
+  in a (N, 6) float32 array next to the N style IDs
+- save the library as a small .npz file (a few KB for hundreds of styles)
+- colorTransfer.color_transfer(style_id, target, library) reads the stats
+  from here and never opens the reference image again
+- nearest() finds the styles whose stats are closest to given stats or image,
+  one vectorized distance computation over the whole library
+
+Usage:
+- build:   python styleLibrary.py -r references/ -o styles.npz
+- lookup:  python styleLibrary.py -l styles.npz --nearest photo.jpg -k 3
+"""
+
+# import the necessary packages
+import argparse
+
+from computer_vision import profiling
+
+
+def main():
+    # construct the argument parse and parse the arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-r", "--references", help="directory of reference images to build the library from")
+    ap.add_argument("-o", "--output", help="path to write the library (.npz) to")
+    ap.add_argument("-l", "--library", help="path to an existing library")
+    ap.add_argument("-n", "--nearest", help="path to an image to find the nearest styles for")
+    ap.add_argument("-k", type=int, default=1, help="number of nearest styles to list")
+    profiling.add_arguments(ap)
+    args = vars(ap.parse_args())
+    profiling.from_args(args)
+    if args["references"] is not None and args["output"] is None:
+        ap.error("building a library needs -o/--output")
+    if args["references"] is None and args["library"] is None:
+        ap.error("either -r/--references or -l/--library is needed")
+
+    # the library modules import OpenCV, only once the mode is known to be valid
+    from computer_vision.files import list_images
+    from computer_vision.styles import StyleLibrary
+
+    if args["references"] is not None:
+        library = StyleLibrary.build(list_images(args["references"]))
+        library.save(args["output"])
+        print("saved {} styles to {}".format(len(library), args["output"]))
+    else:
+        library = StyleLibrary.load(args["library"])
+
+    if args["nearest"] is not None:
+        import cv2
+
+        for (style_id, dist) in library.nearest(cv2.imread(args["nearest"]), args["k"]):
+            print("{}\t{:.2f}".format(style_id, dist))
+
+if __name__ == "__main__":
+    main()
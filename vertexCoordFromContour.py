@@ -12,6 +12,12 @@ of each contour.
 - The key point here is that the first co-ordinate in the array would always 
 be the co-ordinate of the topmost vertex and hence could help in detection of 
 orientation of an image.
+Data only mode (huge contour sets, downstream jobs):
+- python vertexCoordFromContour.py -i parts.png -o vertices.npz
+- the vertices of all polygons at full resolution, as one (M, 2) int32 array
+  plus per-contour offsets (CSR layout), no drawing and no labels
+- -o accepts .npz, .npy (offsets go to <name>_offsets.npy) or .ndjson (one
+  JSON line per contour); add --display to also see the annotated image
 Recomendations:
 - prefer an image with dark background
 - for other cases you can handle the threshold or use inRange instead
@@ -20,62 +26,57 @@ Recomendations:
 # import the necessary packages
 import argparse
 
-import cv2
-import imutils
-import numpy as np
-
-# construct the argument parse and parse the arguments
-ap = argparse.ArgumentParser()
-ap.add_argument("-i", "--image", required=True, help="path to source image")
-args = vars(ap.parse_args())
-
-image = cv2.imread(args["image"])
-image = imutils.resize(image, width = 700)
-
-gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-blur = cv2.GaussianBlur(gray, (5, 5), 0)
-
-thresh = cv2.threshold(blur, 60, 255, cv2.THRESH_BINARY)[1]
-
-
-cs = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-cs = imutils.grab_contours(cs)
-
-def getCoordinates(image, cs):
-
-    vertices = []
-    for c in cs :
-
-        # approxPolyDP(): to perform an approximation of a shape of a contour.
-        approx = cv2.approxPolyDP(c, 0.009 * cv2.arcLength(c, True), True)
-    
-        # draws boundary of contours
-        cv2.drawContours(image, [approx], 0, (0, 0, 255), 5) 
-    
-        # flatten the array containing the co-ordinates of the vertices.
-        n = approx.ravel() 
-    
-        for i in range(len(n)) :
-            if(i % 2 == 0):
-                x = n[i]
-                y = n[i + 1]
-                vertices.append((x, y))
-                
-                # OPTIONAL:
-                # printing coordinates
-                # String containing the co-ordinates.
-                coord = str(x) + " " + str(y) 
-        
-                if(i == 0):
-                    # text on topmost co-ordinate.
-                    cv2.putText(image, "Arrow tip", (x, y), cv2.FONT_HERSHEY_COMPLEX, 0.5, (255, 0, 0)) 
-                else:
-                    # text on remaining co-ordinates.
-                    cv2.putText(image, coord, (x, y), cv2.FONT_HERSHEY_COMPLEX, 0.5, (0, 255, 0)) 
-
-    return vertices            
-
-print(getCoordinates(image, cs))           
-cv2.imshow("image", image)
-
-cv2.waitKey(0)
+from computer_vision import profiling
+
+
+def main():
+    # construct the argument parse and parse the arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-i", "--image", required=True, help="path to source image")
+    ap.add_argument("-o", "--output", help="data only mode: write the vertices to this .npz, .npy or .ndjson file")
+    ap.add_argument("--display", action="store_true", help="data only mode: also show the annotated image")
+    ap.add_argument("--cache", help="directory of a contour cache, repeat runs on the same image skip the preprocessing")
+    profiling.add_arguments(ap)
+    args = vars(ap.parse_args())
+    profiling.from_args(args)
+
+    import cv2
+    import imutils
+
+    from computer_vision.contours import find_contours
+
+    image = cv2.imread(args["image"])
+    cache = None
+    if args["cache"] is not None:
+        from computer_vision.cache import ContourCache
+
+        cache = ContourCache(args["cache"])
+
+    if args["output"] is not None:
+        from computer_vision.vertices import annotate_vertices, polygon_table, write_vertices
+
+        (vertices, offsets) = polygon_table(find_contours(image, cache = cache))
+        write_vertices(args["output"], vertices, offsets)
+        print("{} vertices of {} contours written to {}".format(len(vertices), len(offsets) - 1, args["output"]))
+        if cache is not None:
+            print("cache: {}".format(cache.stats()))
+
+        if args["display"]:
+            cv2.imshow("image", imutils.resize(annotate_vertices(image, vertices, offsets), width = 1000))
+            cv2.waitKey(0)
+        return
+
+    from computer_vision.vertices import getCoordinates
+
+    image = imutils.resize(image, width = 700)
+    cs = find_contours(image, cache = cache)
+    if cache is not None:
+        print("cache: {}".format(cache.stats()))
+
+    print(getCoordinates(image, cs))
+    cv2.imshow("image", image)
+
+    cv2.waitKey(0)
+
+if __name__ == "__main__":
+    main()